@@ -0,0 +1,104 @@
+# backend/app/admission.py
+# Admission control for the async automation endpoints.
+#
+# Each platform ("grok", "tiktok", "instagram") gets a semaphore bounding the work that runs
+# concurrently plus a bounded wait queue in front of it. A request that finds the queue full is
+# rejected immediately with 429; a request that waited `queue_timeout` seconds without getting
+# a slot is rejected with 503. Both carry a Retry-After estimate derived from recent service times,
+# so clients back off instead of the API piling up coroutines.
+#
+# Configuration per platform (NAME upper-cased):
+#   ADMISSION_<NAME>_CONCURRENCY   (default 16)
+#   ADMISSION_<NAME>_QUEUE         (default 256)
+#   ADMISSION_<NAME>_QUEUE_TIMEOUT (seconds, default 30)
+
+import os
+import math
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Dict
+
+
+class Saturated(Exception):
+    def __init__(self, name: str, status_code: int, retry_after: int):
+        self.name = name
+        self.status_code = status_code
+        self.retry_after = retry_after
+        reason = "queue full" if status_code == 429 else "timed out waiting for a slot"
+        super().__init__(f"{name} is saturated ({reason}); retry after {retry_after}s")
+
+
+class AdmissionController:
+    def __init__(self, name: str, concurrency: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._sem = asyncio.Semaphore(concurrency)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self.timed_out = 0
+        # exponentially weighted moving average of how long admitted work takes
+        self._avg_service = 30.0
+
+    def retry_after(self) -> int:
+        backlog = self.active + self.waiting + 1
+        return max(1, min(600, math.ceil(self._avg_service * backlog / self.concurrency)))
+
+    @asynccontextmanager
+    async def admit(self):
+        if not self._sem.locked():
+            # a slot is free: acquire() returns without suspending, so the count stays exact
+            await self._sem.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.rejected += 1
+                raise Saturated(self.name, 429, self.retry_after())
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._sem.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.timed_out += 1
+                raise Saturated(self.name, 503, self.retry_after())
+            finally:
+                self.waiting -= 1
+        self.active += 1
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+            self._avg_service = 0.8 * self._avg_service + 0.2 * (time.monotonic() - started)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "active": self.active,
+            "waiting": self.waiting,
+            "concurrency": self.concurrency,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+        }
+
+
+_controllers: Dict[str, AdmissionController] = {}
+
+
+def get_admission(name: str) -> AdmissionController:
+    controller = _controllers.get(name)
+    if controller is None:
+        prefix = f"ADMISSION_{name.upper()}_"
+        controller = _controllers[name] = AdmissionController(
+            name,
+            concurrency=int(os.getenv(prefix + "CONCURRENCY", "16")),
+            max_queue=int(os.getenv(prefix + "QUEUE", "256")),
+            queue_timeout=float(os.getenv(prefix + "QUEUE_TIMEOUT", "30")),
+        )
+    return controller
+
+
+def admission_stats() -> Dict[str, Dict[str, int]]:
+    return {name: c.stats() for name, c in _controllers.items()}
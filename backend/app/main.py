@@ -1,21 +1,52 @@
 # backend/app/main.py
 # FastAPI entrypoint with minimal routes for health and starting trend-scout
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Header, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
-from typing import Optional
-from .db import SessionLocal, engine
+from typing import Optional, List
+from .db import get_db, get_async_db, dispose_async_engine
 from . import models
-from .services.trends import TrendScout
-from .services.grok_automator import GrokAutomator, AuthenticationError, CaptchaError
-from .services.social_uploader import SocialUploader, UploadError
+from .services.trend_cache import get_trend_cache
+from .services.proxy_manager import get_proxy_manager
+from .services.media_store import get_media_store
+from .services.prompt_cache import get_prompt_cache, POLICIES as CACHE_POLICIES
+from .services.job_events import get_job_events
+from .telemetry import HTTP_LATENCY, REGISTRY, CONTENT_TYPE, render as render_metrics
+from datetime import datetime, timezone
+from .admission import get_admission, admission_stats, Saturated
+from contextlib import AsyncExitStack
 import os
+import sys
+import json
+import time
+import base64
+from sqlalchemy import func, literal, select, tuple_
+from sqlalchemy.orm import load_only
 
-# create database tables if not present (development convenience)
-models.Base.metadata.create_all(bind=engine)
+# The schema is managed by Alembic (`alembic upgrade head`, see scripts/migrate.py) and is not
+# touched at import time. Browser automation (Selenium, undetected_chromedriver, Playwright) and
+# pytrends are imported inside the endpoints that use them, so API workers start without them
+# and only load what their traffic needs.
 
 app = FastAPI(title="ViralGen API")
 
+@app.on_event("shutdown")
+def _close_browser_pools():
+    # only pools of modules that were loaded; importing them here would start nothing to close
+    grok = sys.modules.get(f"{__package__}.services.grok_automator")
+    if grok is not None:
+        grok.shutdown_driver_pool()
+    engines = sys.modules.get(f"{__package__}.services.playwright_engine")
+    if engines is not None:
+        engines.shutdown_playwright_engines()
+    get_proxy_manager().save()
+
+@app.on_event("shutdown")
+async def _close_async_engine():
+    await dispose_async_engine()
+
 class Health(BaseModel):
     status: str
 
@@ -23,40 +54,214 @@ class Health(BaseModel):
 def health():
     return {"status": "ok"}
 
-# Dependency for DB session
-def get_db():
-    db = SessionLocal()
+@app.middleware("http")
+async def _record_latency(request: Request, call_next):
+    started = time.monotonic()
+    status = 500
     try:
-        yield db
+        response = await call_next(request)
+        status = response.status_code
+        return response
     finally:
-        db.close()
+        # label by route template (/jobs/{job_id}), not the raw path, to keep cardinality bounded
+        route = request.scope.get("route")
+        HTTP_LATENCY.observe(time.monotonic() - started, method=request.method, route=getattr(route, "path", "unmatched"), status=status)
+
+def _admission_samples():
+    for platform, stats in admission_stats().items():
+        yield {"platform": platform, "state": "active"}, stats["active"]
+        yield {"platform": platform, "state": "waiting"}, stats["waiting"]
+
+def _queue_depth_samples():
+    from .db import SessionLocal
+
+    with SessionLocal() as db:
+        rows = db.query(models.Job.status, func.count(models.Job.id)).filter(models.Job.status.in_([models.JobStatus.queued, models.JobStatus.running])).group_by(models.Job.status).all()
+        due = db.query(func.count(models.ScheduledUpload.id)).filter(
+            models.ScheduledUpload.status == models.UploadStatus.scheduled,
+            models.ScheduledUpload.publish_at <= datetime.now(timezone.utc),
+        ).scalar()
+    counts = {getattr(status, "value", status): n for status, n in rows}
+    yield {"queue": "jobs", "state": "queued"}, counts.get("queued", 0)
+    yield {"queue": "jobs", "state": "running"}, counts.get("running", 0)
+    yield {"queue": "scheduled_uploads", "state": "due"}, due or 0
+
+REGISTRY.gauge("admission_requests", "Automation requests in flight and queued per platform.", _admission_samples)
+REGISTRY.gauge("queue_depth", "Jobs queued/running and scheduled uploads past their publish time.", _queue_depth_samples)
 
-# Example endpoint to create a job (barebones)
+@app.get("/metrics")
+def metrics():
+    """Prometheus text exposition of the API process's metrics."""
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
+
+# Jobs are executed asynchronously by `app.worker.JobWorker` (see scripts/run_worker.py);
+# the API only records them and returns the id right away.
 class CreateJobRequest(BaseModel):
     owner_id: int
     script_prompt: str
+    seeds: Optional[List[str]] = None
+    platform: Optional[str] = None
+    caption: Optional[str] = ""
+    cookies_path: Optional[str] = None
+    account: Optional[str] = None
+    proxies: Optional[str] = None
+    headless: bool = True
+    cache: Optional[str] = None  # Grok prompt cache policy: "use" (default), "bypass", "refresh"
 
-@app.post("/jobs")
+@app.post("/jobs", status_code=202)
 def create_job(req: CreateJobRequest, db=Depends(get_db)):
     # simple create - in production validate owner and permissions
-    job = models.Job(owner_id=req.owner_id, metadata={"prompt": req.script_prompt})
+    payload = {
+        "prompt": req.script_prompt,
+        "seeds": req.seeds,
+        "platform": req.platform,
+        "caption": req.caption,
+        "cookies_path": req.cookies_path,
+        "account": req.account,
+        "proxies": req.proxies,
+        "headless": req.headless,
+        "cache": req.cache,
+    }
+    from .services.shard_coordinator import shard_key_for
+
+    # account jobs are routed to the worker shard that leases the account
+    job = models.Job(owner_id=req.owner_id, metadata={k: v for k, v in payload.items() if v is not None}, shard_key=shard_key_for(payload))
     db.add(job)
     db.commit()
     db.refresh(job)
     return {"id": job.id, "status": job.status}
 
 
+def _encode_cursor(created_at: datetime, job_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{job_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: str):
+    try:
+        created_at, job_id = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return datetime.fromisoformat(created_at), int(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _job_summary(job) -> dict:
+    return {
+        "id": job.id,
+        "owner_id": job.owner_id,
+        "status": job.status,
+        "result_url": job.result_url,
+        "error_message": job.error_message,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+@app.get("/jobs")
+async def list_jobs(owner_id: Optional[int] = None, status: Optional[models.JobStatus] = None, cursor: Optional[str] = None, limit: int = 50, db=Depends(get_async_db)):
+    """Newest jobs first, paginated by keyset: pass `next_cursor` back as `cursor` for the next page.
+
+    Filtering by owner_id or status is served by the (owner_id, created_at) / (status, created_at)
+    indexes, so deep pages cost the same as the first one.
+    """
+    Job = models.Job
+    # the JSON payload can be large; list only the summary columns
+    query = select(Job).options(load_only(Job.id, Job.owner_id, Job.status, Job.result_url, Job.error_message, Job.created_at, Job.updated_at))
+    if owner_id is not None:
+        query = query.where(Job.owner_id == owner_id)
+    if status is not None:
+        query = query.where(Job.status == status)
+    if cursor:
+        created_at, job_id = _decode_cursor(cursor)
+        # compare against the cursor row's stored timestamp: on SQLite a bound datetime is a string that
+        # need not match the stored format ("T" separator, microseconds); the cursor's own value is only
+        # the fallback for a deleted row
+        after = func.coalesce(select(Job.created_at).where(Job.id == job_id).scalar_subquery(), literal(created_at, Job.created_at.type))
+        query = query.where(tuple_(Job.created_at, Job.id) < tuple_(after, literal(job_id, Job.id.type)))
+    limit = max(1, min(limit, 200))
+    rows = (await db.execute(query.order_by(Job.created_at.desc(), Job.id.desc()).limit(limit + 1))).scalars().all()
+    next_cursor = _encode_cursor(rows[limit - 1].created_at, rows[limit - 1].id) if len(rows) > limit else None
+    return {"items": [_job_summary(job) for job in rows[:limit]], "next_cursor": next_cursor}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: int, db=Depends(get_async_db)):
+    job = await db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {
+        **_job_summary(job),
+        "result": (job.metadata or {}).get("result"),
+    }
+
+
+def _finished_status(job) -> Optional[str]:
+    return job.status.value if job.status in (models.JobStatus.completed, models.JobStatus.failed) else None
+
+
+@app.get("/jobs/{job_id}/events")
+async def job_events_stream(job_id: int, after: int = 0, last_event_id: Optional[str] = Header(None), db=Depends(get_async_db)):
+    """Server-sent progress events of a job: the recorded history first, then live events.
+
+    Each event carries `phase`, overall `percent`, `message`, `artifacts` and `ts`; the stream
+    ends after the `completed` or `failed` event. Reconnecting clients resume via Last-Event-ID
+    (or `?after=<id>`). A WebSocket on the same path delivers the same events as JSON messages.
+    """
+    job = await db.get(models.Job, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    finished = _finished_status(job)
+    # the stream outlives this request's session; release its connection now
+    await db.close()
+    if last_event_id and last_event_id.isdigit():
+        after = max(after, int(last_event_id))
+
+    async def stream():
+        async for event in get_job_events().subscribe(job_id, after=after, finished=finished, heartbeat=15):
+            if event is None:
+                yield ": keepalive\n\n"
+                continue
+            yield f"id: {event['id']}\nevent: {event['phase']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.websocket("/jobs/{job_id}/events")
+async def job_events_socket(websocket: WebSocket, job_id: int, after: int = 0, db=Depends(get_async_db)):
+    job = await db.get(models.Job, job_id)
+    finished = _finished_status(job) if job else None
+    await db.close()
+    if not job:
+        await websocket.close(code=4404, reason="Job not found")
+        return
+    await websocket.accept()
+    try:
+        async for event in get_job_events().subscribe(job_id, after=after, finished=finished, heartbeat=15):
+            # heartbeats double as disconnect detection while the job is quiet
+            await websocket.send_json(event if event is not None else {"phase": "keepalive"})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+
+@app.get("/jobs/events/stats")
+def job_events_stats():
+    """Published/delivered/dropped counters and current subscribers of this API process."""
+    return get_job_events().stats()
+
+
 @app.get("/trends/top")
 def top_trend(q: str = "ai", proxies: str = None):
     """Return a top related query for the provided q (comma-separated seeds allowed).
 
     Example self-correction behavior: if TrendScout cannot fetch from Google Trends (e.g. 429),
     it will retry with exponential backoff and proxy rotation. If all attempts fail, we return
-    a safe default trend string.
+    a safe default trend string. Results are served from the shared trend cache.
     """
     seeds = [s.strip() for s in q.split(",") if s.strip()]
     proxy_list = proxies.split(",") if proxies else None
-    scout = TrendScout(proxies=proxy_list)
+    from .services.trends import TrendScout
+
+    scout = TrendScout(proxies=proxy_list, cache=get_trend_cache())
     top = scout.safe_fetch_top_trend(seeds)
     if not top:
         # fallback default
@@ -64,37 +269,110 @@ def top_trend(q: str = "ai", proxies: str = None):
     return {"trend": top}
 
 
+@app.get("/trends/cache")
+def trend_cache_stats():
+    """Hit/miss counters of the shared trend cache."""
+    return get_trend_cache().stats()
+
+
 # --- Automation endpoints (Grok + Social uploads) ---
 class GrokRequest(BaseModel):
     prompt: str
     headless: bool = True
     proxies: Optional[str] = None
+    cache: str = "use"  # "use", "bypass" or "refresh"
+
+def _saturated(e: Saturated) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+
 
 @app.post("/automation/grok")
-def automation_grok(req: GrokRequest):
-    """Trigger Grok imagine flow. Blocking call — in production run this as a background job.
+async def automation_grok(req: GrokRequest):
+    """Trigger Grok imagine flow on the async automator.
 
-    Returns local download path and remote URL when available.
+    Admission is bounded per platform: when the Grok queue is full the call fails fast with
+    429 (or 503 after waiting too long for a slot) and a Retry-After header.
+    Results are cached by normalized prompt: `cache="use"` serves a previous result (and joins
+    an identical generation already in flight), `"refresh"` regenerates and stores the new
+    result, `"bypass"` ignores the cache. Returns local download path and remote URL when available.
     """
+    if req.cache not in CACHE_POLICIES:
+        raise HTTPException(status_code=400, detail=f"cache must be one of {', '.join(CACHE_POLICIES)}")
+    from .services.grok_automator import AuthenticationError, CaptchaError
+    from .services.grok_automator_async import AsyncGrokAutomator
+
     proxy_list = req.proxies.split(",") if req.proxies else None
-    automator = GrokAutomator(headless=req.headless, proxies=proxy_list)
+    automator = AsyncGrokAutomator(headless=req.headless, proxies=proxy_list)
+
+    async def generate():
+        async with get_admission("grok").admit():
+            # the cached (account, proxy) context stays signed in; imagine logs in only when redirected to login
+            return await automator.imagine(req.prompt)
+
     try:
-        # attempt login if credentials are set or provided via env
-        if automator.username and automator.password:
-            automator.login()
-        result = automator.imagine(req.prompt)
-        return {"ok": True, "result": result}
+        result, state = await get_prompt_cache().run_async(req.prompt, generate, req.cache)
+        return {"ok": True, "cache": state, "result": result}
+    except Saturated as e:
+        raise _saturated(e)
     except AuthenticationError as e:
         raise HTTPException(status_code=401, detail=str(e))
     except CaptchaError as e:
         raise HTTPException(status_code=403, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Grok error: {e}")
-    finally:
-        try:
-            automator.close()
-        except Exception:
-            pass
+
+
+class GrokBatchRequest(BaseModel):
+    prompts: List[str]
+    headless: bool = True
+    proxies: Optional[str] = None
+    cache: str = "use"
+    max_tabs: Optional[int] = None  # parallel generations in the shared session (GROK_BATCH_TABS)
+    stream: str = "ndjson"  # "ndjson" or "sse"
+
+
+@app.post("/automation/grok/batch")
+async def automation_grok_batch(req: GrokBatchRequest):
+    """Run a list of prompts on one logged-in Grok session and stream results as they finish.
+
+    The batch takes a single Grok admission slot for its whole lifetime. Each finished prompt is
+    sent as one NDJSON line or one server-sent event `{"index", "prompt", "ok", "result" | "error"}`;
+    SSE streams end with a `done` event.
+    """
+    if req.cache not in CACHE_POLICIES:
+        raise HTTPException(status_code=400, detail=f"cache must be one of {', '.join(CACHE_POLICIES)}")
+    if req.stream not in ("ndjson", "sse"):
+        raise HTTPException(status_code=400, detail="stream must be ndjson or sse")
+    if not req.prompts:
+        raise HTTPException(status_code=400, detail="prompts must not be empty")
+    from .services.grok_automator_async import AsyncGrokAutomator
+
+    proxy_list = req.proxies.split(",") if req.proxies else None
+    automator = AsyncGrokAutomator(headless=req.headless, proxies=proxy_list)
+    # admit before the response starts so saturation still maps to 429/503
+    stack = AsyncExitStack()
+    try:
+        await stack.enter_async_context(get_admission("grok").admit())
+    except Saturated as e:
+        raise _saturated(e)
+
+    async def events():
+        async with stack:
+            async for item in automator.imagine_many(req.prompts, max_tabs=req.max_tabs, cache=get_prompt_cache(), policy=req.cache):
+                line = json.dumps(item, default=str)
+                yield f"event: result\ndata: {line}\n\n" if req.stream == "sse" else line + "\n"
+            if req.stream == "sse":
+                yield "event: done\ndata: {}\n\n"
+
+    media_type = "text/event-stream" if req.stream == "sse" else "application/x-ndjson"
+    # the background task releases the slot if the stream never started; closing twice is a no-op
+    return StreamingResponse(events(), media_type=media_type, background=BackgroundTask(stack.aclose))
+
+
+@app.get("/automation/grok/cache")
+def grok_cache_stats():
+    """Hit/miss/coalescing counters of the Grok prompt-result cache."""
+    return get_prompt_cache().stats()
 
 
 class UploadRequest(BaseModel):
@@ -102,25 +380,117 @@ class UploadRequest(BaseModel):
     caption: Optional[str] = ""
     platform: Optional[str] = "tiktok"
     cookies_path: Optional[str] = None
+    account: Optional[str] = None  # session-store account; its saved login is reused
     headless: bool = True
+    proxies: Optional[str] = None
 
 @app.post("/automation/upload")
-def automation_upload(req: UploadRequest):
+async def automation_upload(req: UploadRequest):
     """Upload a video to a social platform via the SocialUploader.
 
-    Returns the post URL and saved cookie path.
+    Uploads are admitted through a per-platform semaphore and bounded queue (429/503 + Retry-After when saturated).
+    Returns the post URL and the account whose session was used and kept up to date.
     """
-    uploader = SocialUploader(headless=req.headless)
+    platform = (req.platform or "").lower()
+    if platform == "tiktok":
+        name = "tiktok"
+    elif platform in ("instagram", "ig", "reel", "reels"):
+        name = "instagram"
+    else:
+        raise HTTPException(status_code=400, detail="Unsupported platform")
+    from .services.social_uploader import SocialUploader, UploadError
+
+    proxy_list = req.proxies.split(",") if req.proxies else None
+    uploader = SocialUploader(headless=req.headless, proxies=proxy_list)
     try:
-        if req.platform.lower() == "tiktok":
-            res = uploader.upload_tiktok(req.video_path, caption=req.caption or "", cookies_path=req.cookies_path)
-        elif req.platform.lower() in ("instagram", "ig", "reel", "reels"):
-            res = uploader.upload_instagram_reel(req.video_path, caption=req.caption or "", cookies_path=req.cookies_path)
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported platform")
+        async with get_admission(name).admit():
+            if name == "tiktok":
+                res = await uploader.upload_tiktok_async(req.video_path, caption=req.caption or "", cookies_path=req.cookies_path, account=req.account)
+            else:
+                res = await uploader.upload_instagram_reel_async(req.video_path, caption=req.caption or "", cookies_path=req.cookies_path, account=req.account)
         return {"ok": True, "result": res}
+    except Saturated as e:
+        raise _saturated(e)
     except UploadError as e:
         raise HTTPException(status_code=500, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Upload error: {e}")
 
+
+class ScheduledUploadItem(BaseModel):
+    video_path: str
+    caption: Optional[str] = ""
+    account: str
+    platform: str = "tiktok"
+    publish_at: Optional[datetime] = None  # default: as soon as the rate limits allow
+    cookies_path: Optional[str] = None
+
+class ScheduleUploadsRequest(BaseModel):
+    items: List[ScheduledUploadItem]
+
+
+def _scheduled_upload_dict(row) -> dict:
+    return {
+        "id": row.id,
+        "platform": row.platform,
+        "account": row.account,
+        "video_path": row.video_path,
+        "publish_at": row.publish_at,
+        "status": row.status,
+        "attempts": row.attempts,
+        "post_url": row.post_url,
+        "error_message": row.error_message,
+    }
+
+
+@app.post("/uploads/schedule", status_code=202)
+def create_scheduled_uploads(req: ScheduleUploadsRequest, db=Depends(get_db)):
+    """Queue many uploads for the upload scheduler (scripts/run_upload_scheduler.py).
+
+    The scheduler publishes each item once `publish_at` has passed and the platform's and
+    account's token buckets allow it; poll `GET /uploads/{id}` for the outcome.
+    """
+    from .services.upload_scheduler import schedule_uploads
+
+    try:
+        ids = schedule_uploads(db, [item.dict() for item in req.items])
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"ids": ids}
+
+
+@app.get("/uploads/{upload_id}")
+def get_scheduled_upload(upload_id: int, db=Depends(get_db)):
+    row = db.get(models.ScheduledUpload, upload_id)
+    if not row:
+        raise HTTPException(status_code=404, detail="Scheduled upload not found")
+    return _scheduled_upload_dict(row)
+
+
+@app.get("/uploads")
+def list_scheduled_uploads(status: Optional[models.UploadStatus] = None, account: Optional[str] = None, limit: int = 100, db=Depends(get_db)):
+    query = db.query(models.ScheduledUpload)
+    if status is not None:
+        query = query.filter(models.ScheduledUpload.status == status)
+    if account:
+        query = query.filter(models.ScheduledUpload.account == account)
+    rows = query.order_by(models.ScheduledUpload.publish_at, models.ScheduledUpload.id).limit(min(limit, 1000)).all()
+    return [_scheduled_upload_dict(row) for row in rows]
+
+
+@app.get("/proxies")
+def proxy_stats():
+    """Health score, latency and cooldown state of every proxy seen by this process."""
+    return get_proxy_manager().stats()
+
+
+@app.get("/media")
+def media_stats():
+    """Object count, bytes on disk and reference count of the shared media store."""
+    return get_media_store().stats()
+
+
+@app.get("/automation/admission")
+def automation_admission():
+    """Current in-flight / queued / rejected counters per platform."""
+    return admission_stats()
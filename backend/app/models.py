@@ -1,7 +1,7 @@
 # backend/app/models.py
 # SQLAlchemy ORM models for User and Job
 
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, JSON
+from sqlalchemy import Column, Integer, String, Boolean, DateTime, Enum, ForeignKey, JSON, Float, BigInteger, Text, Index
 from sqlalchemy.sql import func
 from .db import Base
 import enum
@@ -18,6 +18,12 @@ class JobStatus(str, enum.Enum):
     completed = "completed"
     failed = "failed"
 
+class UploadStatus(str, enum.Enum):
+    scheduled = "scheduled"
+    running = "running"
+    posted = "posted"
+    failed = "failed"
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True, index=True)
@@ -28,6 +34,13 @@ class User(Base):
 
 class Job(Base):
     __tablename__ = "jobs"
+    __table_args__ = (
+        # worker claims (oldest queued first) and per-owner listings (GET /jobs), see migration 0002
+        Index("ix_jobs_status_created_at", "status", "created_at"),
+        Index("ix_jobs_owner_id_created_at", "owner_id", "created_at"),
+        # distinct shard keys of queued jobs, read by every worker poll, see migration 0005
+        Index("ix_jobs_status_shard_key", "status", "shard_key"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     owner_id = Column(Integer, ForeignKey("users.id"), nullable=False)
     script_id = Column(String, nullable=True)
@@ -35,12 +48,139 @@ class Job(Base):
     metadata = Column(JSON, nullable=True)  # arbitrary payload (prompts, settings)
     result_url = Column(String, nullable=True)
     error_message = Column(String, nullable=True)
+    # lease of the worker running the job, extended by its heartbeat; expired leases are reclaimed
+    worker_id = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)  # unix timestamp
+    attempts = Column(Integer, default=0, nullable=False, server_default="0")  # claims so far
+    # resource whose lease owner runs the job, e.g. "tiktok:alice" (see `services.shard_coordinator`); None runs anywhere
+    shard_key = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+class JobStage(Base):
+    """Durable checkpoint of one pipeline stage of a job (see `services.job_checkpoints.JobCheckpoints`)."""
+    __tablename__ = "job_stages"
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), primary_key=True)
+    stage = Column(String, primary_key=True)  # trend, generate, download, prepare, upload
+    idempotency_key = Column(String(64), nullable=False)  # sha256 of the job id, stage and stage inputs
+    output = Column(JSON, nullable=True)  # e.g. trend, download_url, sha256 + local_path, post_url
+    attempts = Column(Integer, default=0, nullable=False)
+    started_at = Column(Float, nullable=False)  # unix timestamp
+    completed_at = Column(Float, nullable=True)  # None while in flight
+
+class ScheduledUpload(Base):
+    """One item of the bulk upload schedule executed by `services.upload_scheduler.UploadScheduler`."""
+    __tablename__ = "scheduled_uploads"
+    __table_args__ = (
+        Index("ix_scheduled_uploads_status_publish_at", "status", "publish_at"),  # scheduler polling
+    )
+    id = Column(Integer, primary_key=True, index=True)
+    platform = Column(String, nullable=False)  # "tiktok" / "instagram"
+    account = Column(String, nullable=False, index=True)
+    video_path = Column(String, nullable=False)
+    caption = Column(Text, nullable=True)
+    cookies_path = Column(String, nullable=True)
+    publish_at = Column(DateTime(timezone=True), nullable=False, index=True)  # also the next retry time
+    status = Column(Enum(UploadStatus), default=UploadStatus.scheduled, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    post_url = Column(String, nullable=True)
+    error_message = Column(String, nullable=True)
+    # lease of the scheduler running the upload, extended by its heartbeat; only expired leases are reclaimed
+    claimed_by = Column(String, nullable=True)
+    lease_expires_at = Column(Float, nullable=True)  # unix timestamp
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
+class UploadSession(Base):
+    """Latest Playwright storage state per upload account (see `services.session_store.SessionStore`)."""
+    __tablename__ = "upload_sessions"
+    platform = Column(String, primary_key=True)
+    account = Column(String, primary_key=True)
+    storage_state = Column(JSON, nullable=False)
+    digest = Column(String(64), nullable=False)  # cookie/local-storage fingerprint, see state_digest()
+    valid = Column(Boolean, default=True, nullable=False)
+    updated_at = Column(Float, nullable=False)  # unix timestamp
+
+class TrendCacheEntry(Base):
+    """Second-level store for `services.trend_cache.TrendCache` (TREND_CACHE_BACKEND=sql)."""
+    __tablename__ = "trend_cache"
+    key = Column(String, primary_key=True)  # "keyword|geo|timeframe|hl"
+    value = Column(JSON, nullable=True)
+    fetched_at = Column(Float, nullable=False)  # unix timestamp
+
+class PromptCacheEntry(Base):
+    """Persistent tier of `services.prompt_cache.PromptCache` (GROK_CACHE_BACKEND=sql)."""
+    __tablename__ = "prompt_cache"
+    key = Column(String(64), primary_key=True)  # sha256 of the normalized prompt
+    prompt = Column(Text, nullable=False)  # normalized prompt, for inspection
+    value = Column(JSON, nullable=False)  # download_url, local_path, sha256
+    created_at = Column(Float, nullable=False)  # unix timestamp
+
+class MediaObject(Base):
+    """Index row of one file in `services.media_store.MediaStore`, keyed by its SHA-256."""
+    __tablename__ = "media_objects"
+    sha256 = Column(String(64), primary_key=True)
+    path = Column(String, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    created_at = Column(Float, nullable=False)  # unix timestamp
+    last_used_at = Column(Float, nullable=False, index=True)
+
+class PreparedMedia(Base):
+    """Cache of `services.media_prep.MediaPreparer`: source file + target profile -> prepared file."""
+    __tablename__ = "prepared_media"
+    source_sha256 = Column(String(64), primary_key=True)
+    profile = Column(String, primary_key=True)
+    output_sha256 = Column(String(64), nullable=False)  # equals the source when it already fit
+    mode = Column(String, nullable=False)  # "keep", "remux" or "transcode"
+    created_at = Column(Float, nullable=False)
+
+class MediaRef(Base):
+    """One reference to a stored file; objects without references are eligible for garbage collection."""
+    __tablename__ = "media_refs"
+    id = Column(Integer, primary_key=True)
+    sha256 = Column(String(64), ForeignKey("media_objects.sha256", ondelete="CASCADE"), nullable=False, index=True)
+    job_id = Column(Integer, ForeignKey("jobs.id"), nullable=True, index=True)
+    holder = Column(String, nullable=True)  # non-job owners, e.g. a cache
+    created_at = Column(Float, nullable=False)
+
+class JobEvent(Base):
+    """One progress event of a job, replayed to late subscribers (see `services.job_events.JobEvents`)."""
+    __tablename__ = "job_events"
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, ForeignKey("jobs.id", ondelete="CASCADE"), nullable=False, index=True)
+    phase = Column(String, nullable=False)  # running, trend, grok, prepare, upload, completed, failed
+    percent = Column(Float, nullable=False)
+    message = Column(Text, nullable=True)
+    artifacts = Column(JSON, nullable=True)  # e.g. download_url, sha256, post_url
+    created_at = Column(Float, nullable=False)  # unix timestamp
+
+class WorkerRegistration(Base):
+    """A live job worker; shards are computed over the workers that heartbeated recently."""
+    __tablename__ = "worker_registrations"
+    worker_id = Column(String, primary_key=True)  # host:pid
+    started_at = Column(Float, nullable=False)  # unix timestamp
+    heartbeat_at = Column(Float, nullable=False, index=True)
+
+class ResourceLease(Base):
+    """Exclusive lease of an account or proxy to one worker (see `services.shard_coordinator.ShardCoordinator`)."""
+    __tablename__ = "resource_leases"
+    resource = Column(String, primary_key=True)  # "tiktok:alice", "grok:bob@example.com", "proxy:10.0.0.1:8080"
+    worker_id = Column(String, nullable=False, index=True)
+    acquired_at = Column(Float, nullable=False)
+    expires_at = Column(Float, nullable=False)  # unix timestamp, extended by the holder's heartbeat
+
+class TenantUsage(Base):
+    """Daily usage per job owner, added to periodically by `tenant_scheduler.TenantScheduler.flush`."""
+    __tablename__ = "tenant_usage"
+    owner_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(String(10), primary_key=True)  # UTC date, YYYY-MM-DD
+    jobs_started = Column(Integer, default=0, nullable=False)
+    jobs_finished = Column(Integer, default=0, nullable=False)
+    run_seconds = Column(Float, default=0.0, nullable=False)
+    updated_at = Column(Float, nullable=False)  # unix timestamp
+
 # Self-check note:
-# After creating tables run:
-#   from app.db import engine
-#   from app.models import Base
-#   Base.metadata.create_all(bind=engine)
-# Then verify `users` and `jobs` appear in your Postgres DB.
+# The schema is managed with Alembic (backend/migrations); after changing a model add a revision:
+#   cd backend && alembic revision --autogenerate -m "describe the change"
+#   alembic upgrade head
+# Then verify the new tables/indexes appear in your Postgres DB.
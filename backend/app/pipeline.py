@@ -0,0 +1,308 @@
+# backend/app/pipeline.py
+# Trend -> Grok imagine -> upload pipeline executed by the job worker.
+#
+# A job's `metadata` column carries the pipeline payload:
+#   prompt       - Grok prompt; may contain a "{trend}" placeholder
+#   seeds        - optional list (or comma-separated string) of trend seeds
+#   proxies      - optional list (or comma-separated string) of proxy URLs
+#   headless     - run browsers headless (default True)
+#   platform     - optional "tiktok" / "instagram"; no upload when missing
+#   caption      - upload caption; may contain a "{trend}" placeholder
+#   account      - upload account in the session store
+#   cookies_path - optional Playwright storage_state, imported for the account when it has no valid session
+#   cache        - Grok prompt cache policy: "use" (default), "bypass" or "refresh"
+#
+# Generated media lives in the shared `MediaStore`; a job holds a reference on its video
+# until the upload succeeded (or for good when the job has no upload step).
+#
+# Progress is reported per stage through `services.job_events` (watch it at GET /jobs/{id}/events);
+# PROGRESS maps each stage onto a slice of the job's overall percent.
+#
+# Finished stages are checkpointed in `job_stages` (`services.job_checkpoints`): the chosen trend, the
+# generation's download URL, the downloaded media hash, the prepared file and the upload URL. A job that
+# is reclaimed after a worker crash skips every stage whose checkpoint still matches its inputs. An
+# upload that started but never finished may already be posted: PIPELINE_UPLOAD_RESUME=retry (default)
+# uploads again, "fail" fails the job for a manual check instead of risking a duplicate post.
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Callable, Optional, Dict, List
+
+logger = logging.getLogger("pipeline")
+
+DEFAULT_TREND = "KI Revolution 2026"
+
+PROGRESS = {"trend": (0, 10), "grok": (10, 70), "prepare": (70, 80), "upload": (80, 99)}
+# share of the grok slice reached when a GrokAutomator step finishes
+GROK_STEPS = {"page_load": 0.15, "prompt_submit": 0.25, "generation": 0.85, "download": 1.0}
+
+
+class PipelineError(Exception):
+    pass
+
+
+def _split(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [v.strip() for v in value if v and v.strip()]
+
+
+class Pipeline:
+    """Runs the pipeline stages with a concurrency limit per stage.
+
+    Limits are process-wide: a worker running eight jobs with `grok_concurrency=2`
+    only ever has two browser generations in flight, while the other jobs wait
+    for a slot or work on cheaper stages.
+    """
+
+    STAGES = ("trend", "grok", "prepare", "upload")
+
+    def __init__(self, trend_concurrency: Optional[int] = None, grok_concurrency: Optional[int] = None, upload_concurrency: Optional[int] = None, prepare_concurrency: Optional[int] = None, events=None):
+        self.limits = {
+            "trend": trend_concurrency or int(os.getenv("PIPELINE_TREND_CONCURRENCY", "2")),
+            "grok": grok_concurrency or int(os.getenv("PIPELINE_GROK_CONCURRENCY", "1")),
+            "prepare": prepare_concurrency or int(os.getenv("PIPELINE_PREPARE_CONCURRENCY", "2")),
+            "upload": upload_concurrency or int(os.getenv("PIPELINE_UPLOAD_CONCURRENCY", "2")),
+        }
+        self._slots = {name: threading.BoundedSemaphore(n) for name, n in self.limits.items()}
+        self._lock = threading.Lock()
+        self._active = {name: 0 for name in self.STAGES}
+        self._waiting = {name: 0 for name in self.STAGES}
+        self._events = events
+
+    @property
+    def events(self):
+        if self._events is None:
+            from .services.job_events import get_job_events
+            self._events = get_job_events()
+        return self._events
+
+    @contextmanager
+    def stage(self, name: str):
+        from .telemetry import STAGE_SECONDS, STAGE_WAIT_SECONDS, span
+
+        slot = self._slots[name]
+        with self._lock:
+            self._waiting[name] += 1
+        mark = time.monotonic()
+        slot.acquire()
+        STAGE_WAIT_SECONDS.observe(time.monotonic() - mark, stage=name)
+        with self._lock:
+            self._waiting[name] -= 1
+            self._active[name] += 1
+        try:
+            with span(name, STAGE_SECONDS, "stage"):
+                yield
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+            slot.release()
+
+    def stage_stats(self) -> Dict[str, Dict[str, int]]:
+        """Jobs inside and queued in front of each stage (stage queue depth)."""
+        with self._lock:
+            return {name: {"active": self._active[name], "waiting": self._waiting[name], "limit": self.limits[name]} for name in self.STAGES}
+
+    def run(self, payload: Dict, job_id: Optional[int] = None, checkpoints=None) -> Dict[str, Optional[str]]:
+        """Execute all stages for one job payload and return the merged result dict.
+
+        Stages with a matching checkpoint are skipped; `result["resumed"]` lists them.
+        """
+        from .services.job_checkpoints import JobCheckpoints
+
+        payload = payload or {}
+        proxies = _split(payload.get("proxies")) or None
+        headless = payload.get("headless", True)
+        result: Dict[str, Optional[str]] = {}
+        report = self.events.reporter(job_id)
+        checkpoints = checkpoints or JobCheckpoints(job_id)
+        resumed: List[str] = []
+        if checkpoints.completed():
+            report("running", 0, f"Resuming after {', '.join(checkpoints.completed())}")
+
+        seeds = _split(payload.get("seeds"))
+        trend = None
+        if seeds:
+            key = checkpoints.key("trend", seeds)
+            done = checkpoints.get("trend", key)
+            if done:
+                trend = done["trend"]
+                resumed.append("trend")
+            else:
+                checkpoints.start("trend", key)
+                with self.stage("trend"):
+                    report("trend", PROGRESS["trend"][0], "Fetching trends")
+                    trend = self.run_trend(seeds, proxies)
+                checkpoints.complete("trend", key, {"trend": trend})
+            result["trend"] = trend
+            report("trend", PROGRESS["trend"][1], artifacts={"trend": trend})
+
+        prompt = payload.get("prompt")
+        if not prompt:
+            raise PipelineError("Job payload has no prompt")
+        prompt = prompt.replace("{trend}", trend or DEFAULT_TREND)
+        media_key = checkpoints.key("download", prompt)
+        media = self._resume_media(checkpoints, prompt, resumed)
+        if media is None:
+            generate_key = checkpoints.key("generate", prompt)
+            checkpoints.start("generate", generate_key)
+            media = self.generate(prompt, proxies, headless, payload.get("cache") or "use", report, generated=lambda url: checkpoints.complete("generate", generate_key, {"download_url": url}))
+        result.update(media)
+        digest = self._pin_media(result, job_id)
+        if result.get("local_path") and "download" not in resumed:
+            checkpoints.complete("download", media_key, {k: result.get(k) for k in ("download_url", "local_path", "sha256", "cache")})
+        report("grok", PROGRESS["grok"][1], f"Media ready ({result.get('cache')})", {k: result.get(k) for k in ("download_url", "sha256") if result.get(k)})
+
+        platform = payload.get("platform")
+        if platform:
+            if not result.get("local_path"):
+                raise PipelineError("Generation produced no local media to upload")
+            caption = (payload.get("caption") or "").replace("{trend}", trend or DEFAULT_TREND)
+            key = checkpoints.key("prepare", result.get("sha256"), platform)
+            done = checkpoints.get("prepare", key)
+            if done and os.path.exists(done["path"]):
+                video_path = done["path"]
+                resumed.append("prepare")
+            else:
+                checkpoints.start("prepare", key)
+                with self.stage("prepare"):
+                    report("prepare", PROGRESS["prepare"][0], f"Preparing media for {platform}")
+                    video_path = self.run_prepare(platform, result["local_path"])
+            prepared = self._pin_path(video_path, job_id) if video_path != result["local_path"] else None
+            if "prepare" not in resumed:
+                checkpoints.complete("prepare", key, {"path": video_path})
+            if prepared:
+                result["prepared_path"] = video_path
+            key = checkpoints.key("upload", result.get("sha256"), platform, payload.get("account"), caption)
+            done = checkpoints.get("upload", key)
+            if done:
+                result.update(done)
+                resumed.append("upload")
+            else:
+                if checkpoints.in_flight("upload", key) and os.getenv("PIPELINE_UPLOAD_RESUME", "retry").lower() == "fail":
+                    raise PipelineError(f"An earlier upload to {platform} was interrupted and may have been posted; not retrying (PIPELINE_UPLOAD_RESUME=fail)")
+                checkpoints.start("upload", key)
+                with self.stage("upload"):
+                    report("upload", PROGRESS["upload"][0], f"Uploading to {platform}")
+                    uploaded = self.run_upload(platform, video_path, caption, payload.get("cookies_path"), headless, proxies, payload.get("account"))
+                checkpoints.complete("upload", key, uploaded)
+                result.update(uploaded)
+            report("upload", PROGRESS["upload"][1], artifacts={"post_url": result.get("post_url")})
+            # uploaded: the store may reclaim the files once nothing else references them
+            for pinned in (digest, prepared):
+                if pinned:
+                    self._media_store().release(pinned, job_id=job_id)
+        if resumed:
+            result["resumed"] = resumed
+        return result
+
+    def _resume_media(self, checkpoints, prompt: str, resumed: List[str]) -> Optional[Dict[str, Optional[str]]]:
+        """Media of an earlier attempt: the stored download, or a fresh download of its generated URL."""
+        done = checkpoints.get("download", checkpoints.key("download", prompt))
+        if done and done.get("local_path") and os.path.exists(done["local_path"]):
+            resumed.append("download")
+            return dict(done)
+        url = (checkpoints.get("generate", checkpoints.key("generate", prompt)) or {}).get("download_url")
+        if not url:
+            return None
+        local_path = self.run_download(url)
+        if not local_path:
+            # the link expired or the host is gone; generate again
+            return None
+        resumed.append("generate")
+        return {"download_url": url, "local_path": local_path, "cache": "checkpoint"}
+
+    @staticmethod
+    def _media_store():
+        from .services.media_store import get_media_store
+
+        return get_media_store()
+
+    def _pin_media(self, result: Dict, job_id: Optional[int]) -> Optional[str]:
+        digest = self._media_store().digest_of(result.get("local_path"))
+        if digest:
+            result["sha256"] = digest
+        return self._pin_path(result.get("local_path"), job_id)
+
+    def _pin_path(self, path: Optional[str], job_id: Optional[int]) -> Optional[str]:
+        store = self._media_store()
+        digest = store.digest_of(path)
+        if not digest or job_id is None:
+            return None
+        # idempotent, so a resumed job does not pin its media twice
+        store.ensure_ref(digest, job_id=job_id)
+        return digest
+
+    def generate(self, prompt: str, proxies: Optional[List[str]], headless: bool, policy: str = "use", report: Optional[Callable] = None, generated: Optional[Callable[[str], None]] = None) -> Dict[str, Optional[str]]:
+        """Grok stage behind the prompt cache: hits and coalesced waits never take a browser slot.
+
+        `generated(download_url)` is called as soon as Grok produced the media, before the download.
+        """
+        from .services.prompt_cache import get_prompt_cache
+
+        low, high = PROGRESS["grok"]
+
+        def progress(step, artifacts=None):
+            if generated and step == "generation" and (artifacts or {}).get("download_url"):
+                generated(artifacts["download_url"])
+            if report:
+                report("grok", low + (high - low) * GROK_STEPS.get(step, 0), step, artifacts)
+
+        def run():
+            with self.stage("grok"):
+                progress("started")
+                return self.run_grok(prompt, proxies, headless, progress)
+
+        result, state = get_prompt_cache().run(prompt, run, policy)
+        return {**result, "cache": state}
+
+    def run_trend(self, seeds: List[str], proxies: Optional[List[str]]) -> str:
+        from .services.trends import TrendScout
+        from .services.trend_cache import get_trend_cache
+
+        top = TrendScout(proxies=proxies, cache=get_trend_cache()).safe_fetch_top_trend(seeds)
+        return top or DEFAULT_TREND
+
+    def run_grok(self, prompt: str, proxies: Optional[List[str]], headless: bool, progress: Optional[Callable] = None) -> Dict[str, Optional[str]]:
+        from .services.grok_automator import GrokAutomator, get_driver_pool
+
+        # headless generations reuse warm sessions from the process-wide pool
+        pool = get_driver_pool() if headless else None
+        automator = GrokAutomator(headless=headless, proxies=proxies, pool=pool)
+        try:
+            if automator.username and automator.password:
+                automator.login()
+            return automator.imagine(prompt, progress=progress)
+        finally:
+            automator.close()
+
+    def run_download(self, download_url: str) -> Optional[str]:
+        from .services.grok_automator import GrokAutomator
+
+        # no browser is started: this only uses the automator's download manager and media store
+        return GrokAutomator()._download(download_url)
+
+    def run_prepare(self, platform: str, video_path: str) -> str:
+        from .services.media_prep import get_media_preparer
+        from .services.upload_scheduler import normalize_platform
+
+        target = normalize_platform(platform)
+        if target is None:
+            raise PipelineError(f"Unsupported platform: {platform}")
+        return get_media_preparer().prepare(video_path, target)
+
+    def run_upload(self, platform: str, video_path: str, caption: str, cookies_path: Optional[str], headless: bool, proxies: Optional[List[str]] = None, account: Optional[str] = None) -> Dict[str, str]:
+        from .services.social_uploader import SocialUploader
+
+        uploader = SocialUploader(headless=headless, proxies=proxies)
+        platform = platform.lower()
+        if platform == "tiktok":
+            return uploader.upload_tiktok(video_path, caption=caption, cookies_path=cookies_path, account=account)
+        if platform in ("instagram", "ig", "reel", "reels"):
+            return uploader.upload_instagram_reel(video_path, caption=caption, cookies_path=cookies_path, account=account)
+        raise PipelineError(f"Unsupported platform: {platform}")
@@ -0,0 +1,248 @@
+"""
+backend/app/services/browser_pool.py
+
+DriverPool
+- Keeps pre-launched, already-logged-in WebDriver sessions so callers lease a warm browser instead of
+  paying Chrome start-up and login on every prompt.
+- Sessions are keyed by proxy: a lease for proxy A never hands out a browser that routes through proxy B.
+- Recycle policy: a session is quit after `max_uses` leases or once it is older than `max_age` seconds.
+- Leases run a cheap health check first; crashed or unresponsive browsers are evicted and replaced.
+- `health_check` can also veto sessions that are merely too big (see `BrowserProfile.driver_within_budget`),
+  which makes the lease-time check a memory watchdog.
+- `max_size` bounds the number of live browsers across all proxies. When the pool is full, an idle
+  session for another proxy is evicted; if every session is leased the caller waits up to `lease_timeout`.
+
+The pool is generic: it only needs a `factory(proxy) -> driver` callable (see `GrokAutomator.open_session`).
+"""
+
+import time
+import logging
+import threading
+from collections import deque
+from contextlib import contextmanager
+from typing import Callable, Optional, Dict, Deque
+
+logger = logging.getLogger("browser_pool")
+
+
+class PoolExhaustedError(Exception):
+    pass
+
+
+class PooledDriver:
+    def __init__(self, driver, proxy: Optional[str]):
+        self.driver = driver
+        self.proxy = proxy
+        self.created_at = time.monotonic()
+        self.last_used = self.created_at
+        self.uses = 0
+
+
+class Lease:
+    """A leased pooled driver. Call `discard()` when the session is broken so it is not reused."""
+
+    def __init__(self, pool: "DriverPool", entry: PooledDriver):
+        self._pool = pool
+        self._entry = entry
+        self._done = False
+        self.broken = False
+
+    @property
+    def driver(self):
+        return self._entry.driver
+
+    @property
+    def proxy(self) -> Optional[str]:
+        return self._entry.proxy
+
+    def discard(self):
+        self.broken = True
+        self.release()
+
+    def release(self):
+        if self._done:
+            return
+        self._done = True
+        self._pool._return(self._entry, broken=self.broken)
+
+
+def default_health_check(driver) -> bool:
+    try:
+        return driver.execute_script("return document.readyState") is not None
+    except Exception:
+        return False
+
+
+class DriverPool:
+    def __init__(self, factory: Callable[[Optional[str]], object], max_size: int = 4, max_uses: int = 50, max_age: float = 1800, lease_timeout: float = 120, health_check: Callable[[object], bool] = default_health_check, quit_driver: Optional[Callable[[object], None]] = None):
+        self.factory = factory
+        self.max_size = max_size
+        self.max_uses = max_uses
+        self.max_age = max_age
+        self.lease_timeout = lease_timeout
+        self.health_check = health_check
+        # quits a driver and frees what belongs to it (default: `driver.quit()`)
+        self.quit_driver = quit_driver
+        self._idle: Dict[str, Deque[PooledDriver]] = {}
+        self._total = 0
+        self._leased = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @staticmethod
+    def _key(proxy: Optional[str]) -> str:
+        return proxy or ""
+
+    def _expired(self, entry: PooledDriver) -> bool:
+        if self.max_uses and entry.uses >= self.max_uses:
+            return True
+        return bool(self.max_age) and time.monotonic() - entry.created_at >= self.max_age
+
+    def _quit(self, entry: PooledDriver):
+        if self.quit_driver is not None:
+            self.quit_driver(entry.driver)
+            return
+        try:
+            entry.driver.quit()
+        except Exception:
+            pass
+
+    def _evict_idle_locked(self) -> Optional[PooledDriver]:
+        """Remove the least recently used idle session of any proxy to make room."""
+        oldest_key, oldest = None, None
+        for key, entries in self._idle.items():
+            if entries and (oldest is None or entries[0].last_used < oldest.last_used):
+                oldest_key, oldest = key, entries[0]
+        if oldest is None:
+            return None
+        self._idle[oldest_key].popleft()
+        self._total -= 1
+        return oldest
+
+    def acquire(self, proxy: Optional[str] = None, timeout: Optional[float] = None) -> Lease:
+        key = self._key(proxy)
+        deadline = time.monotonic() + (self.lease_timeout if timeout is None else timeout)
+        while True:
+            stale = []
+            entry = None
+            create = False
+            with self._cond:
+                if self._closed:
+                    raise PoolExhaustedError("Driver pool is closed")
+                idle = self._idle.get(key)
+                while idle:
+                    candidate = idle.pop()
+                    if self._expired(candidate):
+                        self._total -= 1
+                        stale.append(candidate)
+                        continue
+                    entry = candidate
+                    break
+                if entry is None:
+                    if self._total >= self.max_size:
+                        victim = self._evict_idle_locked()
+                        if victim:
+                            stale.append(victim)
+                    if self._total < self.max_size:
+                        # reserve the slot now, create the browser outside the lock
+                        self._total += 1
+                        create = True
+                if entry is not None or create:
+                    self._leased += 1
+                elif not stale:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolExhaustedError(f"No browser available within timeout (max_size={self.max_size})")
+                    self._cond.wait(remaining)
+                    continue
+            for old in stale:
+                self._quit(old)
+            if entry is not None:
+                if self.health_check(entry.driver):
+                    return Lease(self, entry)
+                logger.warning(f"Evicting unhealthy pooled driver for proxy={proxy}")
+                self._drop(entry)
+                continue
+            if create:
+                try:
+                    driver = self.factory(proxy)
+                except Exception:
+                    with self._cond:
+                        self._total -= 1
+                        self._leased -= 1
+                        self._cond.notify()
+                    raise
+                return Lease(self, PooledDriver(driver, proxy))
+
+    @contextmanager
+    def lease(self, proxy: Optional[str] = None, timeout: Optional[float] = None):
+        handle = self.acquire(proxy, timeout=timeout)
+        try:
+            yield handle
+        except BaseException:
+            handle.discard()
+            raise
+        finally:
+            handle.release()
+
+    def _drop(self, entry: PooledDriver):
+        self._quit(entry)
+        with self._cond:
+            self._total -= 1
+            self._leased -= 1
+            self._cond.notify()
+
+    def _return(self, entry: PooledDriver, broken: bool = False):
+        entry.uses += 1
+        entry.last_used = time.monotonic()
+        if broken or self._closed or self._expired(entry):
+            self._drop(entry)
+            return
+        with self._cond:
+            self._leased -= 1
+            self._idle.setdefault(self._key(entry.proxy), deque()).append(entry)
+            self._cond.notify()
+
+    def warm(self, proxy: Optional[str] = None, count: int = 1):
+        """Pre-launch up to `count` sessions for `proxy` so the first prompts skip boot and login."""
+        leases = []
+        try:
+            for _ in range(count):
+                leases.append(self.acquire(proxy, timeout=0))
+        except PoolExhaustedError:
+            pass
+        finally:
+            for handle in leases:
+                handle.release()
+
+    def prune(self):
+        """Quit idle sessions that hit the recycle policy. Safe to call periodically."""
+        stale = []
+        with self._cond:
+            for entries in self._idle.values():
+                # decide once per entry: an entry aging past max_age mid-split must not land in both lists
+                flags = [(e, self._expired(e)) for e in entries]
+                keep = deque(e for e, expired in flags if not expired)
+                stale.extend(e for e, expired in flags if expired)
+                entries.clear()
+                entries.extend(keep)
+            self._total -= len(stale)
+            if stale:
+                self._cond.notify_all()
+        for entry in stale:
+            self._quit(entry)
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            idle = sum(len(v) for v in self._idle.values())
+            return {"size": self._total, "idle": idle, "leased": self._leased, "max_size": self.max_size}
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            entries = [e for v in self._idle.values() for e in v]
+            self._idle.clear()
+            self._total -= len(entries)
+            self._cond.notify_all()
+        for entry in entries:
+            self._quit(entry)
@@ -0,0 +1,315 @@
+"""
+backend/app/services/browser_profile.py
+
+BrowserProfile
+- One resource profile for every browser the automation starts: the Selenium Chromes of `GrokAutomator`
+  and the Playwright Chromium of `PlaywrightEngine`.
+- Drops requests the flows never need before they hit the network: resource types (images, fonts) via
+  Playwright request routing, URL patterns (analytics and ad hosts, image/font files) via CDP
+  `Network.setBlockedURLs`, which Chromium applies without a round trip to Python.
+- Chrome flags for a smaller footprint: renderer process limit, V8 heap cap, no background services,
+  and a disk cache directory shared across browser restarts (one slot per concurrently running Chrome,
+  Chromium's disk cache must not be opened by two processes at once).
+- Memory watchdog: `memory_of(pid)` sums the proportional set size of a browser's process tree from
+  /proc; the Selenium pool evicts a driver over `memory_budget_mb` on its next lease and the Playwright
+  engine relaunches Chromium once its pages are closed.
+
+Profiles: BROWSER_PROFILE=lite (default) applies the settings below, `full` restores Chrome defaults.
+  BROWSER_BLOCK_TYPES     resource types to abort ("image,font")
+  BROWSER_BLOCK_URLS      extra comma-separated URL patterns to block (analytics/ad hosts are built in)
+  BROWSER_CACHE_DIR       shared disk cache root ("/tmp/browser_cache", empty to disable), BROWSER_CACHE_MB (64)
+  BROWSER_RENDERER_LIMIT  max renderer processes per Chrome (2, 0 = unlimited)
+  BROWSER_JS_HEAP_MB      V8 old-space cap per renderer (0 = Chrome default)
+  BROWSER_MEMORY_BUDGET_MB  recycle a browser above this PSS (1536, 0 = off), BROWSER_WATCHDOG_INTERVAL (30s)
+
+Memory figures come from /proc; elsewhere they are None and the watchdog does nothing.
+"""
+
+import os
+import logging
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..telemetry import REGISTRY
+
+logger = logging.getLogger("browser_profile")
+
+BROWSER_RECYCLES = REGISTRY.counter("browser_recycles_total", "Browsers recycled by the memory watchdog.", ("engine",))
+BLOCKED_REQUESTS = REGISTRY.counter("browser_blocked_requests_total", "Requests aborted by Playwright routing, by resource type.", ("resource_type",))
+
+# trackers and ad networks seen on the Grok, TikTok and Instagram pages; none of them is needed by a flow
+ANALYTICS_PATTERNS = (
+    "*google-analytics.com*",
+    "*googletagmanager.com*",
+    "*doubleclick.net*",
+    "*googlesyndication.com*",
+    "*adservice.google.com*",
+    "*connect.facebook.net*",
+    "*analytics.tiktok.com*",
+    "*mon.tiktokv.com*",
+    "*mcs.tiktokw.us*",
+    "*sentry.io*",
+    "*hotjar.com*",
+    "*segment.io*",
+    "*mixpanel.com*",
+    "*amplitude.com*",
+    "*clarity.ms*",
+)
+TYPE_PATTERNS = {
+    "image": ("*.png*", "*.jpg*", "*.jpeg*", "*.gif*", "*.webp*", "*.avif*", "*.svg*", "*.ico*"),
+    "font": ("*.woff*", "*.woff2*", "*.ttf*", "*.otf*", "*.eot*"),
+    "media": ("*.mp3*", "*.m4a*", "*.webm*"),
+}
+# Chrome services that run in the background of an automated browser for nothing
+DISABLED_FEATURES = "Translate,OptimizationHints,MediaRouter,InterestFeedContentSuggestions,AutofillServerCommunication"
+
+
+def _split(value: str) -> List[str]:
+    return [v.strip() for v in value.split(",") if v.strip()]
+
+
+def _children() -> Dict[int, List[int]]:
+    tree: Dict[int, List[int]] = {}
+    for name in os.listdir("/proc"):
+        if not name.isdigit():
+            continue
+        try:
+            with open(f"/proc/{name}/stat", "rb") as fh:
+                # the command name may contain spaces; the fields after it are fixed
+                fields = fh.read().rsplit(b")", 1)[1].split()
+        except OSError:
+            continue
+        if fields[0] != b"Z":
+            tree.setdefault(int(fields[1]), []).append(int(name))
+    return tree
+
+
+def _cmdline(pid: int) -> str:
+    try:
+        with open(f"/proc/{pid}/cmdline", "rb") as fh:
+            return fh.read().replace(b"\0", b" ").decode("utf-8", "replace")
+    except OSError:
+        return ""
+
+
+def _pss(pid: int) -> int:
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as fh:
+            for line in fh:
+                if line.startswith("Pss:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        with open(f"/proc/{pid}/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
+
+
+def descendants(pid: int, tree: Optional[Dict[int, List[int]]] = None) -> List[int]:
+    tree = _children() if tree is None else tree
+    found, stack = [], [pid]
+    while stack:
+        for child in tree.get(stack.pop(), ()):
+            found.append(child)
+            stack.append(child)
+    return found
+
+
+def memory_of(pid: Optional[int]) -> Optional[int]:
+    """Bytes (PSS) used by `pid` and all its descendants; None without /proc or pid."""
+    if not pid or not os.path.isdir("/proc"):
+        return None
+    return sum(_pss(p) for p in [pid] + descendants(pid))
+
+
+def playwright_memory() -> Optional[int]:
+    """Bytes used by the Chromium processes of this process's Playwright driver(s)."""
+    if not os.path.isdir("/proc"):
+        return None
+    tree = _children()
+    drivers = [p for p in tree.get(os.getpid(), ()) if "playwright" in _cmdline(p)]
+    return sum(_pss(p) for d in drivers for p in descendants(d, tree))
+
+
+def driver_pid(driver) -> Optional[int]:
+    """Pid of the Chrome behind a Selenium driver: the one undetected_chromedriver started, else chromedriver (its parent)."""
+    service = getattr(driver, "service", None)
+    return getattr(driver, "browser_pid", None) or getattr(getattr(service, "process", None), "pid", None)
+
+
+def driver_memory(driver) -> Optional[int]:
+    """Bytes used by a Selenium driver: chromedriver and Chrome with all their children."""
+    service = getattr(driver, "service", None)
+    roots = {getattr(getattr(service, "process", None), "pid", None), getattr(driver, "browser_pid", None)} - {None}
+    if not roots or not os.path.isdir("/proc"):
+        return None
+    tree = _children()
+    pids = set(roots)
+    for root in roots:
+        pids.update(descendants(root, tree))
+    return sum(_pss(p) for p in pids)
+
+
+class BrowserProfile:
+    def __init__(self, name: str = "lite", block_types=("image", "font"), block_urls=(), cache_dir: Optional[str] = None, cache_mb: int = 64, renderer_limit: int = 2, js_heap_mb: int = 0, memory_budget_mb: int = 1536, watchdog_interval: float = 30):
+        self.name = name
+        self.block_types = frozenset(block_types)
+        self.block_urls = list(block_urls)
+        self.cache_dir = cache_dir or None
+        self.cache_mb = cache_mb
+        self.renderer_limit = renderer_limit
+        self.js_heap_mb = js_heap_mb
+        self.memory_budget_mb = memory_budget_mb
+        self.watchdog_interval = watchdog_interval
+        # cache slot -> pid of the Chrome using it (None while it is starting)
+        self._slots: Dict[int, Optional[int]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def full(cls) -> "BrowserProfile":
+        """Chrome defaults: nothing blocked, no limits, no watchdog."""
+        return cls("full", block_types=(), cache_dir=None, renderer_limit=0, js_heap_mb=0, memory_budget_mb=0)
+
+    @property
+    def blocked_url_patterns(self) -> List[str]:
+        if self.name == "full":
+            return list(self.block_urls)
+        patterns = list(ANALYTICS_PATTERNS) + self.block_urls
+        for kind in self.block_types:
+            patterns.extend(TYPE_PATTERNS.get(kind, ()))
+        return patterns
+
+    def chrome_args(self, cache_dir: Optional[str] = None) -> List[str]:
+        """Command-line switches shared by Selenium and Playwright launches."""
+        if self.name == "full":
+            return []
+        args = [
+            "--disable-extensions",
+            "--disable-background-networking",
+            "--disable-component-update",
+            "--disable-default-apps",
+            "--disable-sync",
+            "--metrics-recording-only",
+            "--mute-audio",
+            "--no-first-run",
+            f"--disable-features={DISABLED_FEATURES}",
+        ]
+        if self.renderer_limit:
+            args.append(f"--renderer-process-limit={self.renderer_limit}")
+        if self.js_heap_mb:
+            args.append(f"--js-flags=--max-old-space-size={self.js_heap_mb}")
+        if "image" in self.block_types:
+            args.append("--blink-settings=imagesEnabled=false")
+        if cache_dir:
+            args += [f"--disk-cache-dir={cache_dir}", f"--disk-cache-size={self.cache_mb * 1024 * 1024}"]
+        return args
+
+    # --- shared disk cache (Selenium; Playwright contexts keep their cache in memory) ---
+    def acquire_cache_dir(self) -> Optional[str]:
+        """Reserve a cache slot for a Chrome about to start; slots of Chromes that exited are reused."""
+        if not self.cache_dir:
+            return None
+        with self._lock:
+            for slot, pid in list(self._slots.items()):
+                if pid is not None and not os.path.exists(f"/proc/{pid}"):
+                    del self._slots[slot]
+            slot = next(i for i in range(len(self._slots) + 1) if i not in self._slots)
+            self._slots[slot] = None
+        path = os.path.join(self.cache_dir, str(slot))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def bind_cache_dir(self, path: Optional[str], pid: Optional[int]):
+        if path:
+            with self._lock:
+                self._slots[int(os.path.basename(path))] = pid
+
+    def release_cache_dir(self, path: Optional[str]):
+        if path:
+            with self._lock:
+                self._slots.pop(int(os.path.basename(path)), None)
+
+    # --- Selenium ---
+    def apply_selenium(self, driver):
+        """Install the CDP URL block list on a started Chrome driver."""
+        patterns = self.blocked_url_patterns
+        if not patterns:
+            return
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+        except Exception as e:
+            logger.warning(f"Could not install URL block list: {e}")
+
+    def over_budget(self, used: Optional[int]) -> bool:
+        return bool(self.memory_budget_mb) and used is not None and used > self.memory_budget_mb * 1024 * 1024
+
+    def driver_within_budget(self, driver) -> bool:
+        """Pool health check part: False once the driver's process tree exceeds the memory budget."""
+        used = driver_memory(driver)
+        if self.over_budget(used):
+            BROWSER_RECYCLES.inc(engine="selenium")
+            logger.info(f"Recycling Chrome using {used / 1024 ** 2:.0f} MB (budget {self.memory_budget_mb} MB)")
+            return False
+        return True
+
+    # --- Playwright ---
+    async def apply_playwright_context(self, context):
+        """Abort blocked resource types for every request of `context`."""
+        if not self.block_types:
+            return
+        types = self.block_types
+
+        async def _route(route):
+            resource_type = route.request.resource_type
+            if resource_type in types:
+                BLOCKED_REQUESTS.inc(resource_type=resource_type)
+                await route.abort()
+            else:
+                await route.fallback()
+
+        await context.route("**/*", _route)
+
+    async def apply_playwright_page(self, context, page):
+        """Block URL patterns in the browser itself via CDP (no per-request trip to Python)."""
+        patterns = self.blocked_url_patterns
+        if not patterns:
+            return
+        try:
+            cdp = await context.new_cdp_session(page)
+            await cdp.send("Network.enable")
+            await cdp.send("Network.setBlockedURLs", {"urls": patterns})
+        except Exception as e:
+            logger.warning(f"Could not install URL block list: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            slots = len(self._slots)
+        return {"profile": self.name, "blocked_types": sorted(self.block_types), "blocked_patterns": len(self.blocked_url_patterns), "cache_slots": slots, "memory_budget_mb": self.memory_budget_mb}
+
+
+_profile: Optional[BrowserProfile] = None
+_profile_lock = threading.Lock()
+
+
+def get_browser_profile() -> BrowserProfile:
+    """Process-wide profile from BROWSER_PROFILE and the BROWSER_* settings (see module docstring)."""
+    global _profile
+    with _profile_lock:
+        if _profile is None:
+            if os.getenv("BROWSER_PROFILE", "lite").lower() == "full":
+                _profile = BrowserProfile.full()
+            else:
+                _profile = BrowserProfile(
+                    block_types=_split(os.getenv("BROWSER_BLOCK_TYPES", "image,font")),
+                    block_urls=_split(os.getenv("BROWSER_BLOCK_URLS", "")),
+                    cache_dir=os.getenv("BROWSER_CACHE_DIR", "/tmp/browser_cache"),
+                    cache_mb=int(os.getenv("BROWSER_CACHE_MB", "64")),
+                    renderer_limit=int(os.getenv("BROWSER_RENDERER_LIMIT", "2")),
+                    js_heap_mb=int(os.getenv("BROWSER_JS_HEAP_MB", "0")),
+                    memory_budget_mb=int(os.getenv("BROWSER_MEMORY_BUDGET_MB", "1536")),
+                    watchdog_interval=float(os.getenv("BROWSER_WATCHDOG_INTERVAL", "30")),
+                )
+        return _profile
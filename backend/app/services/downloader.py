@@ -0,0 +1,239 @@
+"""
+backend/app/services/downloader.py
+
+DownloadManager
+- Downloads generated media on a background thread pool so browser sessions can be released as soon as the
+  media URL is known (`submit()` returns a Future; `download()` is the blocking shortcut).
+- One pooled `requests.Session` (keep-alive connections shared by all downloads and segments).
+- Adaptive chunk sizes: reads start at 64 KiB and grow towards 4 MiB while the link keeps up, shrinking again
+  when a single read gets slow.
+- Resumes interrupted transfers with HTTP Range requests instead of starting over.
+- Large files on servers that advertise `Accept-Ranges: bytes` are fetched as parallel range segments.
+- Data is written to a `.part` file and atomically renamed to `<sha256><suffix>`, so readers never see partial
+  files, two results can never overwrite each other, and downloading the same content twice keeps one copy.
+"""
+
+import os
+import time
+import uuid
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future
+from typing import Optional, Dict, Tuple, Callable, Any
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import HTTPError as Urllib3Error
+
+from ..telemetry import record_retry
+
+logger = logging.getLogger("downloader")
+
+# errors worth resuming after: dropped connections and timeouts surface from r.raw.read() as urllib3 errors
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError, Urllib3Error, OSError)
+
+MIN_CHUNK = 64 * 1024
+MAX_CHUNK = 4 * 1024 * 1024
+
+
+class DownloadError(Exception):
+    pass
+
+
+class _AdaptiveChunk:
+    """Double the read size while reads are fast, halve it when one takes too long."""
+
+    def __init__(self, size: int = MIN_CHUNK):
+        self.size = size
+
+    def update(self, elapsed: float):
+        if elapsed < 0.05:
+            self.size = min(self.size * 2, MAX_CHUNK)
+        elif elapsed > 0.5:
+            self.size = max(self.size // 2, MIN_CHUNK)
+
+
+class DownloadManager:
+    def __init__(self, download_dir: str, workers: int = 4, segments: int = 4, segment_threshold: int = 32 * 1024 * 1024, max_retries: int = 5, timeout: float = 30):
+        self.download_dir = download_dir
+        os.makedirs(download_dir, exist_ok=True)
+        self.segments = max(1, segments)
+        self.segment_threshold = segment_threshold
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=workers, pool_maxsize=workers * self.segments)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="download")
+        self._segment_executor = ThreadPoolExecutor(max_workers=workers * self.segments, thread_name_prefix="download-seg")
+
+    def submit(self, url: str, suffix: str = ".mp4", then: Optional[Callable[[str], Any]] = None) -> Future:
+        """Start downloading `url` in the background; the Future resolves to the final local path.
+
+        `then(path)` runs on the download thread afterwards and its return value becomes the result.
+        """
+        if then is None:
+            return self._executor.submit(self.download, url, suffix)
+        return self._executor.submit(lambda: then(self.download(url, suffix)))
+
+    def download(self, url: str, suffix: str = ".mp4") -> str:
+        tmp = os.path.join(self.download_dir, f".{uuid.uuid4().hex}.part")
+        try:
+            size, ranges = self._probe(url)
+            if ranges and size and size >= self.segment_threshold and self.segments > 1:
+                self._download_segments(url, tmp, size)
+                digest = self._hash_file(tmp)
+            else:
+                digest = self._download_stream(url, tmp)
+            final = os.path.join(self.download_dir, f"{digest}{suffix}")
+            if os.path.exists(final):
+                # identical content was downloaded before: keep the existing copy
+                os.remove(tmp)
+            else:
+                os.replace(tmp, final)
+            return final
+        except Exception:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def _probe(self, url: str) -> Tuple[Optional[int], bool]:
+        try:
+            r = self.session.head(url, allow_redirects=True, timeout=self.timeout)
+            if r.status_code >= 400:
+                return None, False
+            length = r.headers.get("Content-Length")
+            return (int(length) if length and length.isdigit() else None), r.headers.get("Accept-Ranges", "").lower() == "bytes"
+        except requests.RequestException:
+            # some signed media URLs reject HEAD; a plain streamed GET still works
+            return None, False
+
+    @staticmethod
+    def _raise_for_status(r: requests.Response):
+        if r.status_code in (408, 429) or r.status_code >= 500:
+            raise requests.ConnectionError(f"HTTP {r.status_code}")
+        if r.status_code >= 400:
+            # permanent (expired URL, forbidden, not found): retrying cannot help
+            raise DownloadError(f"HTTP {r.status_code} for {r.url}")
+
+    def _backoff(self, attempt: int):
+        delay = min(2 ** attempt * 0.5, 10)
+        record_retry("download", delay)
+        time.sleep(delay)
+
+    def _download_stream(self, url: str, path: str) -> str:
+        """Single streamed GET with Range resume; returns the sha256 of the content."""
+        digest = hashlib.sha256()
+        written = 0
+        attempt = 0
+        chunk = _AdaptiveChunk()
+        with open(path, "wb") as fh:
+            while True:
+                headers = {"Range": f"bytes={written}-"} if written else {}
+                try:
+                    with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as r:
+                        self._raise_for_status(r)
+                        if written and r.status_code != 206:
+                            # server ignored the Range header: start over
+                            fh.seek(0)
+                            fh.truncate()
+                            digest = hashlib.sha256()
+                            written = 0
+                        while True:
+                            mark = time.monotonic()
+                            data = r.raw.read(chunk.size, decode_content=True)
+                            if not data:
+                                break
+                            fh.write(data)
+                            digest.update(data)
+                            written += len(data)
+                            chunk.update(time.monotonic() - mark)
+                    return digest.hexdigest()
+                except TRANSIENT_ERRORS as e:
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise DownloadError(f"Download of {url} failed after {attempt} attempts at byte {written}: {e}")
+                    logger.warning(f"Download interrupted at byte {written} ({e}); resuming")
+                    self._backoff(attempt)
+
+    def _fetch_range(self, url: str, path: str, start: int, end: int):
+        """Fetch bytes [start, end] into the same offsets of `path`, resuming inside the range on errors."""
+        position = start
+        attempt = 0
+        chunk = _AdaptiveChunk()
+        fd = os.open(path, os.O_WRONLY)
+        try:
+            while position <= end:
+                try:
+                    headers = {"Range": f"bytes={position}-{end}"}
+                    with self.session.get(url, stream=True, timeout=self.timeout, headers=headers) as r:
+                        self._raise_for_status(r)
+                        if r.status_code != 206:
+                            raise DownloadError(f"Server did not honour range request (HTTP {r.status_code})")
+                        while position <= end:
+                            mark = time.monotonic()
+                            data = r.raw.read(min(chunk.size, end - position + 1), decode_content=True)
+                            if not data:
+                                break
+                            os.pwrite(fd, data, position)
+                            position += len(data)
+                            chunk.update(time.monotonic() - mark)
+                    if position <= end:
+                        raise requests.ConnectionError(f"Segment ended early at byte {position}")
+                except TRANSIENT_ERRORS as e:
+                    attempt += 1
+                    if attempt > self.max_retries:
+                        raise DownloadError(f"Segment {start}-{end} of {url} failed: {e}")
+                    self._backoff(attempt)
+        finally:
+            os.close(fd)
+
+    def _download_segments(self, url: str, path: str, size: int):
+        with open(path, "wb") as fh:
+            fh.truncate(size)
+        step = -(-size // self.segments)
+        futures = [
+            self._segment_executor.submit(self._fetch_range, url, path, start, min(start + step, size) - 1)
+            for start in range(0, size, step)
+        ]
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def _hash_file(path: str) -> str:
+        digest = hashlib.sha256()
+        with open(path, "rb") as fh:
+            for block in iter(lambda: fh.read(MAX_CHUNK), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        self._segment_executor.shutdown(wait=True)
+        self.session.close()
+
+
+_managers: Dict[str, DownloadManager] = {}
+_managers_lock = threading.Lock()
+
+
+def get_download_manager(download_dir: str) -> DownloadManager:
+    """Process-wide manager per target directory.
+
+    DOWNLOAD_WORKERS (4), DOWNLOAD_SEGMENTS (4), DOWNLOAD_SEGMENT_THRESHOLD_MB (32), DOWNLOAD_RETRIES (5).
+    """
+    key = os.path.abspath(download_dir)
+    with _managers_lock:
+        manager = _managers.get(key)
+        if manager is None:
+            manager = _managers[key] = DownloadManager(
+                key,
+                workers=int(os.getenv("DOWNLOAD_WORKERS", "4")),
+                segments=int(os.getenv("DOWNLOAD_SEGMENTS", "4")),
+                segment_threshold=int(float(os.getenv("DOWNLOAD_SEGMENT_THRESHOLD_MB", "32")) * 1024 * 1024),
+                max_retries=int(os.getenv("DOWNLOAD_RETRIES", "5")),
+            )
+        return manager
@@ -5,6 +5,10 @@ GrokAutomator
 - Uses undetected_chromedriver + Selenium to login to Grok web interface and send "Imagine" prompts.
 - IMPORTANT: This automates a third-party web interface. It does NOT attempt to bypass CAPTCHAs or other protections.
 - The class is defensive: detects CAPTCHAs, applies exponential backoff, rotates proxies if provided, and reports clear errors.
+- Captcha, block and logout pages are recognised by the shared `page_probe` script (one round-trip per page).
+- Proxies are picked by the shared `ProxyManager` (health score, cooldown after 429/CAPTCHA, per-proxy rate limit).
+- Pass `pool=get_driver_pool()` to lease warm, already-logged-in browsers instead of starting Chrome and
+  logging in for every prompt (see `browser_pool.DriverPool`).
 
 Self-Correction tests (examples in docstrings):
 - If login fails due to incorrect credentials -> raise AuthenticationError (caller should alert user and stop retries).
@@ -20,13 +24,20 @@ import os
 import time
 import json
 import logging
-from typing import Optional, Dict
+import threading
+from typing import Callable, Optional, Dict
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import TimeoutException, NoSuchElementException, WebDriverException
 import undetected_chromedriver as uc
-import requests
+from .browser_pool import DriverPool, default_health_check
+from .browser_profile import BrowserProfile, driver_pid, get_browser_profile
+from .downloader import get_download_manager
+from .media_store import MediaStore, get_media_store
+from .page_probe import BLOCKED, CAPTCHA, LOGGED_OUT, PageStateError, probe_driver
+from .proxy_manager import ProxyManager, get_proxy_manager
+from ..telemetry import record_phase, record_retry, span
 
 logger = logging.getLogger("grok_automator")
 
@@ -36,244 +47,452 @@ class AuthenticationError(Exception):
 class CaptchaError(Exception):
     pass
 
+# Resolves with the media URL the moment `a.download-link[href]` or a remote `video` source shows up,
+# or with null after `timeoutMs`. Driven by a MutationObserver, so there is no client-side polling.
+# Shared by the Selenium flow (execute_async_script) and the Playwright flow (page.evaluate).
+MEDIA_READY_JS = """
+(timeoutMs) => new Promise((resolve) => {
+    const find = () => {
+        const link = document.querySelector('a.download-link');
+        if (link && link.href) return link.href;
+        const video = document.querySelector('video');
+        if (video) {
+            const src = video.currentSrc || video.src || (video.querySelector('source[src]') || {}).src;
+            if (src && src.startsWith('http')) return src;
+        }
+        return null;
+    };
+    const first = find();
+    if (first) { resolve(first); return; }
+    let timer = null;
+    const observer = new MutationObserver(() => {
+        const url = find();
+        if (url) { observer.disconnect(); clearTimeout(timer); resolve(url); }
+    });
+    observer.observe(document.documentElement, {childList: true, subtree: true, attributes: true, attributeFilter: ['href', 'src']});
+    timer = setTimeout(() => { observer.disconnect(); resolve(find()); }, timeoutMs);
+})
+"""
+
+_SELENIUM_MEDIA_READY = "const done = arguments[arguments.length - 1]; (" + MEDIA_READY_JS + ")(arguments[0]).then(done);"
+
+
+def generation_timeout(timeout: Optional[int] = None) -> int:
+    """Explicit timeout, else GROK_GENERATION_TIMEOUT (seconds), else 300."""
+    return int(timeout or os.getenv("GROK_GENERATION_TIMEOUT", "300"))
+
+
+def report_proxy_outcome(manager: ProxyManager, proxy: Optional[str], started: float, exc: Optional[BaseException] = None):
+    """Feed the result of one Grok browser attempt (started at `started`, monotonic) back to the ProxyManager."""
+    elapsed = time.monotonic() - started
+    if exc is None:
+        manager.report_success(proxy, elapsed)
+    elif isinstance(exc, AuthenticationError):
+        # bad credentials say nothing about the proxy
+        manager.release(proxy)
+    elif isinstance(exc, CaptchaError):
+        # a challenge page usually means the egress IP is flagged: cool it down like a 429
+        manager.report_failure(proxy, rate_limited=True, latency=elapsed)
+    else:
+        manager.report_exception(proxy, exc, elapsed)
+
 class GrokAutomator:
-    def __init__(self, username: str = None, password: str = None, headless: bool = True, proxies: Optional[list] = None, download_dir: Optional[str] = None):
+    def __init__(self, username: str = None, password: str = None, headless: bool = True, proxies: Optional[list] = None, download_dir: Optional[str] = None, pool: Optional[DriverPool] = None, proxy_manager: Optional[ProxyManager] = None, media_store: Optional[MediaStore] = None, profile: Optional[BrowserProfile] = None):
         self.username = username or os.getenv("GROK_USERNAME")
         self.password = password or os.getenv("GROK_PASSWORD")
         self.headless = headless
         self.proxies = proxies or []
+        self.pool = pool
+        self.proxy_manager = proxy_manager or get_proxy_manager()
         self.driver = None
         self.download_dir = download_dir or os.getenv("GROK_DOWNLOAD_DIR") or "/tmp/grok_downloads"
         os.makedirs(self.download_dir, exist_ok=True)
+        self.downloads = get_download_manager(self.download_dir)
+        self.media = media_store or get_media_store()
+        self.profile = profile or get_browser_profile()
 
-    def _build_options(self, proxy: Optional[str] = None):
+    def _build_options(self, proxy: Optional[str] = None, cache_dir: Optional[str] = None):
         options = uc.ChromeOptions()
         if self.headless:
             options.add_argument("--headless=new")
             options.add_argument("--disable-gpu")
         options.add_argument("--no-sandbox")
         options.add_argument("--disable-dev-shm-usage")
+        for arg in self.profile.chrome_args(cache_dir):
+            options.add_argument(arg)
         # set download directory
         prefs = {"download.default_directory": self.download_dir}
+        if "image" in self.profile.block_types:
+            prefs["profile.managed_default_content_settings.images"] = 2
         options.add_experimental_option("prefs", prefs)
         if proxy:
             options.add_argument(f"--proxy-server={proxy}")
         return options
 
     def _start_driver(self, proxy: Optional[str] = None):
-        opts = self._build_options(proxy=proxy)
+        cache_dir = self.profile.acquire_cache_dir()
+        opts = self._build_options(proxy=proxy, cache_dir=cache_dir)
         try:
-            driver = uc.Chrome(options=opts)
-            driver.set_page_load_timeout(60)
-            self.driver = driver
-            return driver
+            with span("driver_start", headless=self.headless):
+                driver = uc.Chrome(options=opts)
         except WebDriverException as e:
+            self.profile.release_cache_dir(cache_dir)
             logger.exception("Failed to start webdriver")
             raise
+        driver.profile_cache_dir = cache_dir
+        self.profile.bind_cache_dir(cache_dir, driver_pid(driver))
+        self.profile.apply_selenium(driver)
+        driver.set_page_load_timeout(60)
+        self.driver = driver
+        return driver
+
+    def quit_driver(self, driver):
+        """Quit `driver` and free its cache slot; also the `DriverPool` quit hook."""
+        try:
+            driver.quit()
+        except Exception:
+            pass
+        self.profile.release_cache_dir(getattr(driver, "profile_cache_dir", None))
+
+    def session_healthy(self, driver) -> bool:
+        """Pool health check: responsive and within the profile's memory budget."""
+        return default_health_check(driver) and self.profile.driver_within_budget(driver)
+
+    def _check_page(self, driver, label: str, session: bool = False):
+        """Probe the loaded page once (see `page_probe`): a challenge raises CaptchaError with a debug
+        screenshot, a block or logout page raises a retryable PageStateError."""
+        state, detail = probe_driver(driver, "grok", label, session=session)
+        if state == CAPTCHA:
+            path = os.path.join(self.download_dir, f"captcha_{label}_{int(time.time())}.png")
+            driver.save_screenshot(path)
+            raise CaptchaError(f"Captcha detected on {label} page ({detail}); screenshot: {path}")
+        if state in (BLOCKED, LOGGED_OUT):
+            raise PageStateError(state, detail, label)
+
+    def _acquire_proxy(self, tried=()) -> Optional[str]:
+        """Best-scoring configured proxy from the shared ProxyManager (None when no proxies are set)."""
+        if not self.proxies:
+            return None
+        return self.proxy_manager.acquire(self.proxies, exclude=tried)
+
+    def _report_proxy(self, proxy: Optional[str], started: float, exc: Optional[BaseException] = None):
+        report_proxy_outcome(self.proxy_manager, proxy, started, exc)
+
+    def _login_on(self, driver, timeout: int = 30):
+        """Run the login form on an already started driver. Raises AuthenticationError / CaptchaError."""
+        with span("login", platform="grok"):
+            self._submit_login(driver, timeout)
+
+    def _submit_login(self, driver, timeout: int):
+        # Navigate to Grok login (placeholder URL - replace with actual provider URL)
+        login_url = os.getenv("GROK_LOGIN_URL", "https://grok.com/login")
+        driver.get(login_url)
+        self._check_page(driver, "login")
+
+        # examples: find username / password fields - these selectors must be adapted to actual page
+        try:
+            user_el = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.NAME, "email")))
+            pass_el = driver.find_element(By.NAME, "password")
+        except TimeoutException:
+            # fallback selectors
+            user_el = driver.find_element(By.CSS_SELECTOR, "input[type=email]")
+            pass_el = driver.find_element(By.CSS_SELECTOR, "input[type=password]")
+
+        user_el.clear(); user_el.send_keys(self.username)
+        pass_el.clear(); pass_el.send_keys(self.password)
 
-    def _detect_captcha(self) -> bool:
-        # Basic heuristics: look for elements often used in captcha flows
-        if not self.driver:
-            return False
+        # try submit - common selectors
         try:
-            # Common selectors for captcha frames
-            frames = self.driver.find_elements(By.TAG_NAME, "iframe")
-            for f in frames:
-                src = f.get_attribute("src")
-                if src and ("/recaptcha/" in src or "captcha" in src.lower()):
-                    return True
-            # textual heuristics
-            body_text = self.driver.find_element(By.TAG_NAME, "body").text.lower()
-            if "verify" in body_text and ("bot" in body_text or "captcha" in body_text):
-                return True
+            submit = driver.find_element(By.CSS_SELECTOR, "button[type=submit]")
+            submit.click()
+        except NoSuchElementException:
+            pass
+
+        # wait for logged-in indicator
+        try:
+            WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, "nav")))
+        except TimeoutException:
+            # check for obvious login error text
+            body = driver.find_element(By.TAG_NAME, "body").text.lower()
+            if "incorrect" in body or "invalid" in body:
+                raise AuthenticationError("Invalid Grok credentials")
+            self._check_page(driver, "postlogin")
+            raise TimeoutException("Login confirm timeout")
+
+    def open_session(self, proxy: Optional[str] = None, timeout: int = 30):
+        """Start a browser for `proxy`, log it in when credentials are set and hand it to the caller.
+
+        Used as the `DriverPool` factory; the returned driver is owned by the caller, not by this automator.
+        """
+        driver = self._start_driver(proxy=proxy)
+        self.driver = None
+        try:
+            if self.username and self.password:
+                self._login_on(driver, timeout=timeout)
+                logger.info(f"Pooled Grok session logged in (proxy={proxy})")
         except Exception:
-            return False
-        return False
+            self.quit_driver(driver)
+            raise
+        return driver
 
     def login(self, max_attempts: int = 3, timeout: int = 30) -> bool:
         """Login to Grok. Raises AuthenticationError on bad credentials, CaptchaError if captcha detected.
 
         Self-correction: if login receives 401/invalid credentials, stop and raise AuthenticationError. If site responds with rate limit/timeouts, rotate proxies and retry.
+        With a pool attached this is a no-op: pooled sessions are logged in when they are created.
         """
+        if self.pool:
+            return True
         attempts = 0
         last_exc = None
+        tried = set()
         while attempts < max_attempts:
             attempts += 1
-            proxy = None
-            if self.proxies:
-                proxy = self.proxies[(attempts - 1) % len(self.proxies)]
+            proxy = self._acquire_proxy(tried)
+            tried.add(proxy)
+            started = time.monotonic()
             try:
                 driver = self._start_driver(proxy=proxy)
-                # Navigate to Grok login (placeholder URL - replace with actual provider URL)
-                login_url = os.getenv("GROK_LOGIN_URL", "https://grok.com/login")
-                driver.get(login_url)
-                if self._detect_captcha():
-                    # save screenshot for debugging
-                    path = os.path.join(self.download_dir, f"captcha_login_{int(time.time())}.png")
-                    driver.save_screenshot(path)
-                    raise CaptchaError(f"Captcha detected on login page. Screenshot saved: {path}")
-
-                # examples: find username / password fields - these selectors must be adapted to actual page
-                try:
-                    user_el = WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.NAME, "email")))
-                    pass_el = driver.find_element(By.NAME, "password")
-                except TimeoutException:
-                    # fallback selectors
-                    user_el = driver.find_element(By.CSS_SELECTOR, "input[type=email]")
-                    pass_el = driver.find_element(By.CSS_SELECTOR, "input[type=password]")
-
-                user_el.clear(); user_el.send_keys(self.username)
-                pass_el.clear(); pass_el.send_keys(self.password)
-
-                # try submit - common selectors
-                try:
-                    submit = driver.find_element(By.CSS_SELECTOR, "button[type=submit]")
-                    submit.click()
-                except NoSuchElementException:
-                    pass
-
-                # wait for logged-in indicator
-                try:
-                    WebDriverWait(driver, timeout).until(EC.presence_of_element_located((By.CSS_SELECTOR, "nav")))
-                except TimeoutException:
-                    # check for obvious login error text
-                    body = driver.find_element(By.TAG_NAME, "body").text.lower()
-                    if "incorrect" in body or "invalid" in body:
-                        raise AuthenticationError("Invalid Grok credentials")
-                    if self._detect_captcha():
-                        path = os.path.join(self.download_dir, f"captcha_postlogin_{int(time.time())}.png")
-                        driver.save_screenshot(path)
-                        raise CaptchaError(f"Captcha after login attempt; screenshot: {path}")
-                    raise TimeoutException("Login confirm timeout")
-
+                self._login_on(driver, timeout=timeout)
+                self._report_proxy(proxy, started)
                 logger.info("Logged into Grok successfully")
                 return True
-            except AuthenticationError:
+            except AuthenticationError as e:
                 # do not retry on auth error
+                self._report_proxy(proxy, started, e)
                 raise
-            except CaptchaError:
+            except CaptchaError as e:
                 # bail out - can't bypass
+                self._report_proxy(proxy, started, e)
                 raise
             except Exception as e:
                 last_exc = e
+                self._report_proxy(proxy, started, e)
                 logger.warning(f"Login attempt {attempts} failed with proxy={proxy}: {e}")
+                backoff = 0 if self.proxies else min(2 ** attempts, 20)
+                if attempts < max_attempts:
+                    record_retry("grok_login", backoff)
                 # close driver and retry with next proxy/backoff
-                try:
-                    if self.driver:
-                        self.driver.quit()
-                except Exception:
-                    pass
-                time.sleep(min(2 ** attempts, 20))
+                if self.driver:
+                    self.quit_driver(self.driver)
+                self.driver = None
+                if backoff:
+                    # with proxies the manager already steers the next attempt away from the failing one
+                    time.sleep(backoff)
                 continue
         raise Exception(f"Grok login failed after {max_attempts} attempts. Last error: {last_exc}")
 
-    def imagine(self, prompt: str, timeout: int = 300, poll_interval: int = 5) -> Dict[str, Optional[str]]:
-        """Send a prompt to Grok Imagine, wait for result, and return {'task_id':..., 'download_url':...}
+    def _wait_for_media(self, driver, timeout: int, poll_interval: int) -> Optional[str]:
+        """Block until the page exposes a media URL, using the MutationObserver script.
+
+        Falls back to polling every `poll_interval` seconds for the remaining time if the script
+        cannot run (e.g. the page navigated while waiting).
+        """
+        started = time.monotonic()
+        try:
+            driver.set_script_timeout(timeout + 10)
+            return driver.execute_async_script(_SELENIUM_MEDIA_READY, int(timeout * 1000))
+        except TimeoutException:
+            return None
+        except WebDriverException as e:
+            logger.warning(f"Media observer failed, falling back to polling: {e}")
+
+        deadline = started + timeout
+        while time.monotonic() < deadline:
+            # provider-specific selectors - adapt as needed
+            try:
+                download_url = driver.find_element(By.CSS_SELECTOR, "a.download-link").get_attribute("href")
+                if download_url:
+                    return download_url
+            except Exception:
+                pass
+            try:
+                src = driver.find_element(By.TAG_NAME, "video").get_attribute("src")
+                if src and src.startswith("http"):
+                    return src
+            except Exception:
+                pass
+            time.sleep(poll_interval)
+        return None
+
+    def _generate(self, driver, prompt: str, timeout: int, poll_interval: int, timings: Dict[str, float], progress: Optional[Callable] = None) -> str:
+        """Submit `prompt` on the imagine page and wait for the media URL, recording per-phase seconds in `timings`."""
+        progress = progress or (lambda step, artifacts=None: None)
+        mark = time.monotonic()
+        imagine_url = os.getenv("GROK_IMAGINE_URL", "https://grok.com/imagine")
+        driver.get(imagine_url)
+        self._check_page(driver, "imagine", session=bool(self.username and self.password))
+        timings["page_load"] = round(time.monotonic() - mark, 3)
+        record_phase("page_load", timings["page_load"])
+        progress("page_load")
+
+        # find prompt input and submit
+        mark = time.monotonic()
+        try:
+            input_el = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "textarea[placeholder*='Describe']")))
+        except TimeoutException:
+            # fallback heuristics
+            input_el = driver.find_element(By.TAG_NAME, "textarea")
+
+        input_el.clear(); input_el.send_keys(prompt)
+
+        # find generate button
+        try:
+            gen_btn = driver.find_element(By.XPATH, "//button[contains(., 'Imagine') or contains(., 'Generate')]")
+            gen_btn.click()
+        except Exception:
+            # try alternative: press Enter
+            input_el.send_keys("\n")
+        timings["prompt_submit"] = round(time.monotonic() - mark, 3)
+        record_phase("prompt_submit", timings["prompt_submit"])
+        progress("prompt_submit")
+
+        # Wait for result: download link or media element - provider dependent
+        mark = time.monotonic()
+        download_url = self._wait_for_media(driver, timeout, poll_interval)
+        timings["generation"] = round(time.monotonic() - mark, 3)
+        record_phase("generation", timings["generation"], "ok" if download_url else "timeout")
+        if not download_url:
+            raise TimeoutException("Imagine generation timed out or no download link found")
+        progress("generation", {"download_url": download_url})
+        return download_url
+
+    def _store(self, path: str) -> str:
+        # downloads are named by content hash already, so adopting them is a rename
+        return self.media.put_download(path)["path"]
+
+    def _download(self, download_url: str) -> Optional[str]:
+        try:
+            return self.downloads.submit(download_url, then=self._store).result()
+        except Exception as e:
+            logger.warning(f"Failed to download media from {download_url}: {e}")
+            return None
+
+    def imagine(self, prompt: str, timeout: Optional[int] = None, poll_interval: int = 5, wait_for_download: bool = True, progress: Optional[Callable] = None) -> Dict[str, Optional[str]]:
+        """Send a prompt to Grok Imagine, wait for result, and return {'download_url':..., 'local_path':..., 'timings':...}
+
+        Completion is detected by a MutationObserver inside the page, so the call returns as soon as the
+        media URL appears; `poll_interval` only applies to the polling fallback. `timeout` defaults to
+        GROK_GENERATION_TIMEOUT (300s). `timings` holds seconds spent in page_load, prompt_submit,
+        generation and download for the successful attempt.
+
+        With a pool attached, a warm session is leased for the browser part only and returned
+        before the media download starts; broken sessions are discarded instead of reused.
+        Media is fetched by the shared `DownloadManager` into the content-addressed `MediaStore`, so
+        `local_path` is `<store>/<sha256[:2]>/<sha256>.mp4` and repeated results share one file. With
+        `wait_for_download=False` the call returns right after generation with `local_path=None`
+        and a `download` Future that resolves to the local path.
+        `progress(step, artifacts=None)` is called as page_load, prompt_submit, generation and
+        download finish (a retried attempt reports its steps again).
 
         Self-Correction tests:
         - If generation times out: retry up to N times with exponential backoff and rotate proxies.
         - If CAPTCHAs or unexpected UI changes occur: save a screenshot and raise CaptchaError or WebDriverException for manual inspection.
         """
-        if not self.driver:
-            # start driver if not started
-            self._start_driver()
-        driver = self.driver
+        timeout = generation_timeout(timeout)
         attempts = 0
         last_exc = None
         max_attempts = 3
+        tried = set()
         while attempts < max_attempts:
             attempts += 1
+            timings: Dict[str, float] = {}
+            lease = None
+            # proxy reserved from the ProxyManager for this attempt (reused drivers keep theirs unreported)
+            proxy = None
+            started = time.monotonic()
             try:
-                imagine_url = os.getenv("GROK_IMAGINE_URL", "https://grok.com/imagine")
-                driver.get(imagine_url)
-                if self._detect_captcha():
-                    path = os.path.join(self.download_dir, f"captcha_imagine_{int(time.time())}.png")
-                    driver.save_screenshot(path)
-                    raise CaptchaError(f"Captcha detected on imagine page (screenshot: {path})")
-
-                # find prompt input and submit
-                try:
-                    input_el = WebDriverWait(driver, 20).until(EC.presence_of_element_located((By.CSS_SELECTOR, "textarea[placeholder*='Describe']")))
-                except TimeoutException:
-                    # fallback heuristics
-                    input_el = driver.find_element(By.TAG_NAME, "textarea")
-
-                input_el.clear(); input_el.send_keys(prompt)
-
-                # find generate button
-                try:
-                    gen_btn = driver.find_element(By.XPATH, "//button[contains(., 'Imagine') or contains(., 'Generate')]")
-                    gen_btn.click()
-                except Exception:
-                    # try alternative: press Enter
-                    input_el.send_keys("\n")
-
-                # Wait for result: look for download link or media element - provider dependent
-                waited = 0
-                download_url = None
-                while waited < timeout:
-                    # check for finished indicator or download link
-                    try:
-                        # provider-specific selectors - adapt as needed
-                        link_el = driver.find_element(By.CSS_SELECTOR, "a.download-link")
-                        download_url = link_el.get_attribute("href")
-                        if download_url:
-                            break
-                    except Exception:
-                        pass
-                    # alternative: check for video element
-                    try:
-                        video_el = driver.find_element(By.TAG_NAME, "video")
-                        src = video_el.get_attribute("src")
-                        if src and src.startswith("http"):
-                            download_url = src
-                            break
-                    except Exception:
-                        pass
-
-                    time.sleep(poll_interval)
-                    waited += poll_interval
-
-                if not download_url:
-                    raise TimeoutException("Imagine generation timed out or no download link found")
-
-                # Optionally download the file here and return local path
-                local_path = None
-                try:
-                    r = requests.get(download_url, stream=True, timeout=30)
-                    r.raise_for_status()
-                    filename = os.path.join(self.download_dir, f"grok_{int(time.time())}.mp4")
-                    with open(filename, "wb") as fh:
-                        for chunk in r.iter_content(chunk_size=8192):
-                            fh.write(chunk)
-                    local_path = filename
-                except Exception as e:
-                    logger.warning(f"Failed to download media from {download_url}: {e}")
-
-                return {"download_url": download_url, "local_path": local_path}
-
-            except CaptchaError:
+                if self.pool:
+                    proxy = self._acquire_proxy(tried)
+                    tried.add(proxy)
+                    lease = self.pool.acquire(proxy)
+                    driver = lease.driver
+                else:
+                    if not self.driver:
+                        # start driver if not started
+                        proxy = self._acquire_proxy(tried)
+                        tried.add(proxy)
+                        self._start_driver(proxy=proxy)
+                    driver = self.driver
+                download_url = self._generate(driver, prompt, timeout, poll_interval, timings, progress)
+                self._report_proxy(proxy, started)
+                if lease:
+                    lease.release()
+                    lease = None
+
+                if not wait_for_download:
+                    return {"download_url": download_url, "local_path": None, "timings": timings, "download": self.downloads.submit(download_url, then=self._store)}
+                mark = time.monotonic()
+                local_path = self._download(download_url)
+                timings["download"] = round(time.monotonic() - mark, 3)
+                record_phase("download", timings["download"], "ok" if local_path else "error")
+                if progress and local_path:
+                    progress("download", {"local_path": local_path})
+                return {"download_url": download_url, "local_path": local_path, "timings": timings}
+
+            except (AuthenticationError, CaptchaError) as e:
+                self._report_proxy(proxy, started, e)
+                if lease:
+                    lease.discard()
                 raise
             except Exception as e:
                 last_exc = e
+                self._report_proxy(proxy, started, e)
                 logger.warning(f"Imagine attempt {attempts} failed: {e}")
+                backoff = 0 if self.proxies else min(2 ** attempts, 30)
+                if attempts < max_attempts:
+                    record_retry("grok_imagine", backoff)
                 # try to recover: restart driver and retry with backoff
-                try:
+                if lease:
+                    lease.discard()
+                else:
                     if self.driver:
-                        self.driver.quit()
-                        self.driver = None
-                except Exception:
-                    pass
-                time.sleep(min(2 ** attempts, 30))
+                        self.quit_driver(self.driver)
+                    self.driver = None
+                if backoff:
+                    time.sleep(backoff)
                 continue
         raise Exception(f"Imagine flow failed after {max_attempts} attempts. Last error: {last_exc}")
 
     def close(self):
-        try:
-            if self.driver:
-                self.driver.quit()
-        except Exception:
-            pass
+        if self.driver:
+            self.quit_driver(self.driver)
+        self.driver = None
+
+
+_driver_pool: Optional[DriverPool] = None
+_driver_pool_lock = threading.Lock()
+
+
+def get_driver_pool() -> DriverPool:
+    """Process-wide pool of warm Grok sessions, configured from the environment.
+
+    GROK_POOL_SIZE (4), GROK_POOL_MAX_USES (50), GROK_POOL_MAX_AGE seconds (1800),
+    GROK_POOL_LEASE_TIMEOUT seconds (120), GROK_POOL_HEADLESS (true).
+    """
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is None:
+            headless = os.getenv("GROK_POOL_HEADLESS", "true").lower() in ("1", "true", "yes")
+            template = GrokAutomator(headless=headless)
+            _driver_pool = DriverPool(
+                template.open_session,
+                max_size=int(os.getenv("GROK_POOL_SIZE", "4")),
+                max_uses=int(os.getenv("GROK_POOL_MAX_USES", "50")),
+                max_age=float(os.getenv("GROK_POOL_MAX_AGE", "1800")),
+                lease_timeout=float(os.getenv("GROK_POOL_LEASE_TIMEOUT", "120")),
+                health_check=template.session_healthy,
+                quit_driver=template.quit_driver,
+            )
+        return _driver_pool
+
+
+def shutdown_driver_pool():
+    global _driver_pool
+    with _driver_pool_lock:
+        if _driver_pool is not None:
+            _driver_pool.close()
+            _driver_pool = None
 
 
 # Example usage (do not run in CI):
@@ -284,3 +503,7 @@ class GrokAutomator:
 #     print(result)
 # finally:
 #     automator.close()
+#
+# Pooled usage (warm, logged-in browsers reused across prompts):
+# automator = GrokAutomator(pool=get_driver_pool())
+# result = automator.imagine("A cinematic neon AI revolution 9:16 short")
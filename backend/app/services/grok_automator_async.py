@@ -0,0 +1,275 @@
+"""
+backend/app/services/grok_automator_async.py
+
+AsyncGrokAutomator
+- Async counterpart of `GrokAutomator` for the API process: drives the same Grok login / imagine pages with
+  Playwright async on the shared `PlaywrightEngine` and downloads media through the shared `DownloadManager`
+  into the content-addressed `MediaStore`.
+- Nothing here blocks a thread: waits are `page.wait_for_*`, an in-page MutationObserver or `asyncio.sleep`, so one API process can keep
+  hundreds of generations in flight.
+- Logged-in sessions live in a cached browser context per (account, proxy); if the context was evicted or
+  the session expired, the imagine flow logs in again on the same page.
+- `imagine_many` runs a batch of prompts on one session, several tabs at a time, yielding results as they finish.
+- Same guarantees as the Selenium automator: it does NOT attempt to bypass CAPTCHAs. A detected CAPTCHA
+  saves a screenshot and raises CaptchaError; bad credentials raise AuthenticationError.
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Optional, Dict, List, Any, AsyncIterator
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from .grok_automator import AuthenticationError, CaptchaError, MEDIA_READY_JS, generation_timeout, report_proxy_outcome
+from .page_probe import BLOCKED, CAPTCHA, LOGGED_OUT, PageStateError, probe_page
+from .proxy_manager import ProxyManager, get_proxy_manager
+from .playwright_engine import PlaywrightEngine, get_playwright_engine
+from .downloader import get_download_manager
+from .media_store import MediaStore, get_media_store
+from ..telemetry import record_phase, record_retry, span
+
+logger = logging.getLogger("grok_automator_async")
+
+
+class AsyncGrokAutomator:
+    def __init__(self, username: str = None, password: str = None, headless: bool = True, proxies: Optional[list] = None, download_dir: Optional[str] = None, engine: Optional[PlaywrightEngine] = None, proxy_manager: Optional[ProxyManager] = None, media_store: Optional[MediaStore] = None):
+        self.username = username or os.getenv("GROK_USERNAME")
+        self.password = password or os.getenv("GROK_PASSWORD")
+        self.headless = headless
+        self.proxies = proxies or []
+        self.engine = engine or get_playwright_engine(headless)
+        self.proxy_manager = proxy_manager or get_proxy_manager()
+        self.download_dir = download_dir or os.getenv("GROK_DOWNLOAD_DIR") or "/tmp/grok_downloads"
+        os.makedirs(self.download_dir, exist_ok=True)
+        self.downloads = get_download_manager(self.download_dir)
+        self.media = media_store or get_media_store()
+
+    async def _acquire_proxy(self, tried=()) -> Optional[str]:
+        if not self.proxies:
+            return None
+        # acquire() may sleep until a proxy leaves cooldown; keep that off the event loop
+        return await asyncio.to_thread(self.proxy_manager.acquire, self.proxies, None, tried)
+
+    def _session_key(self, proxy: Optional[str]) -> str:
+        return f"grok:{self.username or 'anonymous'}:{proxy or ''}"
+
+    async def _check_page(self, page, label: str, session: bool = False):
+        state, detail = await probe_page(page, "grok", label, session=session)
+        if state == CAPTCHA:
+            path = os.path.join(self.download_dir, f"captcha_{label}_{int(time.time())}.png")
+            await page.screenshot(path=path)
+            raise CaptchaError(f"Captcha detected on {label} page ({detail}); screenshot: {path}")
+        if state in (BLOCKED, LOGGED_OUT):
+            raise PageStateError(state, detail, label)
+
+    async def _login_on_page(self, page, timeout: int):
+        login_url = os.getenv("GROK_LOGIN_URL", "https://grok.com/login")
+        await page.goto(login_url, timeout=60000)
+        await self._check_page(page, "login")
+        user_sel, pass_sel = "input[name=email]", "input[name=password]"
+        try:
+            await page.wait_for_selector(user_sel, timeout=timeout * 1000)
+        except PlaywrightTimeoutError:
+            # fallback selectors
+            user_sel, pass_sel = "input[type=email]", "input[type=password]"
+        await page.fill(user_sel, self.username)
+        await page.fill(pass_sel, self.password)
+        submit = await page.query_selector("button[type=submit]")
+        if submit:
+            await submit.click()
+        try:
+            await page.wait_for_selector("nav", timeout=timeout * 1000)
+        except PlaywrightTimeoutError:
+            body = (await page.inner_text("body")).lower()
+            if "incorrect" in body or "invalid" in body:
+                raise AuthenticationError("Invalid Grok credentials")
+            await self._check_page(page, "postlogin")
+            raise TimeoutError("Login confirm timeout")
+
+    async def _login_flow(self, proxy: Optional[str], timeout: int):
+        async with self.engine.page(self._session_key(proxy), proxy=proxy) as (context, page):
+            with span("login", platform="grok"):
+                await self._login_on_page(page, timeout)
+
+    async def login(self, max_attempts: int = 3, timeout: int = 30) -> bool:
+        """Log the cached (account, proxy) context in. Same retry / error semantics as `GrokAutomator.login`."""
+        attempts = 0
+        last_exc = None
+        tried = set()
+        while attempts < max_attempts:
+            attempts += 1
+            proxy = await self._acquire_proxy(tried)
+            tried.add(proxy)
+            started = time.monotonic()
+            try:
+                await self.engine.call(self._login_flow, proxy, timeout)
+                report_proxy_outcome(self.proxy_manager, proxy, started)
+                logger.info("Logged into Grok successfully")
+                return True
+            except (AuthenticationError, CaptchaError) as e:
+                report_proxy_outcome(self.proxy_manager, proxy, started, e)
+                raise
+            except Exception as e:
+                last_exc = e
+                report_proxy_outcome(self.proxy_manager, proxy, started, e)
+                logger.warning(f"Login attempt {attempts} failed with proxy={proxy}: {e}")
+                await self.engine.call(self.engine.invalidate, self._session_key(proxy))
+                backoff = 0 if self.proxies else min(2 ** attempts, 20)
+                if attempts < max_attempts:
+                    record_retry("grok_login", backoff)
+                if backoff:
+                    await asyncio.sleep(backoff)
+        raise Exception(f"Grok login failed after {max_attempts} attempts. Last error: {last_exc}")
+
+    async def _generate_flow(self, proxy: Optional[str], prompt: str, timeout: int, timings: Dict[str, float]) -> str:
+        imagine_url = os.getenv("GROK_IMAGINE_URL", "https://grok.com/imagine")
+        async with self.engine.page(self._session_key(proxy), proxy=proxy) as (context, page):
+            mark = time.monotonic()
+            await page.goto(imagine_url, timeout=60000)
+            if "login" in page.url and self.username and self.password:
+                # session expired or context was evicted: log in again on this page
+                await self._login_on_page(page, 30)
+                await page.goto(imagine_url, timeout=60000)
+            await self._check_page(page, "imagine", session=bool(self.username and self.password))
+            timings["page_load"] = round(time.monotonic() - mark, 3)
+            record_phase("page_load", timings["page_load"])
+
+            mark = time.monotonic()
+            prompt_sel = "textarea[placeholder*='Describe']"
+            try:
+                await page.wait_for_selector(prompt_sel, timeout=20000)
+            except PlaywrightTimeoutError:
+                prompt_sel = "textarea"
+            await page.fill(prompt_sel, prompt)
+            button = page.locator("button", has_text="Imagine").or_(page.locator("button", has_text="Generate"))
+            if await button.count():
+                await button.first.click()
+            else:
+                await page.press(prompt_sel, "Enter")
+            timings["prompt_submit"] = round(time.monotonic() - mark, 3)
+            record_phase("prompt_submit", timings["prompt_submit"])
+
+            # MutationObserver inside the page resolves as soon as a download link or remote video appears
+            mark = time.monotonic()
+            download_url = await page.evaluate(MEDIA_READY_JS, int(timeout * 1000))
+            timings["generation"] = round(time.monotonic() - mark, 3)
+            record_phase("generation", timings["generation"], "ok" if download_url else "timeout")
+            if not download_url:
+                raise TimeoutError("Imagine generation timed out or no download link found")
+            return download_url
+
+    async def _download(self, download_url: str) -> Optional[str]:
+        try:
+            # the shared DownloadManager streams on its own pooled connections; just await its Future
+            stored = await asyncio.wrap_future(self.downloads.submit(download_url, then=self.media.put_download))
+            return stored["path"]
+        except Exception as e:
+            logger.warning(f"Failed to download media from {download_url}: {e}")
+            return None
+
+    async def _imagine_once(self, proxy: Optional[str], prompt: str, timeout: int) -> Dict[str, Optional[str]]:
+        timings: Dict[str, float] = {}
+        download_url = await self.engine.call(self._generate_flow, proxy, prompt, timeout, timings)
+        mark = time.monotonic()
+        local_path = await self._download(download_url)
+        timings["download"] = round(time.monotonic() - mark, 3)
+        record_phase("download", timings["download"], "ok" if local_path else "error")
+        return {"download_url": download_url, "local_path": local_path, "timings": timings}
+
+    async def imagine(self, prompt: str, timeout: Optional[int] = None) -> Dict[str, Optional[str]]:
+        """Send a prompt to Grok Imagine and return {'download_url':..., 'local_path':..., 'timings':...}.
+
+        `timeout` defaults to GROK_GENERATION_TIMEOUT (300s); `timings` holds per-phase seconds as in `GrokAutomator.imagine`.
+        Retries timeouts / UI errors with exponential backoff and proxy rotation; CAPTCHAs and auth errors are raised.
+        """
+        timeout = generation_timeout(timeout)
+        attempts = 0
+        last_exc = None
+        max_attempts = 3
+        tried = set()
+        while attempts < max_attempts:
+            attempts += 1
+            proxy = None
+            started = time.monotonic()
+            try:
+                proxy = await self._acquire_proxy(tried)
+                tried.add(proxy)
+                result = await self._imagine_once(proxy, prompt, timeout)
+                report_proxy_outcome(self.proxy_manager, proxy, started)
+                return result
+            except (AuthenticationError, CaptchaError) as e:
+                report_proxy_outcome(self.proxy_manager, proxy, started, e)
+                raise
+            except Exception as e:
+                last_exc = e
+                report_proxy_outcome(self.proxy_manager, proxy, started, e)
+                logger.warning(f"Imagine attempt {attempts} failed: {e}")
+                backoff = 0 if self.proxies else min(2 ** attempts, 30)
+                if attempts < max_attempts:
+                    record_retry("grok_imagine", backoff)
+                if backoff:
+                    await asyncio.sleep(backoff)
+        raise Exception(f"Imagine flow failed after {max_attempts} attempts. Last error: {last_exc}")
+
+    async def imagine_many(self, prompts: List[str], max_tabs: Optional[int] = None, timeout: Optional[int] = None, cache=None, policy: str = "use") -> AsyncIterator[Dict[str, Any]]:
+        """Generate several prompts on one logged-in session and yield each result as it finishes.
+
+        All prompts share one proxy and therefore one cached browser context; up to `max_tabs`
+        (GROK_BATCH_TABS, default 3) generations run at the same time, each in its own tab.
+        Items are {'index', 'prompt', 'ok', 'result'} or {'index', 'prompt', 'ok': False, 'error'}.
+        With a `PromptCache`, each prompt is looked up / coalesced under `policy` first, and the
+        session only logs in once a prompt actually needs a generation. A CAPTCHA fails the
+        remaining prompts instead of hammering the same session.
+        """
+        timeout = generation_timeout(timeout)
+        max_tabs = max_tabs or int(os.getenv("GROK_BATCH_TABS", "3"))
+        proxy = await self._acquire_proxy()
+        started = time.monotonic()
+        tabs = asyncio.Semaphore(max_tabs)
+        login_lock = asyncio.Lock()
+        state = {"logged_in": not (self.username and self.password), "blocked": None, "ok": 0, "last_exc": None}
+
+        async def generate(prompt: str) -> Dict[str, Optional[str]]:
+            if state["blocked"] is not None:
+                raise state["blocked"]
+            async with login_lock:
+                if not state["logged_in"]:
+                    await self.engine.call(self._login_flow, proxy, 30)
+                    state["logged_in"] = True
+            last = None
+            for attempt in range(2):
+                try:
+                    return await self._imagine_once(proxy, prompt, timeout)
+                except (AuthenticationError, CaptchaError) as e:
+                    state["blocked"] = e
+                    raise
+                except Exception as e:
+                    last = e
+                    logger.warning(f"Batch prompt attempt {attempt + 1} failed: {e}")
+                    if attempt == 0:
+                        record_retry("grok_batch")
+            raise last
+
+        async def one(index: int, prompt: str) -> Dict[str, Any]:
+            async with tabs:
+                try:
+                    if cache is not None:
+                        result, cache_state = await cache.run_async(prompt, lambda: generate(prompt), policy)
+                        result = {**result, "cache": cache_state}
+                    else:
+                        result = await generate(prompt)
+                    state["ok"] += 1
+                    return {"index": index, "prompt": prompt, "ok": True, "result": result}
+                except Exception as e:
+                    state["last_exc"] = e
+                    return {"index": index, "prompt": prompt, "ok": False, "error": str(e)}
+
+        tasks = [asyncio.ensure_future(one(i, p)) for i, p in enumerate(prompts)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                yield await finished
+        finally:
+            for task in tasks:
+                task.cancel()
+            failed = state["blocked"] or (state["last_exc"] if not state["ok"] else None)
+            report_proxy_outcome(self.proxy_manager, proxy, started, failed)
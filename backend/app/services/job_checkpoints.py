@@ -0,0 +1,107 @@
+# backend/app/services/job_checkpoints.py
+# Durable per-stage checkpoints of a job, so a job interrupted by a worker crash resumes where it stopped.
+#
+# Each stage of `Pipeline.run` writes one `job_stages` row (see `models.JobStage`):
+#   trend     {"trend"}                               chosen trend
+#   generate  {"download_url"}                        Grok produced media; only the download is missing
+#   download  {"download_url", "local_path", "sha256"}  media is in the store and pinned by the job
+#   prepare   {"path"}                                media converted for the platform
+#   upload    {"post_url", "account"}                 posted
+# A row is written with `started_at` when a stage begins and gets `output` + `completed_at` when it
+# ends. Every row carries an idempotency key: the sha256 of the job id, the stage and the stage's
+# inputs (seeds, prompt, media hash, platform/account/caption). A checkpoint is only reused when the
+# key still matches, so a job whose payload was edited reruns the affected stages.
+#
+# An upload that started but never completed may or may not have been posted: `in_flight` tells the
+# pipeline, which retries or fails the job depending on PIPELINE_UPLOAD_RESUME.
+
+import json
+import time
+import hashlib
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger("job_checkpoints")
+
+STAGES = ("trend", "generate", "download", "prepare", "upload")
+
+
+def idempotency_key(job_id: Optional[int], stage: str, *inputs: Any) -> str:
+    raw = json.dumps([job_id, stage, *inputs], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class JobCheckpoints:
+    """Checkpoints of one job. With `job_id=None` (ad-hoc pipeline runs) they live in memory only."""
+
+    def __init__(self, job_id: Optional[int], session_factory=None):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.job_id = job_id
+        self.session_factory = session_factory
+        # stage -> {"key", "output", "attempts", "completed"}
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        if job_id is not None:
+            self._load()
+
+    def _load(self):
+        from ..models import JobStage
+
+        with self.session_factory() as db:
+            for row in db.query(JobStage).filter(JobStage.job_id == self.job_id):
+                self._rows[row.stage] = {"key": row.idempotency_key, "output": row.output, "attempts": row.attempts, "completed": row.completed_at is not None}
+
+    def key(self, stage: str, *inputs: Any) -> str:
+        return idempotency_key(self.job_id, stage, *inputs)
+
+    def get(self, stage: str, key: str) -> Optional[Dict[str, Any]]:
+        """Output of `stage` when it completed with the same idempotency key, else None."""
+        row = self._rows.get(stage)
+        if row and row["completed"] and row["key"] == key:
+            return row["output"] or {}
+        return None
+
+    def in_flight(self, stage: str, key: str) -> bool:
+        """True when `stage` was started with this key by an earlier attempt and never completed."""
+        row = self._rows.get(stage)
+        return bool(row) and not row["completed"] and row["key"] == key
+
+    def completed(self) -> List[str]:
+        """Stages finished by earlier attempts, in pipeline order."""
+        return [stage for stage in STAGES if self._rows.get(stage, {}).get("completed")]
+
+    def start(self, stage: str, key: str):
+        self._write(stage, key, None, completed=False)
+
+    def complete(self, stage: str, key: str, output: Dict[str, Any]):
+        self._write(stage, key, output, completed=True)
+
+    def _write(self, stage: str, key: str, output: Optional[Dict[str, Any]], completed: bool):
+        from ..models import JobStage
+
+        row = self._rows.get(stage)
+        attempts = (row["attempts"] if row and row["key"] == key else 0) + (0 if completed else 1)
+        self._rows[stage] = {"key": key, "output": output, "attempts": attempts, "completed": completed}
+        if self.job_id is None:
+            return
+        now = time.time()
+        try:
+            with self.session_factory() as db:
+                existing = db.get(JobStage, (self.job_id, stage))
+                if existing is None:
+                    existing = JobStage(job_id=self.job_id, stage=stage, started_at=now)
+                    db.add(existing)
+                elif not completed:
+                    existing.started_at = now
+                existing.idempotency_key = key
+                existing.output = output
+                existing.attempts = attempts
+                existing.completed_at = now if completed else None
+                db.commit()
+        except Exception as e:
+            # a lost checkpoint only costs redoing the stage after a crash; never fail the job for it
+            logger.warning(f"Could not checkpoint stage {stage} of job {self.job_id}: {e}")
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        return {stage: {"completed": row["completed"], "attempts": row["attempts"]} for stage, row in self._rows.items()}
@@ -0,0 +1,301 @@
+# backend/app/services/job_events.py
+# Job progress events and their fan-out to watching clients.
+#
+# An event is a small dict: {id, job_id, phase, percent, message, artifacts, ts}. Phases follow
+# the pipeline ("running", "trend", "grok", "prepare", "upload") and end with "completed" or
+# "failed"; `percent` is the overall progress of the job and `artifacts` carries what a phase
+# produced (download URL, media hash, post URL). Services report progress with `emit()`.
+#
+# Every event is stored in the `job_events` table (see `models.JobEvent`) so a client that
+# connects late, or reconnects with Last-Event-ID, gets the history first. Live delivery goes
+# through a backend:
+#   LocalBackend     delivers inside the publishing process only (single-process setups, tests)
+#   PostgresBackend  NOTIFY on publish; each API process keeps one LISTEN connection and fans
+#                    out to its subscribers, so watchers never poll the database
+# JOB_EVENTS_BACKEND selects "local", "postgres" or "auto" (postgres when DATABASE_URL is one).
+# Subscribers get a bounded queue (JOB_EVENTS_QUEUE, 100); a client too slow to drain it loses
+# its oldest undelivered events, never the final one.
+
+import os
+import json
+import time
+import select
+import asyncio
+import logging
+import threading
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger("job_events")
+
+TERMINAL_PHASES = ("completed", "failed")
+
+Deliver = Callable[[Dict[str, Any]], None]
+
+
+def make_event(job_id: int, phase: str, percent: float, message: Optional[str] = None, artifacts: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    return {
+        "job_id": job_id,
+        "phase": phase,
+        "percent": round(max(0.0, min(100.0, float(percent))), 1),
+        "message": message[:500] if message else None,
+        "artifacts": artifacts or None,
+        "ts": time.time(),
+    }
+
+
+class LocalBackend:
+    """Delivers events to subscribers of the publishing process; the stand-in for tests."""
+
+    def __init__(self):
+        self._deliver: Optional[Deliver] = None
+
+    def start(self, deliver: Deliver):
+        self._deliver = deliver
+
+    def publish(self, event: Dict[str, Any]):
+        if self._deliver is not None:
+            self._deliver(event)
+
+    def close(self):
+        self._deliver = None
+
+
+class PostgresBackend:
+    """Cross-process delivery over Postgres LISTEN/NOTIFY (psycopg2 or psycopg 3)."""
+
+    def __init__(self, engine=None, channel: str = "job_events", reconnect_delay: float = 2.0):
+        if engine is None:
+            from ..db import engine
+        self.engine = engine
+        self.channel = channel
+        self.reconnect_delay = reconnect_delay
+        self._deliver: Optional[Deliver] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def publish(self, event: Dict[str, Any]):
+        from sqlalchemy import text
+
+        payload = json.dumps(event, default=str)
+        if len(payload) > 7900:
+            # NOTIFY payloads are capped at 8000 bytes; listeners load the full row instead
+            payload = json.dumps({"id": event.get("id"), "job_id": event["job_id"], "truncated": True})
+        with self.engine.connect() as conn:
+            conn.execute(text("SELECT pg_notify(:channel, :payload)"), {"channel": self.channel, "payload": payload})
+            conn.commit()
+
+    def start(self, deliver: Deliver):
+        self._deliver = deliver
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._listen_forever, name="job-events-listener", daemon=True)
+            self._thread.start()
+
+    def _listen_forever(self):
+        while not self._stop.is_set():
+            raw = None
+            try:
+                raw = self.engine.raw_connection()
+                conn = raw.driver_connection
+                # end the transaction a pre-ping may have opened; autocommit can't be set inside one
+                conn.rollback()
+                conn.autocommit = True
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {self.channel}")
+                logger.info(f"Listening for job events on channel {self.channel}")
+                while not self._stop.is_set():
+                    for payload in self._wait(conn, 1.0):
+                        self._deliver(json.loads(payload))
+            except Exception as e:
+                logger.warning(f"Job event listener failed, reconnecting: {e}")
+                self._stop.wait(self.reconnect_delay)
+            finally:
+                if raw is not None:
+                    try:
+                        # LISTEN state must not leak into the pool
+                        raw.invalidate()
+                    except Exception:
+                        pass
+
+    @staticmethod
+    def _wait(conn, timeout: float) -> List[str]:
+        if callable(getattr(conn, "notifies", None)):
+            # psycopg 3
+            return [n.payload for n in conn.notifies(timeout=timeout)]
+        # psycopg2
+        if select.select([conn], [], [], timeout) == ([], [], []):
+            return []
+        conn.poll()
+        payloads = [n.payload for n in conn.notifies]
+        conn.notifies.clear()
+        return payloads
+
+    def close(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+
+class JobEvents:
+    def __init__(self, session_factory=None, backend=None, queue_size: int = 100):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.backend = backend or LocalBackend()
+        self.queue_size = queue_size
+        # job_id -> {(loop, queue)}
+        self._subscribers: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+        self._lock = threading.Lock()
+        self._started = False
+        self.metrics = {"published": 0, "delivered": 0, "dropped": 0, "publish_errors": 0}
+
+    # --- publishing ---
+    def emit(self, job_id: int, phase: str, percent: float, message: Optional[str] = None, artifacts: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        """Record and broadcast one event. Never raises: progress reporting must not fail a job."""
+        from ..models import JobEvent
+
+        event = make_event(job_id, phase, percent, message, artifacts)
+        try:
+            with self.session_factory() as db:
+                row = JobEvent(job_id=job_id, phase=event["phase"], percent=event["percent"], message=event["message"], artifacts=event["artifacts"], created_at=event["ts"])
+                db.add(row)
+                db.commit()
+                event["id"] = row.id
+            self.backend.publish(event)
+        except Exception as e:
+            with self._lock:
+                self.metrics["publish_errors"] += 1
+            logger.warning(f"Could not publish progress of job {job_id}: {e}")
+            return None
+        with self._lock:
+            self.metrics["published"] += 1
+        return event
+
+    def reporter(self, job_id: Optional[int]) -> Callable[..., None]:
+        """`emit` bound to one job; a no-op without a job id (ad-hoc pipeline runs)."""
+        if job_id is None:
+            return lambda *args, **kwargs: None
+        return lambda phase, percent, message=None, artifacts=None: self.emit(job_id, phase, percent, message, artifacts)
+
+    # --- reading ---
+    def history(self, job_id: int, after: int = 0) -> List[Dict[str, Any]]:
+        from ..models import JobEvent
+
+        with self.session_factory() as db:
+            rows = db.query(JobEvent).filter(JobEvent.job_id == job_id, JobEvent.id > after).order_by(JobEvent.id).all()
+            return [
+                {"id": r.id, "job_id": r.job_id, "phase": r.phase, "percent": r.percent, "message": r.message, "artifacts": r.artifacts, "ts": r.created_at}
+                for r in rows
+            ]
+
+    def _deliver(self, event: Dict[str, Any]):
+        with self._lock:
+            targets = list(self._subscribers.get(event.get("job_id"), ()))
+            self.metrics["delivered"] += len(targets)
+        for loop, q in targets:
+            try:
+                loop.call_soon_threadsafe(self._offer, q, event)
+            except RuntimeError:
+                # the subscriber's loop is closed; it unregisters itself
+                pass
+
+    def _offer(self, q: asyncio.Queue, event: Dict[str, Any]):
+        """Runs on the subscriber's loop; makes room by dropping the oldest queued event."""
+        if q.full():
+            try:
+                q.get_nowait()
+            except asyncio.QueueEmpty:
+                pass
+            else:
+                with self._lock:
+                    self.metrics["dropped"] += 1
+        q.put_nowait(event)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        self.backend.start(self._deliver)
+
+    async def subscribe(self, job_id: int, after: int = 0, finished: Optional[str] = None, heartbeat: Optional[float] = None) -> AsyncIterator[Optional[Dict[str, Any]]]:
+        """Yield the stored events after `after`, then live ones until a terminal phase.
+
+        `finished` is the job's status when it already ended: the history is replayed and the
+        stream stops (with a synthesized final event when none was recorded). With `heartbeat`
+        set, None is yielded after that many idle seconds so callers can keep connections alive.
+        """
+        self._ensure_started()
+        q: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        entry = (asyncio.get_running_loop(), q)
+        # register before reading the history so nothing published in between is missed
+        with self._lock:
+            self._subscribers.setdefault(job_id, set()).add(entry)
+        try:
+            last = after
+            for event in await asyncio.to_thread(self.history, job_id, after):
+                last = event["id"]
+                yield event
+                if event["phase"] in TERMINAL_PHASES:
+                    return
+            if finished in TERMINAL_PHASES:
+                yield {**make_event(job_id, finished, 100), "id": last}
+                return
+            while True:
+                try:
+                    event = await asyncio.wait_for(q.get(), heartbeat) if heartbeat else await q.get()
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                if event.get("truncated"):
+                    for full in await asyncio.to_thread(self.history, job_id, last):
+                        if full["id"] == event["id"]:
+                            event = full
+                            break
+                    else:
+                        continue
+                if event.get("id", 0) <= last:
+                    continue
+                last = event["id"]
+                yield event
+                if event["phase"] in TERMINAL_PHASES:
+                    return
+        finally:
+            with self._lock:
+                subscribers = self._subscribers.get(job_id)
+                if subscribers is not None:
+                    subscribers.discard(entry)
+                    if not subscribers:
+                        del self._subscribers[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self.metrics,
+                "jobs_watched": len(self._subscribers),
+                "subscribers": sum(len(s) for s in self._subscribers.values()),
+                "backend": type(self.backend).__name__,
+            }
+
+    def close(self):
+        self.backend.close()
+
+
+_job_events: Optional[JobEvents] = None
+_job_events_lock = threading.Lock()
+
+
+def get_job_events() -> JobEvents:
+    """Process-wide hub. JOB_EVENTS_BACKEND ("auto", "local", "postgres"), JOB_EVENTS_QUEUE (100)."""
+    global _job_events
+    with _job_events_lock:
+        if _job_events is None:
+            from ..db import engine
+
+            name = os.getenv("JOB_EVENTS_BACKEND", "auto").lower()
+            if name == "auto":
+                name = "postgres" if engine.dialect.name == "postgresql" else "local"
+            backend = PostgresBackend(engine) if name == "postgres" else LocalBackend()
+            _job_events = JobEvents(backend=backend, queue_size=int(os.getenv("JOB_EVENTS_QUEUE", "100")))
+        return _job_events
@@ -0,0 +1,285 @@
+# backend/app/services/media_prep.py
+# Pre-upload media preparation: probe a video and bring it into a platform's target profile.
+#
+# `ffprobe` decides per file whether it already fits the profile (9:16, H.264/AAC in MP4,
+# resolution, duration and size limits), only needs a remux into MP4 (right codecs, wrong
+# container or no faststart), or needs a transcode (scale/pad to 9:16, re-encode, trim, cap the
+# bitrate so the size limit holds). ffmpeg runs in a process pool so several jobs can prepare
+# media at once without the GIL or a blocked worker thread in the way.
+#
+# Outputs go into the `MediaStore` and are cached by (source SHA-256, profile) in the
+# `prepared_media` table, so a video that goes to TikTok and Instagram is processed at most once
+# per profile. The cache key holds only the encoding settings (size, codecs, limits), not the
+# platform, so platforms whose settings match share one output. Concurrent requests for the same
+# pair wait for the first one. Without ffmpeg/ffprobe on PATH files pass through unchanged.
+#
+# Configuration:
+#   PREP_WORKERS                    ffmpeg processes in parallel (half the CPUs)
+#   PREP_<PLATFORM>_MAX_DURATION    seconds (TIKTOK 600, INSTAGRAM 90)
+#   PREP_<PLATFORM>_MAX_MB          megabytes (TIKTOK 1024, INSTAGRAM 1024)
+#   FFMPEG_BIN / FFPROBE_BIN        binaries (ffmpeg / ffprobe)
+
+import os
+import json
+import time
+import uuid
+import logging
+import threading
+import subprocess
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from ..telemetry import span
+
+logger = logging.getLogger("media_prep")
+
+
+class MediaPrepError(Exception):
+    pass
+
+
+def _profile(platform: str, max_duration: float, max_mb: float) -> Dict[str, Any]:
+    prefix = f"PREP_{platform.upper()}_"
+    return {
+        "name": f"{platform}-1080x1920",
+        "width": 1080,
+        "height": 1920,
+        "video_codec": "h264",
+        "audio_codec": "aac",
+        "max_duration": float(os.getenv(prefix + "MAX_DURATION", str(max_duration))),
+        "max_bytes": int(float(os.getenv(prefix + "MAX_MB", str(max_mb))) * 1024 * 1024),
+    }
+
+
+def platform_profile(platform: str) -> Dict[str, Any]:
+    if platform == "tiktok":
+        return _profile("tiktok", 600, 1024)
+    if platform == "instagram":
+        return _profile("instagram", 90, 1024)
+    raise MediaPrepError(f"No media profile for platform {platform}")
+
+
+def _profile_key(profile: Dict[str, Any]) -> str:
+    # encoding settings only, so platforms with the same settings share outputs; limits are part of
+    # the key: a changed limit must not serve an output made for the old one
+    return (
+        f"{profile['width']}x{profile['height']}:{profile['video_codec']}/{profile['audio_codec']}"
+        f":{int(profile['max_duration'])}s:{profile['max_bytes']}b"
+    )
+
+
+def probe(path: str) -> Dict[str, Any]:
+    """Container, codecs, dimensions, duration and size of a media file (via ffprobe)."""
+    cmd = [os.getenv("FFPROBE_BIN", "ffprobe"), "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path]
+    out = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
+    if out.returncode != 0:
+        raise MediaPrepError(f"ffprobe failed for {path}: {out.stderr.strip()[:500]}")
+    data = json.loads(out.stdout or "{}")
+    video = next((s for s in data.get("streams", []) if s.get("codec_type") == "video"), None)
+    audio = next((s for s in data.get("streams", []) if s.get("codec_type") == "audio"), None)
+    fmt = data.get("format", {})
+    if video is None:
+        raise MediaPrepError(f"{path} has no video stream")
+    return {
+        "format": fmt.get("format_name", ""),
+        "duration": float(fmt.get("duration") or video.get("duration") or 0),
+        "size": int(fmt.get("size") or os.path.getsize(path)),
+        "video_codec": video.get("codec_name"),
+        "pix_fmt": video.get("pix_fmt"),
+        "width": int(video.get("width") or 0),
+        "height": int(video.get("height") or 0),
+        "audio_codec": audio.get("codec_name") if audio else None,
+    }
+
+
+def plan(info: Dict[str, Any], profile: Dict[str, Any]) -> str:
+    """"keep", "remux" or "transcode" for a probed file."""
+    width, height = info["width"], info["height"]
+    aspect_ok = height > 0 and abs(width / height - profile["width"] / profile["height"]) < 0.01
+    codecs_ok = (
+        info["video_codec"] == profile["video_codec"]
+        and info["pix_fmt"] in ("yuv420p", "yuvj420p")
+        and info["audio_codec"] in (None, profile["audio_codec"])
+    )
+    fits = (
+        aspect_ok
+        and width <= profile["width"]
+        and height <= profile["height"]
+        and info["duration"] <= profile["max_duration"]
+        and info["size"] <= profile["max_bytes"]
+    )
+    if codecs_ok and fits:
+        return "keep" if "mp4" in info["format"] else "remux"
+    return "transcode"
+
+
+def _ffmpeg_args(src: str, dst: str, info: Dict[str, Any], profile: Dict[str, Any], mode: str) -> list:
+    args = [os.getenv("FFMPEG_BIN", "ffmpeg"), "-nostdin", "-y", "-v", "error", "-i", src]
+    if mode == "remux":
+        return args + ["-c", "copy", "-movflags", "+faststart", dst]
+    w, h = profile["width"], profile["height"]
+    duration = min(info["duration"] or profile["max_duration"], profile["max_duration"])
+    args += [
+        "-t", f"{duration:.3f}",
+        "-vf", f"scale={w}:{h}:force_original_aspect_ratio=decrease,pad={w}:{h}:(ow-iw)/2:(oh-ih)/2,setsar=1",
+        "-c:v", "libx264", "-preset", "veryfast", "-crf", "23", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k",
+    ]
+    if duration > 0:
+        # cap the video bitrate so the whole file stays under the size limit (10% headroom)
+        budget_kbps = int(profile["max_bytes"] * 8 * 0.9 / duration / 1000) - 128
+        if budget_kbps > 0:
+            args += ["-maxrate", f"{budget_kbps}k", "-bufsize", f"{budget_kbps * 2}k"]
+    return args + ["-movflags", "+faststart", dst]
+
+
+def convert(src: str, dst: str, profile: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+    """Probe `src` and write a profile-conforming copy to `dst` when needed.
+
+    Runs inside the process pool; returns (mode, info) where mode "keep" means `dst` was not written.
+    """
+    info = probe(src)
+    mode = plan(info, profile)
+    if mode == "keep":
+        return mode, info
+    started = time.monotonic()
+    out = subprocess.run(_ffmpeg_args(src, dst, info, profile, mode), capture_output=True, text=True)
+    if out.returncode != 0:
+        raise MediaPrepError(f"ffmpeg {mode} failed: {out.stderr.strip()[:500]}")
+    if os.path.getsize(dst) > profile["max_bytes"]:
+        raise MediaPrepError(f"{mode} output is still larger than {profile['max_bytes']} bytes")
+    info["elapsed"] = round(time.monotonic() - started, 3)
+    return mode, info
+
+
+class MediaPreparer:
+    def __init__(self, media_store=None, session_factory=None, workers: Optional[int] = None, work_dir: Optional[str] = None):
+        if media_store is None:
+            from .media_store import get_media_store
+            media_store = get_media_store()
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.media = media_store
+        self.session_factory = session_factory
+        self.workers = workers or int(os.getenv("PREP_WORKERS", str(max(1, (os.cpu_count() or 2) // 2))))
+        self.work_dir = work_dir or os.path.join(self.media.root, ".prep")
+        os.makedirs(self.work_dir, exist_ok=True)
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._inflight: Dict[Tuple[str, str], Future] = {}
+        self._lock = threading.Lock()
+        self._unavailable = False
+        self.metrics = {"kept": 0, "remuxed": 0, "transcoded": 0, "cache_hits": 0, "coalesced": 0, "skipped": 0}
+
+    def _executor(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                # spawn, not fork: the pool starts inside a worker whose heartbeat, Playwright and DB pool
+                # threads may hold locks a forked child would inherit and deadlock on
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"))
+            return self._pool
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def _cached(self, digest: str, key: str) -> Optional[str]:
+        from ..models import PreparedMedia
+
+        with self.session_factory() as db:
+            row = db.get(PreparedMedia, (digest, key))
+            output = row.output_sha256 if row else None
+        if output is None:
+            return None
+        return self.media.lookup(output)
+
+    def _remember(self, digest: str, key: str, output: str, mode: str):
+        from ..models import PreparedMedia
+
+        with self.session_factory() as db:
+            db.merge(PreparedMedia(source_sha256=digest, profile=key, output_sha256=output, mode=mode, created_at=time.time()))
+            db.commit()
+
+    def prepare(self, path: str, platform: str) -> str:
+        """Return a path to a version of `path` that fits the platform profile (possibly `path` itself)."""
+        if self._unavailable:
+            self._count("skipped")
+            return path
+        profile = platform_profile(platform)
+        key = _profile_key(profile)
+        digest = self.media.digest_of(path)
+        if digest is None:
+            # not in the store: hash the file itself so its outputs are still cached by content
+            from .media_store import hash_file
+            digest = hash_file(path)
+        cached = self._cached(digest, key)
+        if cached:
+            self._count("cache_hits")
+            return cached
+
+        with self._lock:
+            future = self._inflight.get((digest, key))
+            leader = future is None
+            if leader:
+                future = self._inflight[(digest, key)] = Future()
+            else:
+                self.metrics["coalesced"] += 1
+        if not leader:
+            return future.result()
+        try:
+            result = self._convert(path, digest, key, profile)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop((digest, key), None)
+
+    def _convert(self, path: str, digest: str, key: str, profile: Dict[str, Any]) -> str:
+        dst = os.path.join(self.work_dir, f"{uuid.uuid4().hex}.mp4")
+        try:
+            with span("prepare", platform=profile["name"]):
+                mode, info = self._executor().submit(convert, path, dst, profile).result()
+        except FileNotFoundError:
+            logger.warning("ffmpeg/ffprobe not found; uploading media without preparation")
+            self._unavailable = True
+            self._count("skipped")
+            return path
+        except Exception:
+            if os.path.exists(dst):
+                os.remove(dst)
+            raise
+        if mode == "keep":
+            self._count("kept")
+            self._remember(digest, key, digest, mode)
+            return path
+        self._count("remuxed" if mode == "remux" else "transcoded")
+        stored = self.media.put_file(dst, suffix=".mp4")
+        self._remember(digest, key, stored["sha256"], mode)
+        logger.info(f"Prepared {digest[:12]} for {profile['name']} ({mode}, {info.get('elapsed')}s)")
+        return stored["path"]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self.metrics, "in_flight": len(self._inflight), "workers": self.workers}
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True)
+
+
+_preparer: Optional[MediaPreparer] = None
+_preparer_lock = threading.Lock()
+
+
+def get_media_preparer() -> MediaPreparer:
+    global _preparer
+    with _preparer_lock:
+        if _preparer is None:
+            _preparer = MediaPreparer()
+        return _preparer
@@ -0,0 +1,324 @@
+# backend/app/services/media_store.py
+# Content-addressed store for generated media and upload session files.
+#
+# Every file lives once under `<root>/<sha256[:2]>/<sha256><suffix>` and has a row in the
+# `media_objects` table (see `models.MediaObject`). Jobs and other holders pin files through
+# `media_refs` rows; the reference count of an object is the number of those rows.
+# `gc()` keeps disk use bounded: unreferenced objects are removed once they are older than
+# `max_age`, and the least recently used unreferenced objects go first when the store grows
+# past `max_bytes`. Objects touched within `min_age` are never collected, so a file that was
+# just stored survives until its first reference is added.
+#
+# Files move in with a rename (same filesystem) and move out to the uploader as hard links,
+# so a video is never copied on its way from Grok to TikTok/Instagram; `sendfile` is the
+# fallback when the target directory sits on another filesystem.
+
+import os
+import re
+import time
+import uuid
+import errno
+import shutil
+import hashlib
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional, Dict, Any
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger("media_store")
+
+_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(4 * 1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def copy_file(src: str, dst: str):
+    """Copy with `os.sendfile` (kernel-side, no user-space buffers) when the platform allows it."""
+    with open(src, "rb") as fin, open(dst, "wb") as fout:
+        size = os.fstat(fin.fileno()).st_size
+        offset = 0
+        try:
+            while offset < size:
+                sent = os.sendfile(fout.fileno(), fin.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+        except (AttributeError, OSError):
+            fin.seek(offset)
+            fout.seek(offset)
+            shutil.copyfileobj(fin, fout, 4 * 1024 * 1024)
+
+
+def _unreferenced():
+    from sqlalchemy import exists
+    from ..models import MediaObject, MediaRef
+
+    return ~exists().where(MediaRef.sha256 == MediaObject.sha256)
+
+
+class MediaStore:
+    def __init__(self, root: str, session_factory=None, max_bytes: int = 20 * 1024 ** 3, max_age: float = 7 * 86400, min_age: float = 3600):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.min_age = min_age
+
+    # --- paths ---
+    def path_for(self, digest: str, suffix: str = "") -> str:
+        return os.path.join(self.root, digest[:2], f"{digest}{suffix}")
+
+    def digest_of(self, path: Optional[str]) -> Optional[str]:
+        """SHA-256 of a file inside the store (taken from its name), None for paths outside it."""
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        if os.path.dirname(os.path.dirname(path)) != self.root:
+            return None
+        stem = os.path.basename(path).split(".", 1)[0]
+        return stem if _DIGEST.match(stem) else None
+
+    # --- writing ---
+    def put_file(self, path: str, digest: Optional[str] = None, suffix: Optional[str] = None, job_id: Optional[int] = None, holder: Optional[str] = None) -> Dict[str, Any]:
+        """Move `path` into the store and return {'sha256', 'path', 'size'}.
+
+        The source file is consumed: renamed into place, or deleted when the content is
+        already stored. Pass `digest` when the caller already knows the SHA-256.
+        """
+        digest = digest or hash_file(path)
+        if suffix is None:
+            suffix = os.path.splitext(path)[1]
+        final = self.path_for(digest, suffix)
+        if os.path.abspath(path) != final:
+            if os.path.exists(final):
+                os.remove(path)
+            else:
+                os.makedirs(os.path.dirname(final), exist_ok=True)
+                try:
+                    os.replace(path, final)
+                except OSError as e:
+                    if e.errno != errno.EXDEV:
+                        raise
+                    tmp = f"{final}.{uuid.uuid4().hex}.part"
+                    copy_file(path, tmp)
+                    os.replace(tmp, final)
+                    os.remove(path)
+        size = os.path.getsize(final)
+        self._index(digest, final, size)
+        if job_id is not None or holder is not None:
+            self.add_ref(digest, job_id=job_id, holder=holder)
+        return {"sha256": digest, "path": final, "size": size}
+
+    def put_download(self, path: str, **kwargs) -> Dict[str, Any]:
+        """Adopt a file written by `DownloadManager`, which already names files by their SHA-256."""
+        stem = os.path.basename(path).split(".", 1)[0]
+        return self.put_file(path, digest=stem if _DIGEST.match(stem) else None, **kwargs)
+
+    def put_bytes(self, data: bytes, suffix: str = "", **kwargs) -> Dict[str, Any]:
+        tmp = os.path.join(self.root, f".{uuid.uuid4().hex}.part")
+        with open(tmp, "wb") as fh:
+            fh.write(data)
+        return self.put_file(tmp, digest=hashlib.sha256(data).hexdigest(), suffix=suffix, **kwargs)
+
+    def _index(self, digest: str, path: str, size: int):
+        from ..models import MediaObject
+
+        now = time.time()
+        try:
+            with self.session_factory() as db:
+                row = db.get(MediaObject, digest)
+                if row is None:
+                    db.add(MediaObject(sha256=digest, path=path, size=size, created_at=now, last_used_at=now))
+                else:
+                    row.path = path
+                    row.last_used_at = now
+                try:
+                    db.commit()
+                except IntegrityError:
+                    # another process indexed the same content concurrently
+                    db.rollback()
+        except Exception as e:
+            logger.warning(f"Could not index media {digest}: {e}")
+
+    # --- references ---
+    def add_ref(self, digest: str, job_id: Optional[int] = None, holder: Optional[str] = None):
+        from ..models import MediaRef
+
+        with self.session_factory() as db:
+            db.add(MediaRef(sha256=digest, job_id=job_id, holder=holder, created_at=time.time()))
+            db.commit()
+
+    def ensure_ref(self, digest: str, job_id: Optional[int] = None, holder: Optional[str] = None):
+        """`add_ref` unless `job_id` / `holder` already holds a reference on `digest`."""
+        from ..models import MediaRef
+
+        with self.session_factory() as db:
+            held = db.query(MediaRef.id).filter(MediaRef.sha256 == digest, MediaRef.job_id == job_id, MediaRef.holder == holder).first()
+            if held is None:
+                db.add(MediaRef(sha256=digest, job_id=job_id, holder=holder, created_at=time.time()))
+                db.commit()
+
+    def release(self, digest: str, job_id: Optional[int] = None, holder: Optional[str] = None) -> int:
+        """Drop one reference held by `job_id` / `holder`; returns the remaining reference count."""
+        from ..models import MediaRef
+
+        with self.session_factory() as db:
+            ref = (
+                db.query(MediaRef)
+                .filter(MediaRef.sha256 == digest, MediaRef.job_id == job_id, MediaRef.holder == holder)
+                .order_by(MediaRef.id)
+                .first()
+            )
+            if ref is not None:
+                db.delete(ref)
+                db.commit()
+            return db.query(MediaRef).filter(MediaRef.sha256 == digest).count()
+
+    def refcount(self, digest: str) -> int:
+        from ..models import MediaRef
+
+        with self.session_factory() as db:
+            return db.query(MediaRef).filter(MediaRef.sha256 == digest).count()
+
+    # --- reading ---
+    def lookup(self, digest: str) -> Optional[str]:
+        """Path of a stored object (and mark it as recently used), None when it is gone."""
+        from ..models import MediaObject
+
+        with self.session_factory() as db:
+            row = db.get(MediaObject, digest)
+            if row is None or not os.path.exists(row.path):
+                return None
+            path = row.path
+            row.last_used_at = time.time()
+            db.commit()
+            return path
+
+    @contextmanager
+    def handoff(self, path: str, dest_dir: str):
+        """Yield a private hard link to a stored file for the duration of an upload.
+
+        The link keeps the inode alive even if `gc()` removes the object meanwhile, and costs
+        no copy. Paths outside the store are yielded unchanged.
+        """
+        if self.digest_of(path) is None:
+            yield path
+            return
+        os.makedirs(dest_dir, exist_ok=True)
+        link = os.path.join(dest_dir, f"upload_{uuid.uuid4().hex}{os.path.splitext(path)[1]}")
+        try:
+            os.link(path, link)
+        except OSError:
+            copy_file(path, link)
+        try:
+            yield link
+        finally:
+            try:
+                os.remove(link)
+            except OSError:
+                pass
+
+    # --- retention ---
+    def _remove(self, db, digest: str, last_used_at: float, path: str) -> bool:
+        from ..models import MediaObject
+
+        # conditional delete: a reference added since the candidate query keeps the object
+        deleted = (
+            db.query(MediaObject)
+            .filter(MediaObject.sha256 == digest, MediaObject.last_used_at == last_used_at, _unreferenced())
+            .delete(synchronize_session=False)
+        )
+        db.commit()
+        if not deleted:
+            return False
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        return True
+
+    def gc(self) -> Dict[str, int]:
+        """Delete unreferenced objects past `max_age`, then LRU ones while over `max_bytes`."""
+        from sqlalchemy import func
+        from ..models import MediaObject
+
+        now = time.time()
+        removed = freed = 0
+        with self.session_factory() as db:
+            unreferenced = (
+                db.query(MediaObject)
+                .filter(_unreferenced(), MediaObject.last_used_at < now - self.min_age)
+                .order_by(MediaObject.last_used_at)
+            )
+            total = db.query(func.coalesce(func.sum(MediaObject.size), 0)).scalar()
+            candidates = [(row.sha256, row.last_used_at, row.path, row.size) for row in unreferenced]
+            for digest, last_used_at, path, size in candidates:
+                if last_used_at >= now - self.max_age and total <= self.max_bytes:
+                    break
+                if self._remove(db, digest, last_used_at, path):
+                    removed += 1
+                    freed += size
+                    total -= size
+            if total > self.max_bytes:
+                logger.warning(f"Media store holds {total} bytes of referenced media, above the {self.max_bytes} byte budget")
+            indexed = {path for (path,) in db.query(MediaObject.path)}
+        removed_files = self._sweep(indexed, now)
+        return {"removed": removed, "freed_bytes": freed, "orphans_removed": removed_files, "total_bytes": int(total)}
+
+    def _sweep(self, indexed, now: float) -> int:
+        """Remove files nobody indexed (crashed writes, failed index inserts) once they are `min_age` old."""
+        removed = 0
+        for dirpath, _, filenames in os.walk(self.root):
+            for name in filenames:
+                path = os.path.join(dirpath, name)
+                if path in indexed:
+                    continue
+                try:
+                    if os.path.getmtime(path) < now - self.min_age:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    pass
+        return removed
+
+    def stats(self) -> Dict[str, int]:
+        from sqlalchemy import func
+        from ..models import MediaObject, MediaRef
+
+        with self.session_factory() as db:
+            objects, size = db.query(func.count(MediaObject.sha256), func.coalesce(func.sum(MediaObject.size), 0)).one()
+            refs = db.query(func.count(MediaRef.id)).scalar()
+        return {"objects": objects, "bytes": int(size), "refs": refs, "max_bytes": self.max_bytes}
+
+
+_media_store: Optional[MediaStore] = None
+_media_store_lock = threading.Lock()
+
+
+def get_media_store() -> MediaStore:
+    """Process-wide store configured from the environment.
+
+    MEDIA_STORE_DIR (/tmp/media_store), MEDIA_STORE_MAX_GB (20), MEDIA_STORE_MAX_AGE_DAYS (7),
+    MEDIA_STORE_MIN_AGE (3600s).
+    """
+    global _media_store
+    with _media_store_lock:
+        if _media_store is None:
+            _media_store = MediaStore(
+                os.getenv("MEDIA_STORE_DIR", "/tmp/media_store"),
+                max_bytes=int(float(os.getenv("MEDIA_STORE_MAX_GB", "20")) * 1024 ** 3),
+                max_age=float(os.getenv("MEDIA_STORE_MAX_AGE_DAYS", "7")) * 86400,
+                min_age=float(os.getenv("MEDIA_STORE_MIN_AGE", "3600")),
+            )
+        return _media_store
@@ -0,0 +1,96 @@
+"""
+backend/app/services/page_probe.py
+
+Page-state probe shared by the Selenium (GrokAutomator) and Playwright (GrokAutomatorAsync, SocialUploader) flows.
+- One injected script inspects the page inside the browser and returns a compact "state[:detail]" verdict,
+  so a check costs a single round-trip instead of one per iframe plus a transfer of the whole body text.
+- States: ok, captcha (challenge iframe, widget or "verify you are not a bot" text), blocked (rate-limit
+  or access-denied interstitial), logged_out (login form or login URL where a session was expected) and
+  upload_missing (the expected upload input is absent); error when the script could not run.
+- Every probe is timed into `page_probe_duration_seconds{platform,page,state}`.
+- Detection only: callers stop or retry elsewhere, nothing here tries to solve or bypass a challenge.
+"""
+
+import time
+import logging
+from typing import Optional, Tuple
+from ..telemetry import CAPTCHAS, PAGE_PROBE_SECONDS
+
+logger = logging.getLogger("page_probe")
+
+OK = "ok"
+CAPTCHA = "captcha"
+BLOCKED = "blocked"
+LOGGED_OUT = "logged_out"
+UPLOAD_MISSING = "upload_missing"
+ERROR = "error"
+
+# `opts`: {session: true} when the page should be signed in, {upload: "<selector>"} when it must offer
+# an upload input. Blocked-page phrases are only matched in the title and the start of the text, where
+# interstitials put them, so ordinary pages mentioning "forbidden" do not trip the probe.
+PAGE_PROBE_JS = """
+(opts) => {
+    opts = opts || {};
+    const challenge = /recaptcha|hcaptcha|captcha|challenges\\.cloudflare\\.com|arkoselabs|funcaptcha/i;
+    for (const frame of document.querySelectorAll('iframe[src]')) {
+        if (challenge.test(frame.src)) return 'captcha:iframe';
+    }
+    if (document.querySelector('.g-recaptcha, .h-captcha, #captcha, #challenge-form, #cf-challenge-running')) return 'captcha:widget';
+    const text = ((document.body && document.body.innerText) || '').toLowerCase();
+    if (text.includes('verify') && (text.includes('bot') || text.includes('captcha'))) return 'captcha:text';
+    const head = (document.title || '').toLowerCase() + ' ' + text.slice(0, 600);
+    if (/too many requests|rate limit|\\b429\\b/.test(head)) return 'blocked:rate limit';
+    if (/access denied|you have been blocked|unusual traffic|temporarily blocked|\\b403\\b/.test(head)) return 'blocked:access denied';
+    if (opts.session && (/\\/(login|signin|sign-in|accounts\\/login)\\b/i.test(location.pathname) || document.querySelector('input[type=password]'))) {
+        return 'logged_out:' + location.pathname;
+    }
+    if (opts.upload && !document.querySelector(opts.upload)) return 'upload_missing:' + opts.upload;
+    return 'ok';
+}
+"""
+
+_SELENIUM_PAGE_PROBE = "return (" + PAGE_PROBE_JS + ")(arguments[0]);"
+
+
+class PageStateError(Exception):
+    """The page is in a state the flow cannot continue from (blocked, logged out); retryable elsewhere."""
+
+    def __init__(self, state: str, detail: str, page: str):
+        # "rate limit" stays in the message so the ProxyManager cools the proxy down like a 429
+        super().__init__(f"{page} page is {state.replace('_', ' ')} ({detail})")
+        self.state = state
+        self.detail = detail
+
+
+def _verdict(raw, platform: str, page: str, started: float) -> Tuple[str, str]:
+    state, _, detail = str(raw or OK).partition(":")
+    PAGE_PROBE_SECONDS.observe(time.perf_counter() - started, platform=platform, page=page, state=state)
+    if state == CAPTCHA:
+        CAPTCHAS.inc(platform=platform)
+    return state, detail
+
+
+def _failed(e: Exception, platform: str, page: str, started: float) -> Tuple[str, str]:
+    # e.g. the page navigated while the script ran; callers treat this like "ok"
+    logger.debug(f"Page probe on {platform}/{page} failed: {e}")
+    return _verdict(f"{ERROR}:{type(e).__name__}", platform, page, started)
+
+
+def probe_driver(driver, platform: str, page: str, upload: Optional[str] = None, session: bool = False) -> Tuple[str, str]:
+    """Probe the current page of a Selenium driver; returns `(state, detail)`."""
+    started = time.perf_counter()
+    try:
+        raw = driver.execute_script(_SELENIUM_PAGE_PROBE, {"upload": upload, "session": session})
+    except Exception as e:
+        return _failed(e, platform, page, started)
+    return _verdict(raw, platform, page, started)
+
+
+async def probe_page(page, platform: str, label: str, upload: Optional[str] = None, session: bool = False) -> Tuple[str, str]:
+    """Probe a Playwright page; returns `(state, detail)`."""
+    started = time.perf_counter()
+    try:
+        raw = await page.evaluate(PAGE_PROBE_JS, {"upload": upload, "session": session})
+    except Exception as e:
+        return _failed(e, platform, label, started)
+    return _verdict(raw, platform, label, started)
@@ -0,0 +1,298 @@
+"""
+backend/app/services/playwright_engine.py
+
+PlaywrightEngine
+- One long-lived async Playwright driver and Chromium process per worker process, shared by every upload.
+- Runs its own event loop in a daemon thread, so both sync callers (job worker threads, scripts) and async
+  callers (FastAPI handlers on another loop) can schedule flows on it. Playwright objects are bound to the
+  loop that created them, which is why all page work is funnelled through `call` / `call_sync`.
+- Caches one `BrowserContext` per account key (typically the storage-state file of the account) with LRU
+  eviction. Contexts with open pages are never evicted. Uploads for different accounts run concurrently as
+  separate pages; callers without an account get an ephemeral context that is closed afterwards.
+- Relaunches Chromium transparently if the browser process disconnects.
+- Applies the `BrowserProfile` (browser_profile.py): launch flags, resource-type routing per context,
+  CDP URL blocking per page, and a memory watchdog that relaunches Chromium when it exceeds the budget
+  (as soon as no page is open, so running uploads are never cut off).
+
+Requirements:
+  pip install playwright
+  playwright install chromium
+"""
+
+import os
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Optional, Dict, Callable, Awaitable, Any
+from playwright.async_api import async_playwright
+from .browser_profile import BROWSER_RECYCLES, BrowserProfile, get_browser_profile, playwright_memory
+
+logger = logging.getLogger("playwright_engine")
+
+
+class _CachedContext:
+    def __init__(self, context):
+        self.context = context
+        self.active_pages = 0
+
+
+class PlaywrightEngine:
+    def __init__(self, headless: bool = True, max_contexts: Optional[int] = None, launch_args: Optional[list] = None, profile: Optional[BrowserProfile] = None):
+        self.headless = headless
+        self.max_contexts = max_contexts or int(os.getenv("PLAYWRIGHT_MAX_CONTEXTS", "16"))
+        self.profile = profile or get_browser_profile()
+        self.launch_args = (launch_args or []) + self.profile.chrome_args()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._thread_lock = threading.Lock()
+        self._playwright = None
+        self._browser = None
+        self._browser_lock: Optional[asyncio.Lock] = None
+        self._context_lock: Optional[asyncio.Lock] = None
+        self._contexts: "OrderedDict[str, _CachedContext]" = OrderedDict()
+        # pages open in any context, cached or ephemeral; the watchdog only relaunches at zero
+        self._open_pages = 0
+        self._recycle_pending = False
+        self._watchdog: Optional[asyncio.Task] = None
+        self.recycles = 0
+
+    # --- loop management ---
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._thread_lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def _run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                self._thread = threading.Thread(target=_run, name="playwright-engine", daemon=True)
+                self._thread.start()
+                ready.wait()
+                self._loop = loop
+            return self._loop
+
+    def _submit(self, fn: Callable[..., Awaitable], *args, **kwargs):
+        loop = self._ensure_loop()
+        return asyncio.run_coroutine_threadsafe(fn(*args, **kwargs), loop)
+
+    async def call(self, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Await `fn(*args, **kwargs)` executed on the engine loop, from any other event loop."""
+        return await asyncio.wrap_future(self._submit(fn, *args, **kwargs))
+
+    def call_sync(self, fn: Callable[..., Awaitable], *args, **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` on the engine loop and block the calling thread for the result."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("call_sync cannot be used from the engine loop; await the coroutine instead")
+        return self._submit(fn, *args, **kwargs).result()
+
+    # --- browser and contexts (engine loop only) ---
+    async def _ensure_browser(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+            if self._browser is not None:
+                logger.warning("Chromium disconnected; relaunching and dropping cached contexts")
+                self._contexts.clear()
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+            self._browser = await self._playwright.chromium.launch(headless=self.headless, args=self.launch_args)
+            if self._watchdog is None and self.profile.memory_budget_mb and self.profile.watchdog_interval:
+                self._watchdog = asyncio.get_running_loop().create_task(self._watch_memory())
+            return self._browser
+
+    async def _watch_memory(self):
+        while True:
+            await asyncio.sleep(self.profile.watchdog_interval)
+            used = await asyncio.to_thread(playwright_memory)
+            if self.profile.over_budget(used):
+                logger.info(f"Chromium uses {used / 1024 ** 2:.0f} MB (budget {self.profile.memory_budget_mb} MB); relaunching when idle")
+                self._recycle_pending = True
+                await self._recycle_if_idle()
+
+    async def _recycle_if_idle(self):
+        if self._browser_lock is None:
+            self._browser_lock = asyncio.Lock()
+        async with self._browser_lock:
+            if not self._recycle_pending or self._open_pages or self._browser is None:
+                return
+            self._recycle_pending = False
+            contexts = list(self._contexts.values())
+            self._contexts.clear()
+            for cached in contexts:
+                try:
+                    await cached.context.close()
+                except Exception:
+                    pass
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            # the next page launches a fresh Chromium; sessions come back from the session store
+            self._browser = None
+            self.recycles += 1
+            BROWSER_RECYCLES.inc(engine="playwright")
+
+    async def _new_context(self, browser, storage_state=None, proxy: Optional[str] = None):
+        context = await browser.new_context(**self._context_options(storage_state, proxy))
+        await self.profile.apply_playwright_context(context)
+        return context
+
+    async def _new_page(self, context):
+        page = await context.new_page()
+        await self.profile.apply_playwright_page(context, page)
+        return page
+
+    async def _evict(self):
+        while len(self._contexts) > self.max_contexts:
+            victim_key = next((k for k, c in self._contexts.items() if c.active_pages == 0), None)
+            if victim_key is None:
+                # every cached context is in use; let the cache run over its limit until pages close
+                return
+            cached = self._contexts.pop(victim_key)
+            try:
+                await cached.context.close()
+            except Exception:
+                pass
+
+    @staticmethod
+    def _context_options(storage_state=None, proxy: Optional[str] = None) -> Dict[str, Any]:
+        options: Dict[str, Any] = {"storage_state": storage_state}
+        if proxy:
+            options["proxy"] = {"server": proxy}
+        return options
+
+    async def _checkout_context(self, key: str, storage_state=None, proxy: Optional[str] = None) -> _CachedContext:
+        """Return the cached context for `key` (creating it if needed) with one page slot reserved."""
+        if self._context_lock is None:
+            self._context_lock = asyncio.Lock()
+        async with self._context_lock:
+            browser = await self._ensure_browser()
+            cached = self._contexts.get(key)
+            if cached is not None:
+                self._contexts.move_to_end(key)
+                cached.active_pages += 1
+                return cached
+            context = await self._new_context(browser, storage_state, proxy)
+            cached = _CachedContext(context)
+            cached.active_pages += 1
+            self._contexts[key] = cached
+            await self._evict()
+            return cached
+
+    @asynccontextmanager
+    async def page(self, key: Optional[str] = None, storage_state=None, proxy: Optional[str] = None):
+        """Yield `(context, page)`. With a key the context is cached and reused; without one it is ephemeral.
+
+        Callers that route through a proxy must include it in `key`; a cached context keeps its proxy.
+        """
+        self._open_pages += 1
+        try:
+            if key is None:
+                browser = await self._ensure_browser()
+                context = await self._new_context(browser, storage_state, proxy)
+                try:
+                    page = await self._new_page(context)
+                    yield context, page
+                finally:
+                    try:
+                        await context.close()
+                    except Exception:
+                        pass
+                return
+
+            cached = await self._checkout_context(key, storage_state, proxy)
+            page = None
+            try:
+                page = await self._new_page(cached.context)
+                yield cached.context, page
+            finally:
+                cached.active_pages -= 1
+                if page is not None:
+                    try:
+                        await page.close()
+                    except Exception:
+                        pass
+                await self._evict()
+        finally:
+            self._open_pages -= 1
+            if self._recycle_pending and not self._open_pages:
+                await self._recycle_if_idle()
+
+    async def invalidate(self, key: str):
+        """Drop the cached context for `key`, e.g. after its session was logged out."""
+        cached = self._contexts.pop(key, None)
+        if cached is not None:
+            try:
+                await cached.context.close()
+            except Exception:
+                pass
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "contexts": len(self._contexts),
+            "active_pages": sum(c.active_pages for c in self._contexts.values()),
+            "open_pages": self._open_pages,
+            "max_contexts": self.max_contexts,
+            "recycles": self.recycles,
+        }
+
+    async def _shutdown(self):
+        if self._watchdog is not None:
+            self._watchdog.cancel()
+            self._watchdog = None
+        for cached in list(self._contexts.values()):
+            try:
+                await cached.context.close()
+            except Exception:
+                pass
+        self._contexts.clear()
+        if self._browser is not None:
+            try:
+                await self._browser.close()
+            except Exception:
+                pass
+            self._browser = None
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+
+    def close(self):
+        with self._thread_lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._shutdown(), loop).result(timeout=30)
+        except Exception as e:
+            logger.warning(f"Playwright engine shutdown failed: {e}")
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+_engines: Dict[bool, PlaywrightEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_playwright_engine(headless: bool = True) -> PlaywrightEngine:
+    """Process-wide engine per headless mode (one Chromium process each)."""
+    with _engines_lock:
+        engine = _engines.get(headless)
+        if engine is None:
+            engine = _engines[headless] = PlaywrightEngine(headless=headless)
+        return engine
+
+
+def shutdown_playwright_engines():
+    with _engines_lock:
+        engines = list(_engines.values())
+        _engines.clear()
+    for engine in engines:
+        engine.close()
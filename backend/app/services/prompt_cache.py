@@ -0,0 +1,280 @@
+# backend/app/services/prompt_cache.py
+# Result cache for Grok imagine, keyed by the normalized prompt.
+#
+# Prompts are normalized before hashing: lower-cased, whitespace collapsed and, when a
+# template is configured (GROK_PROMPT_TEMPLATE, e.g. "{prompt}, cinematic 9:16 short"),
+# reduced to the part that filled the template's placeholder. Entries hold the JSON-friendly
+# part of the result (download_url, local_path, sha256) and live in an in-memory LRU with a
+# TTL, optionally backed by the `prompt_cache` table so they survive restarts.
+#
+# A hit is only served while its media file is still in the `MediaStore`. Concurrent
+# requests for the same key are coalesced ("single-flight"): the first caller generates,
+# every other caller - sync or async - waits for that one result.
+#
+# Policies: "use" (read + write), "refresh" (skip the read, write the new result),
+# "bypass" (neither read nor write, no coalescing).
+
+import os
+import re
+import time
+import hashlib
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("prompt_cache")
+
+POLICIES = ("use", "bypass", "refresh")
+CACHED_FIELDS = ("download_url", "local_path", "sha256")
+
+
+def normalize_prompt(prompt: str, template: Optional[str] = None) -> str:
+    text = " ".join((prompt or "").split()).lower()
+    if template and "{prompt}" in template:
+        head, _, tail = " ".join(template.split()).lower().partition("{prompt}")
+        match = re.fullmatch(re.escape(head) + r"(.*)" + re.escape(tail), text)
+        if match:
+            text = match.group(1).strip()
+    return text
+
+
+class SqlPromptStore:
+    """Rows in the `prompt_cache` table (see `models.PromptCacheEntry`)."""
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+
+    def get(self, key: str) -> Optional[Tuple[Dict, float]]:
+        from ..models import PromptCacheEntry
+
+        with self.session_factory() as db:
+            row = db.get(PromptCacheEntry, key)
+            if row is None:
+                return None
+            return row.value, row.created_at
+
+    def set(self, key: str, prompt: str, value: Dict, created_at: float):
+        from ..models import PromptCacheEntry
+
+        with self.session_factory() as db:
+            db.merge(PromptCacheEntry(key=key, prompt=prompt, value=value, created_at=created_at))
+            db.commit()
+
+    def delete(self, key: str):
+        from ..models import PromptCacheEntry
+
+        with self.session_factory() as db:
+            db.query(PromptCacheEntry).filter(PromptCacheEntry.key == key).delete(synchronize_session=False)
+            db.commit()
+
+
+class PromptCache:
+    def __init__(self, ttl: float = 86400, max_entries: int = 512, store=None, template: Optional[str] = None, media_store=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.store = store
+        self.template = template
+        self._media_store = media_store
+        self._entries: "OrderedDict[str, Tuple[Dict, float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"hits": 0, "misses": 0, "coalesced": 0, "bypassed": 0, "refreshes": 0, "stale_media": 0}
+
+    @property
+    def media_store(self):
+        if self._media_store is None:
+            from .media_store import get_media_store
+            self._media_store = get_media_store()
+        return self._media_store
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def key(self, prompt: str) -> str:
+        return hashlib.sha256(normalize_prompt(prompt, self.template).encode("utf-8")).hexdigest()
+
+    # --- entries ---
+    def _remember(self, key: str, value: Dict, created_at: float):
+        with self._lock:
+            self._entries[key] = (value, created_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+        if self.store is not None:
+            try:
+                self.store.delete(key)
+            except Exception as e:
+                logger.warning(f"Prompt cache store delete failed: {e}")
+
+    def _lookup(self, key: str) -> Optional[Tuple[Dict, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.store is None:
+            return None
+        try:
+            entry = self.store.get(key)
+        except Exception as e:
+            logger.warning(f"Prompt cache store read failed: {e}")
+            return None
+        if entry is not None:
+            self._remember(key, *entry)
+        return entry
+
+    def _media_path(self, value: Dict) -> Optional[str]:
+        digest = value.get("sha256") or self.media_store.digest_of(value.get("local_path"))
+        if not digest:
+            return None
+        # lookup() also marks the file as recently used, so popular results outlive GC
+        return self.media_store.lookup(digest)
+
+    def get(self, prompt: str) -> Optional[Dict]:
+        """Cached result for `prompt`, None when absent, expired or its media is gone."""
+        key = self.key(prompt)
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        value, created_at = entry
+        if time.time() - created_at >= self.ttl:
+            self._forget(key)
+            return None
+        path = self._media_path(value)
+        if not path:
+            self._count("stale_media")
+            self._forget(key)
+            return None
+        return {**value, "local_path": path}
+
+    def set(self, prompt: str, result: Dict):
+        value = {name: result.get(name) for name in CACHED_FIELDS if result.get(name) is not None}
+        if not value.get("local_path"):
+            # nothing reusable without the media file
+            return
+        key = self.key(prompt)
+        created_at = time.time()
+        self._remember(key, value, created_at)
+        if self.store is not None:
+            try:
+                self.store.set(key, normalize_prompt(prompt, self.template), value, created_at)
+            except Exception as e:
+                logger.warning(f"Prompt cache store write failed: {e}")
+
+    # --- single-flight ---
+    def _claim(self, key: str) -> Tuple[Future, bool]:
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.metrics["coalesced"] += 1
+                return future, False
+            future = self._inflight[key] = Future()
+            # a running future cannot be cancelled: a follower whose client went away must not
+            # cancel the shared result for the leader and the other followers
+            future.set_running_or_notify_cancel()
+            return future, True
+
+    def _settle(self, key: str, future: Future, prompt: str, result: Optional[Dict] = None, exc: Optional[BaseException] = None):
+        with self._lock:
+            self._inflight.pop(key, None)
+        if exc is not None:
+            if not future.done():
+                future.set_exception(exc)
+            return
+        self.set(prompt, result)
+        if not future.done():
+            future.set_result(result)
+
+    def _check_policy(self, prompt: str, policy: str) -> Optional[Dict]:
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown cache policy {policy!r}; expected one of {', '.join(POLICIES)}")
+        if policy == "bypass":
+            self._count("bypassed")
+            return None
+        if policy == "refresh":
+            self._count("refreshes")
+            return None
+        cached = self.get(prompt)
+        self._count("hits" if cached else "misses")
+        return cached
+
+    def run(self, prompt: str, generate: Callable[[], Dict], policy: str = "use") -> Tuple[Dict, str]:
+        """Return `(result, state)`; state is "hit", "miss", "coalesced", "refresh" or "bypass"."""
+        cached = self._check_policy(prompt, policy)
+        if cached is not None:
+            return {**cached, "cached": True}, "hit"
+        if policy == "bypass":
+            return generate(), "bypass"
+        key = self.key(prompt)
+        future, leader = self._claim(key)
+        if not leader:
+            return dict(future.result()), "coalesced"
+        try:
+            result = generate()
+        except BaseException as e:
+            self._settle(key, future, prompt, exc=e)
+            raise
+        self._settle(key, future, prompt, result)
+        return result, "miss" if policy == "use" else "refresh"
+
+    async def run_async(self, prompt: str, generate: Callable[[], Awaitable[Dict]], policy: str = "use") -> Tuple[Dict, str]:
+        """Async variant of `run`; coalesces with sync callers of the same prompt as well."""
+        cached = await asyncio.to_thread(self._check_policy, prompt, policy)
+        if cached is not None:
+            return {**cached, "cached": True}, "hit"
+        if policy == "bypass":
+            return await generate(), "bypass"
+        key = self.key(prompt)
+        future, leader = self._claim(key)
+        if not leader:
+            return dict(await asyncio.shield(asyncio.wrap_future(future))), "coalesced"
+        try:
+            result = await generate()
+        except BaseException as e:
+            self._settle(key, future, prompt, exc=e)
+            raise
+        await asyncio.to_thread(self._settle, key, future, prompt, result)
+        return result, "miss" if policy == "use" else "refresh"
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.metrics)
+            stats["entries"] = len(self._entries)
+            stats["in_flight"] = len(self._inflight)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_prompt_cache: Optional[PromptCache] = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache() -> PromptCache:
+    """Process-wide cache configured from the environment.
+
+    GROK_CACHE_TTL (86400s), GROK_CACHE_SIZE (512), GROK_CACHE_BACKEND ("sql" or "memory"),
+    GROK_PROMPT_TEMPLATE (optional, with a "{prompt}" placeholder).
+    """
+    global _prompt_cache
+    with _prompt_cache_lock:
+        if _prompt_cache is None:
+            backend = os.getenv("GROK_CACHE_BACKEND", "sql").lower()
+            _prompt_cache = PromptCache(
+                ttl=float(os.getenv("GROK_CACHE_TTL", "86400")),
+                max_entries=int(os.getenv("GROK_CACHE_SIZE", "512")),
+                store=SqlPromptStore() if backend == "sql" else None,
+                template=os.getenv("GROK_PROMPT_TEMPLATE") or None,
+            )
+        return _prompt_cache
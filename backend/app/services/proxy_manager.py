@@ -0,0 +1,241 @@
+# backend/app/services/proxy_manager.py
+# Shared proxy health scoring and adaptive rotation for TrendScout, GrokAutomator and SocialUploader.
+#
+# Every proxy gets running statistics: EWMA latency, success/failure counts, in-flight requests
+# and a cooldown that starts after a 429 (doubling on consecutive 429s) or after repeated
+# timeouts. `acquire()` picks the best-scoring proxy that is neither cooling down nor over its
+# per-proxy rate limit, waiting for the earliest one to free up when all are busy. Callers
+# report the outcome so the next pick uses fresh numbers. Stats are persisted to a JSON file
+# so a restart does not send traffic straight back to a proxy that was just rate-limited.
+
+import os
+import json
+import time
+import random
+import logging
+import threading
+from typing import Optional, Dict, Iterable
+
+from ..telemetry import PROXY_COOLDOWN_SECONDS, PROXY_OUTCOMES, proxy_label
+
+logger = logging.getLogger("proxy_manager")
+
+
+class ProxyUnavailableError(Exception):
+    pass
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    text = str(exc).lower()
+    return "429" in text or "too many requests" in text or "rate limit" in text
+
+
+class ProxyStats:
+    FIELDS = ("latency", "successes", "failures", "rate_limits", "consecutive_failures", "consecutive_rate_limits", "cooldown_until", "next_allowed")
+
+    def __init__(self):
+        self.latency = 1.0  # seconds, EWMA
+        self.successes = 0
+        self.failures = 0
+        self.rate_limits = 0
+        self.consecutive_failures = 0
+        self.consecutive_rate_limits = 0
+        self.cooldown_until = 0.0
+        self.next_allowed = 0.0
+        self.in_flight = 0
+
+    def score(self) -> float:
+        # Laplace-smoothed success rate, penalised by latency and concurrent use
+        success_rate = (self.successes + 1) / (self.successes + self.failures + 2)
+        return success_rate / (1.0 + self.latency) / (1 + self.in_flight)
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "ProxyStats":
+        stats = cls()
+        for name in cls.FIELDS:
+            if name in data:
+                setattr(stats, name, data[name])
+        return stats
+
+
+class ProxyManager:
+    def __init__(self, state_path: Optional[str] = None, cooldown: float = 60, max_cooldown: float = 900, rate_per_minute: float = 30, max_wait: float = 30, save_interval: float = 30):
+        self.state_path = state_path
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.min_interval = 60.0 / rate_per_minute if rate_per_minute else 0.0
+        self.max_wait = max_wait
+        self.save_interval = save_interval
+        self._stats: Dict[str, ProxyStats] = {}
+        self._lock = threading.Lock()
+        self._last_save = 0.0
+        self.load()
+
+    def _get(self, proxy: str) -> ProxyStats:
+        stats = self._stats.get(proxy)
+        if stats is None:
+            stats = self._stats[proxy] = ProxyStats()
+        return stats
+
+    def _available_at(self, stats: ProxyStats) -> float:
+        return max(stats.cooldown_until, stats.next_allowed)
+
+    def acquire(self, candidates: Iterable[str], max_wait: Optional[float] = None, exclude: Iterable[str] = ()) -> Optional[str]:
+        """Reserve the best available proxy among `candidates`.
+
+        Returns None when there are no candidates (direct connection). Raises ProxyUnavailableError
+        when every candidate stays cooling down / rate limited for longer than `max_wait` seconds.
+        The caller must follow up with `report_success` or `report_failure`.
+        """
+        candidates = [p for p in dict.fromkeys(candidates or []) if p]
+        if not candidates:
+            return None
+        excluded = set(exclude)
+        if len(excluded) < len(candidates):
+            candidates = [p for p in candidates if p not in excluded]
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.time() + max_wait
+        while True:
+            with self._lock:
+                now = time.time()
+                ready = [p for p in candidates if self._available_at(self._get(p)) <= now]
+                if ready:
+                    best = max(self._get(p).score() for p in ready)
+                    # random tie-break spreads load across equally good (e.g. never used) proxies
+                    proxy = random.choice([p for p in ready if self._get(p).score() >= best * 0.999])
+                    stats = self._get(proxy)
+                    stats.in_flight += 1
+                    stats.next_allowed = now + self.min_interval
+                    return proxy
+                earliest = min(self._available_at(self._get(p)) for p in candidates)
+            if earliest > deadline:
+                raise ProxyUnavailableError(f"All {len(candidates)} proxies cooling down or rate limited for another {earliest - time.time():.0f}s")
+            time.sleep(max(0.0, min(earliest, deadline) - time.time()))
+
+    def report_success(self, proxy: Optional[str], latency: Optional[float] = None):
+        if not proxy:
+            return
+        with self._lock:
+            stats = self._get(proxy)
+            stats.in_flight = max(0, stats.in_flight - 1)
+            stats.successes += 1
+            PROXY_OUTCOMES.inc(proxy=proxy_label(proxy), outcome="success")
+            stats.consecutive_failures = 0
+            stats.consecutive_rate_limits = 0
+            if latency is not None:
+                stats.latency = 0.7 * stats.latency + 0.3 * latency
+        self._maybe_save()
+
+    def report_failure(self, proxy: Optional[str], rate_limited: bool = False, latency: Optional[float] = None):
+        if not proxy:
+            return
+        with self._lock:
+            stats = self._get(proxy)
+            stats.in_flight = max(0, stats.in_flight - 1)
+            stats.failures += 1
+            stats.consecutive_failures += 1
+            if latency is not None:
+                stats.latency = 0.7 * stats.latency + 0.3 * latency
+            now = time.time()
+            label = proxy_label(proxy)
+            PROXY_OUTCOMES.inc(proxy=label, outcome="rate_limited" if rate_limited else "failure")
+            if rate_limited:
+                stats.rate_limits += 1
+                stats.consecutive_rate_limits += 1
+                backoff = min(self.cooldown * 2 ** (stats.consecutive_rate_limits - 1), self.max_cooldown)
+                stats.cooldown_until = now + backoff
+                PROXY_COOLDOWN_SECONDS.inc(backoff, proxy=label)
+                logger.warning(f"Proxy {label} rate limited; cooling down for {backoff:.0f}s")
+            elif stats.consecutive_failures >= 3:
+                stats.cooldown_until = now + min(self.cooldown, self.max_cooldown)
+                PROXY_COOLDOWN_SECONDS.inc(min(self.cooldown, self.max_cooldown), proxy=label)
+        self._maybe_save()
+
+    def release(self, proxy: Optional[str]):
+        """Return a reservation without judging the proxy (e.g. the failure was bad credentials)."""
+        if not proxy:
+            return
+        with self._lock:
+            stats = self._get(proxy)
+            stats.in_flight = max(0, stats.in_flight - 1)
+
+    def report_exception(self, proxy: Optional[str], exc: BaseException, latency: Optional[float] = None):
+        self.report_failure(proxy, rate_limited=is_rate_limit_error(exc), latency=latency)
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            now = time.time()
+            return {
+                proxy: {**s.to_dict(), "in_flight": s.in_flight, "score": round(s.score(), 4), "cooling": s.cooldown_until > now}
+                for proxy, s in self._stats.items()
+            }
+
+    # --- persistence ---
+    def load(self):
+        if not self.state_path or not os.path.exists(self.state_path):
+            return
+        try:
+            with open(self.state_path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            with self._lock:
+                self._stats = {proxy: ProxyStats.from_dict(values) for proxy, values in data.items()}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not load proxy state from {self.state_path}: {e}")
+
+    def save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            self._last_save = time.time()
+            data = self._snapshot()
+        self._write(data)
+
+    def _maybe_save(self):
+        if not self.state_path:
+            return
+        with self._lock:
+            # check and claim the interval together so concurrent reports trigger one write
+            if time.time() - self._last_save < self.save_interval:
+                return
+            self._last_save = time.time()
+            data = self._snapshot()
+        self._write(data)
+
+    def _snapshot(self) -> Dict[str, Dict]:
+        return {proxy: s.to_dict() for proxy, s in self._stats.items()}
+
+    def _write(self, data: Dict[str, Dict]):
+        # one temp file per writer thread: a shared name lets two writes interleave into a truncated file
+        tmp = f"{self.state_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump(data, fh)
+            os.replace(tmp, self.state_path)
+        except OSError as e:
+            logger.warning(f"Could not save proxy state to {self.state_path}: {e}")
+
+
+_proxy_manager: Optional[ProxyManager] = None
+_proxy_manager_lock = threading.Lock()
+
+
+def get_proxy_manager() -> ProxyManager:
+    """Process-wide manager configured from the environment.
+
+    PROXY_STATE_PATH (/tmp/proxy_state.json, empty to disable persistence), PROXY_COOLDOWN (60s),
+    PROXY_MAX_COOLDOWN (900s), PROXY_RATE_PER_MINUTE (30 per proxy), PROXY_MAX_WAIT (30s).
+    """
+    global _proxy_manager
+    with _proxy_manager_lock:
+        if _proxy_manager is None:
+            _proxy_manager = ProxyManager(
+                state_path=os.getenv("PROXY_STATE_PATH", "/tmp/proxy_state.json") or None,
+                cooldown=float(os.getenv("PROXY_COOLDOWN", "60")),
+                max_cooldown=float(os.getenv("PROXY_MAX_COOLDOWN", "900")),
+                rate_per_minute=float(os.getenv("PROXY_RATE_PER_MINUTE", "30")),
+                max_wait=float(os.getenv("PROXY_MAX_WAIT", "30")),
+            )
+        return _proxy_manager
@@ -0,0 +1,188 @@
+# backend/app/services/session_store.py
+# Storage-state store for upload accounts, keyed by (platform, account).
+#
+# The latest Playwright storage state of every account is kept in memory and in the
+# `upload_sessions` table (see `models.UploadSession`), so uploads reuse an authenticated
+# session without anyone passing cookie files around. A state is written back only when its
+# cookies or local storage actually changed; expiry timestamps that slide on every request do
+# not count as a change. `is_valid()` is a cheap pre-upload check that never opens a browser:
+# the account's auth cookie must be present and unexpired, and no flow may have reported the
+# session as logged out since it was saved.
+#
+# Older releases wrote a `tiktok_storage_<ts>.json` / `ig_storage_<ts>.json` file per upload;
+# `import_file()` adopts such a file and `purge_legacy_files()` removes the leftovers.
+
+import os
+import json
+import time
+import glob
+import hashlib
+import logging
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("session_store")
+
+# cookies that carry the logged-in session on each platform
+AUTH_COOKIES = {
+    "tiktok": ("sessionid", "sessionid_ss", "sid_tt"),
+    "instagram": ("sessionid",),
+}
+LEGACY_PATTERNS = ("tiktok_storage_*.json", "ig_storage_*.json")
+
+SessionKey = Tuple[str, str]
+
+
+def state_digest(state: Dict[str, Any]) -> str:
+    """Hash of what identifies a session: cookie values and local storage, not their expiry."""
+    cookies = sorted(
+        (c.get("name"), c.get("domain"), c.get("path"), c.get("value"))
+        for c in state.get("cookies") or []
+    )
+    origins = sorted(
+        (o.get("origin"), sorted((i.get("name"), i.get("value")) for i in o.get("localStorage") or []))
+        for o in state.get("origins") or []
+    )
+    return hashlib.sha256(json.dumps([cookies, origins]).encode("utf-8")).hexdigest()
+
+
+class SessionStore:
+    def __init__(self, session_factory=None, expiry_margin: float = 300):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.expiry_margin = expiry_margin
+        # (platform, account) -> {"state", "digest", "valid"}
+        self._entries: Dict[SessionKey, Dict[str, Any]] = {}
+        # bumped whenever a session is replaced from outside a browser context (import, logout),
+        # so cached contexts built from the previous state are not reused
+        self._generations: Dict[SessionKey, int] = {}
+        self._lock = threading.Lock()
+        self.metrics = {"writes": 0, "unchanged": 0, "invalidated": 0}
+
+    def _load(self, key: SessionKey) -> Optional[Dict[str, Any]]:
+        from ..models import UploadSession
+
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+        with self.session_factory() as db:
+            row = db.get(UploadSession, key)
+            if row is None:
+                return None
+            entry = {"state": row.storage_state, "digest": row.digest, "valid": row.valid}
+        with self._lock:
+            self._entries.setdefault(key, entry)
+        return entry
+
+    def get(self, platform: str, account: str) -> Optional[Dict[str, Any]]:
+        """Latest storage state of the account (usable as Playwright `storage_state`), or None."""
+        entry = self._load((platform, account))
+        return entry["state"] if entry else None
+
+    def save(self, platform: str, account: str, state: Dict[str, Any]) -> bool:
+        """Store `state` if it differs from the stored one; returns True when it was written."""
+        from ..models import UploadSession
+
+        key = (platform, account)
+        digest = state_digest(state)
+        entry = self._load(key)
+        if entry is not None and entry["digest"] == digest and entry["valid"]:
+            with self._lock:
+                self.metrics["unchanged"] += 1
+            return False
+        now = time.time()
+        with self.session_factory() as db:
+            db.merge(UploadSession(platform=platform, account=account, storage_state=state, digest=digest, valid=True, updated_at=now))
+            db.commit()
+        with self._lock:
+            self._entries[key] = {"state": state, "digest": digest, "valid": True}
+            self.metrics["writes"] += 1
+        return True
+
+    def generation(self, platform: str, account: str) -> int:
+        with self._lock:
+            return self._generations.get((platform, account), 0)
+
+    def _bump(self, key: SessionKey):
+        with self._lock:
+            self._generations[key] = self._generations.get(key, 0) + 1
+
+    def invalidate(self, platform: str, account: str):
+        """Mark the session as logged out (e.g. the upload page redirected to a login form)."""
+        from ..models import UploadSession
+
+        key = (platform, account)
+        with self.session_factory() as db:
+            row = db.get(UploadSession, key)
+            if row is not None:
+                row.valid = False
+                db.commit()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["valid"] = False
+            self.metrics["invalidated"] += 1
+        self._bump(key)
+
+    def is_valid(self, platform: str, account: str) -> bool:
+        entry = self._load((platform, account))
+        if entry is None or not entry["valid"]:
+            return False
+        names = AUTH_COOKIES.get(platform, ())
+        deadline = time.time() + self.expiry_margin
+        for cookie in entry["state"].get("cookies") or []:
+            if cookie.get("name") in names and cookie.get("value"):
+                expires = cookie.get("expires", -1)
+                # -1: session cookie, valid for as long as the browser context lives
+                if expires is None or expires < 0 or expires > deadline:
+                    return True
+        return False
+
+    def import_file(self, platform: str, account: str, path: str) -> bool:
+        """Adopt a storage_state JSON file; returns False when it is missing or unreadable."""
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                state = json.load(fh)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not import storage state {path}: {e}")
+            return False
+        if self.save(platform, account, state):
+            self._bump((platform, account))
+        return True
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {**self.metrics, "cached": len(self._entries)}
+
+
+def purge_legacy_files(directory: str, max_age: float = 86400) -> int:
+    """Delete per-upload storage files older than `max_age` seconds written by earlier versions."""
+    removed = 0
+    cutoff = time.time() - max_age
+    for pattern in LEGACY_PATTERNS:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+                    removed += 1
+            except OSError:
+                pass
+    if removed:
+        logger.info(f"Removed {removed} legacy storage-state files from {directory}")
+    return removed
+
+
+_session_store: Optional[SessionStore] = None
+_session_store_lock = threading.Lock()
+
+
+def get_session_store() -> SessionStore:
+    """Process-wide store. SESSION_EXPIRY_MARGIN (300s): auth cookies expiring sooner count as expired."""
+    global _session_store
+    with _session_store_lock:
+        if _session_store is None:
+            _session_store = SessionStore(expiry_margin=float(os.getenv("SESSION_EXPIRY_MARGIN", "300")))
+        return _session_store
@@ -0,0 +1,198 @@
+"""
+backend/app/services/shard_coordinator.py
+
+ShardCoordinator
+- Splits accounts and proxies between the job workers that share `DATABASE_URL`, so scaling out keeps
+  one account in one worker: uploads of an account run one at a time, on the worker that already has its
+  browser context warm, and no proxy is driven by two workers at once.
+- Workers register in `worker_registrations` and heartbeat; a worker is live while its heartbeat is younger
+  than the lease (WORKER_LEASE_SECONDS, 60).
+- Every resource ("tiktok:alice", "proxy:10.0.0.1:8080") has an owner among the live workers chosen by
+  rendezvous hashing (highest sha256(resource, worker)), so a joining or leaving worker only moves the
+  resources it gains or loses. A worker only uses a resource while it holds its row in `resource_leases`.
+- Rebalancing: each heartbeat extends the worker's leases and gives back those now owned by another live
+  worker, once no job of this worker still uses them; the new owner takes them over on its next poll.
+  A stopped worker releases everything at once, a crashed one when its leases expire.
+- The Grok account (GROK_USERNAME) is leased first come, first served: a worker whose account is held by
+  another live worker runs no jobs until it is released.
+- Jobs carry `shard_key` (see `shard_key_for`); workers only claim jobs whose key they lease, or without one.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger("shard_coordinator")
+
+
+def shard_key_for(payload: Optional[Dict]) -> Optional[str]:
+    """Resource that routes a job: the social account it uploads as, or None (any worker)."""
+    from .upload_scheduler import normalize_platform
+
+    payload = payload or {}
+    platform = normalize_platform(payload.get("platform"))
+    account = payload.get("account")
+    if platform and account:
+        return f"{platform}:{account}"
+    return None
+
+
+def proxy_resource(proxy: str) -> str:
+    return f"proxy:{proxy}"
+
+
+def rendezvous_owner(resource: str, workers: Iterable[str]) -> Optional[str]:
+    best, best_score = None, b""
+    for worker in workers:
+        score = hashlib.sha256(f"{resource}|{worker}".encode("utf-8")).digest()
+        if best is None or score > best_score:
+            best, best_score = worker, score
+    return best
+
+
+class ShardCoordinator:
+    def __init__(self, worker_id: str, session_factory=None, lease: Optional[float] = None, grok_account: Optional[str] = None):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.worker_id = worker_id
+        self.session_factory = session_factory
+        self.lease = lease or float(os.getenv("WORKER_LEASE_SECONDS", "60"))
+        self.grok_account = grok_account if grok_account is not None else os.getenv("GROK_USERNAME")
+        self._lock = threading.Lock()
+        self._workers: List[str] = [worker_id]
+        self._held: Set[str] = set()
+        self._grok_blocked_logged = False
+        self.metrics = {"acquired": 0, "contended": 0, "released": 0, "rebalances": 0}
+
+    @property
+    def grok_resource(self) -> Optional[str]:
+        return f"grok:{self.grok_account}" if self.grok_account else None
+
+    # --- membership ---
+    def register(self):
+        self.heartbeat()
+
+    def heartbeat(self, busy: Iterable[str] = ()) -> Dict[str, int]:
+        """Record liveness, refresh the live worker list, extend leases and hand over resources that moved."""
+        from ..models import ResourceLease, WorkerRegistration
+
+        now = time.time()
+        busy = set(busy)
+        with self.session_factory() as db:
+            row = db.get(WorkerRegistration, self.worker_id)
+            if row is None:
+                db.add(WorkerRegistration(worker_id=self.worker_id, started_at=now, heartbeat_at=now))
+            else:
+                row.heartbeat_at = now
+            # rows of workers gone for a while only make the live query slower
+            db.query(WorkerRegistration).filter(WorkerRegistration.heartbeat_at < now - 10 * self.lease).delete(synchronize_session=False)
+            db.commit()
+            workers = sorted(w for (w,) in db.query(WorkerRegistration.worker_id).filter(WorkerRegistration.heartbeat_at >= now - self.lease))
+            with self._lock:
+                changed = workers != self._workers
+                self._workers = workers or [self.worker_id]
+                held = set(self._held)
+            if changed:
+                self.metrics["rebalances"] += 1
+                logger.info(f"Shard membership changed: {len(workers)} live workers")
+            moved = [r for r in held if r not in busy and r != self.grok_resource and self.owner(r) != self.worker_id]
+            if moved:
+                db.query(ResourceLease).filter(ResourceLease.resource.in_(moved), ResourceLease.worker_id == self.worker_id).delete(synchronize_session=False)
+            (
+                db.query(ResourceLease)
+                .filter(ResourceLease.worker_id == self.worker_id)
+                .update({ResourceLease.expires_at: now + self.lease}, synchronize_session=False)
+            )
+            db.commit()
+            mine = {r for (r,) in db.query(ResourceLease.resource).filter(ResourceLease.worker_id == self.worker_id)}
+        with self._lock:
+            # leases taken over after an expiry are gone from `mine`
+            self._held = mine
+        if moved:
+            self.metrics["released"] += len(moved)
+            logger.info(f"Handed over {len(moved)} resources to other shards")
+        return {"workers": len(workers), "held": len(mine), "released": len(moved)}
+
+    def leave(self):
+        """Release all leases and deregister, so the other workers take over right away."""
+        from ..models import ResourceLease, WorkerRegistration
+
+        with self.session_factory() as db:
+            db.query(ResourceLease).filter(ResourceLease.worker_id == self.worker_id).delete(synchronize_session=False)
+            db.query(WorkerRegistration).filter(WorkerRegistration.worker_id == self.worker_id).delete(synchronize_session=False)
+            db.commit()
+        with self._lock:
+            self._held.clear()
+
+    def owner(self, resource: str) -> Optional[str]:
+        with self._lock:
+            workers = list(self._workers)
+        return rendezvous_owner(resource, workers)
+
+    # --- leases ---
+    def holds(self, resource: str) -> bool:
+        with self._lock:
+            return resource in self._held
+
+    def acquire(self, resource: str) -> bool:
+        """Take the lease of `resource` when it is free, expired or already ours."""
+        from ..models import ResourceLease
+
+        if self.holds(resource):
+            return True
+        now = time.time()
+        with self.session_factory() as db:
+            taken = (
+                db.query(ResourceLease)
+                .filter(ResourceLease.resource == resource)
+                .filter((ResourceLease.worker_id == self.worker_id) | (ResourceLease.expires_at < now))
+                .update({ResourceLease.worker_id: self.worker_id, ResourceLease.acquired_at: now, ResourceLease.expires_at: now + self.lease}, synchronize_session=False)
+            )
+            if not taken:
+                db.add(ResourceLease(resource=resource, worker_id=self.worker_id, acquired_at=now, expires_at=now + self.lease))
+            try:
+                db.commit()
+            except IntegrityError:
+                # held by another worker
+                db.rollback()
+                self.metrics["contended"] += 1
+                return False
+        with self._lock:
+            self._held.add(resource)
+        self.metrics["acquired"] += 1
+        return True
+
+    def grok_ready(self) -> bool:
+        """True when this worker may drive its Grok account (or has none configured)."""
+        resource = self.grok_resource
+        if resource is None or self.acquire(resource):
+            self._grok_blocked_logged = False
+            return True
+        if not self._grok_blocked_logged:
+            logger.warning(f"Grok account {self.grok_account} is leased to another worker; this worker stays idle until it is released")
+            self._grok_blocked_logged = True
+        return False
+
+    def claimable_keys(self, keys: Iterable[str]) -> Set[str]:
+        """Shard keys of queued jobs this worker owns and could lease."""
+        return {key for key in keys if self.owner(key) == self.worker_id and self.acquire(key)}
+
+    def proxies_for(self, proxies: List[str]) -> List[str]:
+        """The job's proxies this worker may use: those of its shard, else any free one. Empty when all are taken."""
+        owned = [p for p in proxies if self.owner(proxy_resource(p)) == self.worker_id and self.acquire(proxy_resource(p))]
+        if owned:
+            return owned
+        for proxy in proxies:
+            if self.acquire(proxy_resource(proxy)):
+                return [proxy]
+        return []
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"worker_id": self.worker_id, "workers": len(self._workers), "held": sorted(self._held), **self.metrics}
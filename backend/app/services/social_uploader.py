@@ -3,7 +3,18 @@ backend/app/services/social_uploader.py
 
 SocialUploader
 - Helpers to upload video files to social platforms (TikTok, Instagram Reels) using Playwright.
-- Uses Playwright to control browser sessions and upload via the web UI, with cookie/session helpers.
+- Uses Playwright to control browser sessions and upload via the web UI. Logged-in storage states live in
+  the `SessionStore`, keyed by (platform, account), and are written back only when cookies change.
+- All flows run on the shared async `PlaywrightEngine`: one Chromium per worker process, one cached
+  BrowserContext per account session, each upload in its own page. Both sync (`upload_tiktok`)
+  and async (`upload_tiktok_async`) entry points are provided.
+- Optional `proxies` are picked and scored by the shared `ProxyManager`, like the trend and Grok traffic.
+- Videos from the `MediaStore` are handed to the browser as hard links (no copy, safe against garbage
+  collection mid-upload).
+- Upload page URLs can be overridden with TIKTOK_UPLOAD_URL / INSTAGRAM_UPLOAD_URL (staging sites, the
+  local stand-ins of scripts/bench_automation.py).
+- Right after loading the upload page a single `page_probe` script checks for logout, captcha and block
+  pages, so those fail immediately instead of after the upload-input timeout.
 - This implementation focuses on structure, defensive checks, and clear error reporting. It does NOT include any attempts to bypass captchas or bot protections.
 
 Requirements:
@@ -15,146 +26,235 @@ Note: Playwright is preferred here over Selenium because it handles modern web U
 
 import os
 import time
+import asyncio
 import logging
+from contextlib import asynccontextmanager
 from typing import Optional, Dict
 from pathlib import Path
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
+from playwright.async_api import Error as PlaywrightError, TimeoutError as PlaywrightTimeoutError
+from .playwright_engine import PlaywrightEngine, get_playwright_engine
+from .proxy_manager import ProxyManager, get_proxy_manager
+from .media_store import MediaStore, get_media_store
+from .page_probe import BLOCKED, CAPTCHA, LOGGED_OUT, UPLOAD_MISSING, probe_page
+from .session_store import SessionStore, get_session_store, purge_legacy_files
+from ..telemetry import span
 
 logger = logging.getLogger("social_uploader")
 
 class UploadError(Exception):
-    pass
+    """Upload failure; `transient` marks errors worth retrying later (slow UI, missing button)."""
+
+    def __init__(self, message: str, transient: bool = False):
+        super().__init__(message)
+        self.transient = transient
+
+_purged_dirs = set()
+
 
 class SocialUploader:
-    def __init__(self, headless: bool = True, download_dir: Optional[str] = None):
+    def __init__(self, headless: bool = True, download_dir: Optional[str] = None, engine: Optional[PlaywrightEngine] = None, proxies: Optional[list] = None, proxy_manager: Optional[ProxyManager] = None, media_store: Optional[MediaStore] = None, session_store: Optional[SessionStore] = None):
         self.headless = headless
+        self.engine = engine or get_playwright_engine(headless)
+        self.proxies = proxies or []
+        self.proxy_manager = proxy_manager or get_proxy_manager()
         self.download_dir = download_dir or os.getenv("SOCIAL_DOWNLOAD_DIR") or "/tmp/social_uploads"
         os.makedirs(self.download_dir, exist_ok=True)
+        self.media = media_store or get_media_store()
+        self.sessions = session_store or get_session_store()
+        if self.download_dir not in _purged_dirs:
+            _purged_dirs.add(self.download_dir)
+            purge_legacy_files(self.download_dir)
 
-    def _save_cookies(self, context, path: str):
-        storage = context.storage_state()
-        with open(path, "w", encoding="utf-8") as fh:
-            fh.write(storage)
+    def _resolve_account(self, platform: str, account: Optional[str], cookies_path: Optional[str]) -> Optional[str]:
+        """Pick the session-store account for an upload and make sure it has a usable session.
 
-    def _load_cookies(self, browser, path: str):
-        if not os.path.exists(path):
+        A `cookies_path` without an account is treated as its own account; a storage-state file
+        is imported when the store has no valid session for the account yet.
+        """
+        if account is None and cookies_path:
+            account = f"file:{os.path.abspath(cookies_path)}"
+        if account is None:
+            # anonymous upload in a throwaway context
             return None
-        return path
+        if not self.sessions.is_valid(platform, account) and cookies_path and os.path.exists(cookies_path):
+            self.sessions.import_file(platform, account, cookies_path)
+        if not self.sessions.is_valid(platform, account):
+            raise UploadError(f"No valid {platform} session for account {account}; log in again and import its storage state")
+        return account
 
-    def upload_tiktok(self, video_path: str, caption: str = "", cookies_path: Optional[str] = None, timeout: int = 120) -> Dict[str, str]:
-        """Upload a video to TikTok via web upload flow. Returns {'post_url':...}
+    def _context_key(self, platform: str, account: Optional[str], proxy: Optional[str]) -> Optional[str]:
+        # a cached context is bound to its proxy and to the session it was created from
+        if account is None:
+            return None
+        return f"{platform}:{account}:{self.sessions.generation(platform, account)}|{proxy or ''}"
 
-        - `video_path` must be a local file path.
-        - `cookies_path` can point to a previously saved Playwright storage_state.json for an authenticated session.
-        """
+    def _upload(self, flow, platform: str, video_path: str, caption: str, cookies_path: Optional[str], timeout: int, account: Optional[str] = None) -> Dict[str, str]:
+        if not Path(video_path).exists():
+            raise UploadError("video_path does not exist")
+        account = self._resolve_account(platform, account, cookies_path)
+        proxy = self.proxy_manager.acquire(self.proxies) if self.proxies else None
+        started = time.monotonic()
+        try:
+            with self.media.handoff(video_path, self.download_dir) as path, span("upload", platform=platform):
+                res = self.engine.call_sync(flow, path, caption, account, timeout, proxy)
+        except Exception as e:
+            self.proxy_manager.report_exception(proxy, e, time.monotonic() - started)
+            raise
+        self.proxy_manager.report_success(proxy, time.monotonic() - started)
+        return res
+
+    async def _upload_async(self, flow, platform: str, video_path: str, caption: str, cookies_path: Optional[str], timeout: int, account: Optional[str] = None) -> Dict[str, str]:
         if not Path(video_path).exists():
             raise UploadError("video_path does not exist")
+        account = await asyncio.to_thread(self._resolve_account, platform, account, cookies_path)
+        proxy = await asyncio.to_thread(self.proxy_manager.acquire, self.proxies) if self.proxies else None
+        started = time.monotonic()
+        try:
+            with self.media.handoff(video_path, self.download_dir) as path, span("upload", platform=platform):
+                res = await self.engine.call(flow, path, caption, account, timeout, proxy)
+        except Exception as e:
+            self.proxy_manager.report_exception(proxy, e, time.monotonic() - started)
+            raise
+        self.proxy_manager.report_success(proxy, time.monotonic() - started)
+        return res
+
+    @asynccontextmanager
+    async def _session_page(self, platform: str, account: Optional[str], proxy: Optional[str]):
+        state = await asyncio.to_thread(self.sessions.get, platform, account) if account else None
+        async with self.engine.page(self._context_key(platform, account, proxy), storage_state=state, proxy=proxy) as (context, page):
+            yield context, page
+
+    async def _check_page(self, page, platform: str, account: Optional[str], upload: Optional[str] = None):
+        """Fail fast on logout, captcha and block pages with one probe script (see `page_probe`)."""
+        state, detail = await probe_page(page, platform, "upload", upload=upload, session=True)
+        if state == LOGGED_OUT:
+            if not account:
+                raise UploadError(f"{platform} upload page asks for a login; upload with an account that has a stored session")
+            await asyncio.to_thread(self.sessions.invalidate, platform, account)
+            raise UploadError(f"{platform} session of account {account} is logged out; log in again and import its storage state")
+        if state == CAPTCHA:
+            raise UploadError(f"Captcha on {platform} upload page ({detail}); not retrying")
+        if state == BLOCKED:
+            raise UploadError(f"{platform} upload page is blocked ({detail})", transient=True)
+        if state == UPLOAD_MISSING:
+            raise UploadError(f"Upload input not found on {platform} upload page. Possibly UI changed.", transient=True)
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            context = browser.new_context()
-            # load cookies if provided
-            if cookies_path and os.path.exists(cookies_path):
-                context = browser.new_context(storage_state=cookies_path)
-            page = context.new_page()
+    async def _open_upload_page(self, page, platform: str, url: str):
+        # nothing was submitted yet: a page that does not load (timeout, proxy or network error) is safe to retry
+        try:
+            await page.goto(url, timeout=30000)
+        except PlaywrightError as e:
+            raise UploadError(f"{platform} upload page did not load: {e}", transient=True)
+
+    async def _save_session(self, context, platform: str, account: Optional[str]):
+        # written back only when cookies / local storage actually changed
+        if account:
+            state = await context.storage_state()
+            await asyncio.to_thread(self.sessions.save, platform, account, state)
+
+    async def _tiktok_flow(self, video_path: str, caption: str, account: Optional[str], timeout: int, proxy: Optional[str] = None) -> Dict[str, str]:
+        async with self._session_page("tiktok", account, proxy) as (context, page):
+            await self._open_upload_page(page, "tiktok", os.getenv("TIKTOK_UPLOAD_URL", "https://www.tiktok.com/upload?lang=en"))
+            await self._check_page(page, "tiktok", account)
+            # wait for upload input
             try:
-                page.goto("https://www.tiktok.com/upload?lang=en", timeout=30000)
-                # wait for upload input
-                try:
-                    page.wait_for_selector("input[type=file]", timeout=15000)
-                    page.set_input_files("input[type=file]", video_path)
-                except PlaywrightTimeoutError:
-                    raise UploadError("Upload input not found on TikTok upload page. Possibly blocked or UI changed.")
+                await page.wait_for_selector("input[type=file]", timeout=15000)
+                await page.set_input_files("input[type=file]", video_path)
+            except PlaywrightTimeoutError:
+                # tell a block / challenge that appeared late from a changed UI
+                await self._check_page(page, "tiktok", account, upload="input[type=file]")
+                raise UploadError("Upload input not found on TikTok upload page. Possibly blocked or UI changed.", transient=True)
 
-                # Wait for processing and set caption
-                if caption:
-                    try:
-                        page.fill("textarea[placeholder*='caption']", caption)
-                    except PlaywrightTimeoutError:
-                        # try alternative selector
-                        try:
-                            page.fill("textarea", caption)
-                        except Exception:
-                            logger.warning("Could not set caption; continuing")
-
-                # Click post/upload button
+            # Wait for processing and set caption
+            if caption:
                 try:
-                    page.click("button:has-text('Post')", timeout=10000)
+                    await page.fill("textarea[placeholder*='caption']", caption)
                 except PlaywrightTimeoutError:
-                    # try alternative
+                    # try alternative selector
                     try:
-                        page.click("button:has-text('Upload')", timeout=5000)
-                    except Exception as e:
-                        raise UploadError(f"Failed to click Post button: {e}")
+                        await page.fill("textarea", caption)
+                    except Exception:
+                        logger.warning("Could not set caption; continuing")
 
-                # Wait for navigation or success indication
+            # Click post/upload button
+            try:
+                await page.click("button:has-text('Post')", timeout=10000)
+            except PlaywrightTimeoutError:
+                # try alternative
                 try:
-                    page.wait_for_url("**/video/**", timeout=60000)
-                    post_url = page.url
-                except PlaywrightTimeoutError:
-                    # fallback: look for success snackbar
-                    post_url = page.url
+                    await page.click("button:has-text('Upload')", timeout=5000)
+                except Exception as e:
+                    raise UploadError(f"Failed to click Post button: {e}", transient=True)
 
-                # Save cookies for future sessions
-                storage_path = os.path.join(self.download_dir, f"tiktok_storage_{int(time.time())}.json")
-                context.storage_state(path=storage_path)
+            # Wait for navigation or success indication
+            try:
+                await page.wait_for_url("**/video/**", timeout=60000)
+                post_url = page.url
+            except PlaywrightTimeoutError:
+                # fallback: look for success snackbar
+                post_url = page.url
 
-                return {"post_url": post_url, "cookies": storage_path}
-            finally:
-                try:
-                    context.close()
-                    browser.close()
-                except Exception:
-                    pass
+            # Save cookies for future sessions
+            await self._save_session(context, "tiktok", account)
 
-    def upload_instagram_reel(self, video_path: str, caption: str = "", cookies_path: Optional[str] = None, timeout: int = 120) -> Dict[str, str]:
-        """Upload to Instagram Reels via web. Instagram frequently changes UI; this is a best-effort flow.
-        """
-        if not Path(video_path).exists():
-            raise UploadError("video_path does not exist")
+            return {"post_url": post_url, "account": account}
 
-        with sync_playwright() as p:
-            browser = p.chromium.launch(headless=self.headless)
-            context = browser.new_context()
-            if cookies_path and os.path.exists(cookies_path):
-                context = browser.new_context(storage_state=cookies_path)
-            page = context.new_page()
+    async def _instagram_flow(self, video_path: str, caption: str, account: Optional[str], timeout: int, proxy: Optional[str] = None) -> Dict[str, str]:
+        async with self._session_page("instagram", account, proxy) as (context, page):
+            await self._open_upload_page(page, "instagram", os.getenv("INSTAGRAM_UPLOAD_URL", "https://www.instagram.com/create/style/"))
+            await self._check_page(page, "instagram", account)
+            # upload input
             try:
-                page.goto("https://www.instagram.com/create/style/", timeout=30000)
-                # upload input
-                try:
-                    page.wait_for_selector("input[type=file]", timeout=15000)
-                    page.set_input_files("input[type=file]", video_path)
-                except PlaywrightTimeoutError:
-                    raise UploadError("Upload input not found on Instagram create page. Possibly blocked or UI changed.")
+                await page.wait_for_selector("input[type=file]", timeout=15000)
+                await page.set_input_files("input[type=file]", video_path)
+            except PlaywrightTimeoutError:
+                await self._check_page(page, "instagram", account, upload="input[type=file]")
+                raise UploadError("Upload input not found on Instagram create page. Possibly blocked or UI changed.", transient=True)
 
-                # set caption
-                try:
-                    page.fill("textarea", caption)
-                except Exception:
-                    logger.warning("Could not set caption; continuing")
+            # set caption
+            try:
+                await page.fill("textarea", caption)
+            except Exception:
+                logger.warning("Could not set caption; continuing")
 
-                # click share
-                try:
-                    page.click("button:has-text('Share')", timeout=10000)
-                except Exception as e:
-                    raise UploadError(f"Failed to click Share button: {e}")
+            # click share
+            try:
+                await page.click("button:has-text('Share')", timeout=10000)
+            except Exception as e:
+                raise UploadError(f"Failed to click Share button: {e}", transient=True)
 
-                # wait for success
-                try:
-                    page.wait_for_selector("text=Your reel was shared", timeout=60000)
-                except PlaywrightTimeoutError:
-                    logger.warning("Share confirmation not found; returning current URL")
+            # wait for success
+            try:
+                await page.wait_for_selector("text=Your reel was shared", timeout=60000)
+            except PlaywrightTimeoutError:
+                logger.warning("Share confirmation not found; returning current URL")
 
-                storage_path = os.path.join(self.download_dir, f"ig_storage_{int(time.time())}.json")
-                context.storage_state(path=storage_path)
-                return {"post_url": page.url, "cookies": storage_path}
-            finally:
-                try:
-                    context.close()
-                    browser.close()
-                except Exception:
-                    pass
+            await self._save_session(context, "instagram", account)
+            return {"post_url": page.url, "account": account}
+
+    def upload_tiktok(self, video_path: str, caption: str = "", cookies_path: Optional[str] = None, timeout: int = 120, account: Optional[str] = None) -> Dict[str, str]:
+        """Upload a video to TikTok via web upload flow. Returns {'post_url':..., 'account':...}
+
+        - `video_path` must be a local file path.
+        - `account` names the session in the session store; its latest storage state is reused and
+          saved back after the upload.
+        - `cookies_path` can point to a previously saved Playwright storage_state.json; it is imported
+          into the session store when the account has no valid session yet.
+        """
+        return self._upload(self._tiktok_flow, "tiktok", video_path, caption, cookies_path, timeout, account)
+
+    async def upload_tiktok_async(self, video_path: str, caption: str = "", cookies_path: Optional[str] = None, timeout: int = 120, account: Optional[str] = None) -> Dict[str, str]:
+        """Async variant of `upload_tiktok`; safe to await from any event loop."""
+        return await self._upload_async(self._tiktok_flow, "tiktok", video_path, caption, cookies_path, timeout, account)
+
+    def upload_instagram_reel(self, video_path: str, caption: str = "", cookies_path: Optional[str] = None, timeout: int = 120, account: Optional[str] = None) -> Dict[str, str]:
+        """Upload to Instagram Reels via web. Instagram frequently changes UI; this is a best-effort flow.
+        """
+        return self._upload(self._instagram_flow, "instagram", video_path, caption, cookies_path, timeout, account)
+
+    async def upload_instagram_reel_async(self, video_path: str, caption: str = "", cookies_path: Optional[str] = None, timeout: int = 120, account: Optional[str] = None) -> Dict[str, str]:
+        """Async variant of `upload_instagram_reel`; safe to await from any event loop."""
+        return await self._upload_async(self._instagram_flow, "instagram", video_path, caption, cookies_path, timeout, account)
 
 # Example usage (manual):
 # uploader = SocialUploader(headless=False)
@@ -0,0 +1,240 @@
+# backend/app/services/trend_cache.py
+# TTL + stale-while-revalidate cache for TrendScout results.
+#
+# Entries are keyed by (keyword, geo, timeframe, hl) and hold JSON-friendly values.
+# - age < ttl              -> fresh hit, served from memory
+# - age < ttl + stale_ttl  -> stale hit, served instantly while one background refresh runs
+# - otherwise / absent     -> miss, the loader runs in the caller's thread
+# An optional second tier (on-disk JSON files or a SQL table) survives restarts and is
+# shared between processes; the in-memory tier is an LRU bounded by `max_entries`.
+
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, Tuple, Dict, Any
+
+logger = logging.getLogger("trend_cache")
+
+CacheKey = Tuple[str, ...]
+
+
+def _key_str(key: CacheKey) -> str:
+    return "|".join(key)
+
+
+class DiskTrendStore:
+    """One JSON file per key under `directory`; writes are atomic renames."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: CacheKey) -> str:
+        return os.path.join(self.directory, hashlib.sha1(_key_str(key).encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, key: CacheKey) -> Optional[Tuple[Any, float]]:
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+            return data["value"], data["fetched_at"]
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def set(self, key: CacheKey, value: Any, fetched_at: float):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"key": _key_str(key), "value": value, "fetched_at": fetched_at}, fh)
+        os.replace(tmp, path)
+
+
+class SqlTrendStore:
+    """Rows in the `trend_cache` table (see `models.TrendCacheEntry`)."""
+
+    def __init__(self, session_factory=None):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+
+    def get(self, key: CacheKey) -> Optional[Tuple[Any, float]]:
+        from ..models import TrendCacheEntry
+
+        with self.session_factory() as db:
+            row = db.get(TrendCacheEntry, _key_str(key))
+            if row is None:
+                return None
+            return row.value, row.fetched_at
+
+    def set(self, key: CacheKey, value: Any, fetched_at: float):
+        from ..models import TrendCacheEntry
+
+        with self.session_factory() as db:
+            db.merge(TrendCacheEntry(key=_key_str(key), value=value, fetched_at=fetched_at))
+            db.commit()
+
+
+class TrendCache:
+    def __init__(self, ttl: float = 900, stale_ttl: float = 3600, max_entries: int = 1024, store=None, refresh_workers: int = 2):
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self.store = store
+        self._entries: "OrderedDict[CacheKey, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=refresh_workers, thread_name_prefix="trend-refresh")
+        self.metrics = {"hits": 0, "stale_hits": 0, "misses": 0, "refreshes": 0, "refresh_errors": 0, "store_hits": 0}
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def _lookup(self, key: CacheKey) -> Optional[Tuple[Any, float]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.store is None:
+            return None
+        try:
+            entry = self.store.get(key)
+        except Exception as e:
+            logger.warning(f"Trend cache store read failed for {key}: {e}")
+            return None
+        if entry is not None:
+            self._count("store_hits")
+            self._remember(key, *entry)
+        return entry
+
+    def _remember(self, key: CacheKey, value: Any, fetched_at: float):
+        with self._lock:
+            self._entries[key] = (value, fetched_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def set(self, key: CacheKey, value: Any):
+        fetched_at = time.time()
+        self._remember(key, value, fetched_at)
+        if self.store is not None:
+            try:
+                self.store.set(key, value, fetched_at)
+            except Exception as e:
+                logger.warning(f"Trend cache store write failed for {key}: {e}")
+
+    def get(self, key: CacheKey, allow_stale: bool = True) -> Optional[Any]:
+        """Return the cached value without loading; None when absent or too old."""
+        entry = self._lookup(key)
+        if entry is None:
+            return None
+        age = time.time() - entry[1]
+        if age < self.ttl or (allow_stale and age < self.ttl + self.stale_ttl):
+            return entry[0]
+        return None
+
+    def _refresh(self, key: CacheKey, loader: Callable[[], Any]):
+        try:
+            self.set(key, loader())
+            self._count("refreshes")
+        except Exception as e:
+            self._count("refresh_errors")
+            logger.warning(f"Background trend refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _schedule_refresh(self, key: CacheKey, loader: Callable[[], Any]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        self._executor.submit(self._refresh, key, loader)
+
+    def lookup(self, key: CacheKey) -> Tuple[Optional[Any], str]:
+        """Return `(value, state)` with state "fresh", "stale" or "miss" and count it."""
+        entry = self._lookup(key)
+        if entry is not None:
+            value, fetched_at = entry
+            age = time.time() - fetched_at
+            if age < self.ttl:
+                self._count("hits")
+                return value, "fresh"
+            if age < self.ttl + self.stale_ttl:
+                self._count("stale_hits")
+                return value, "stale"
+        self._count("misses")
+        return None, "miss"
+
+    def get_or_fetch(self, key: CacheKey, loader: Callable[[], Any]) -> Any:
+        value, state = self.lookup(key)
+        if state == "stale":
+            self._schedule_refresh(key, loader)
+        if state != "miss":
+            return value
+        value = loader()
+        self.set(key, value)
+        return value
+
+    def _refresh_many(self, keys, loader: Callable[[list], Dict[CacheKey, Any]]):
+        try:
+            for key, value in loader(keys).items():
+                self.set(key, value)
+                self._count("refreshes")
+        except Exception as e:
+            self._count("refresh_errors")
+            logger.warning(f"Background trend refresh failed for {keys}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.difference_update(keys)
+
+    def refresh_many(self, keys, loader: Callable[[list], Dict[CacheKey, Any]]):
+        """Refresh several stale keys with one background `loader(keys) -> {key: value}` call."""
+        with self._lock:
+            keys = [k for k in keys if k not in self._refreshing]
+            self._refreshing.update(keys)
+        if keys:
+            self._executor.submit(self._refresh_many, keys, loader)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self.metrics)
+            stats["entries"] = len(self._entries)
+            stats["refreshing"] = len(self._refreshing)
+        lookups = stats["hits"] + stats["stale_hits"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0
+        return stats
+
+
+_trend_cache: Optional[TrendCache] = None
+_trend_cache_lock = threading.Lock()
+
+
+def get_trend_cache() -> TrendCache:
+    """Process-wide cache configured from the environment.
+
+    TREND_CACHE_TTL (900s), TREND_CACHE_STALE_TTL (3600s), TREND_CACHE_SIZE (1024),
+    TREND_CACHE_BACKEND ("memory", "disk" or "sql"), TREND_CACHE_DIR (/tmp/trend_cache).
+    """
+    global _trend_cache
+    with _trend_cache_lock:
+        if _trend_cache is None:
+            backend = os.getenv("TREND_CACHE_BACKEND", "memory").lower()
+            store = None
+            if backend == "disk":
+                store = DiskTrendStore(os.getenv("TREND_CACHE_DIR", "/tmp/trend_cache"))
+            elif backend == "sql":
+                store = SqlTrendStore()
+            _trend_cache = TrendCache(
+                ttl=float(os.getenv("TREND_CACHE_TTL", "900")),
+                stale_ttl=float(os.getenv("TREND_CACHE_STALE_TTL", "3600")),
+                max_entries=int(os.getenv("TREND_CACHE_SIZE", "1024")),
+                store=store,
+            )
+        return _trend_cache
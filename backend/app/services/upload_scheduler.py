@@ -0,0 +1,428 @@
+# backend/app/services/upload_scheduler.py
+# Bulk upload scheduler for many (video, caption, account, platform, publish_at) items.
+#
+# Items are rows in `scheduled_uploads` (see `models.ScheduledUpload`). The scheduler polls for
+# rows whose `publish_at` has passed, and starts an upload only when both the platform's and the
+# account's token bucket have a token, so a backlog of hundreds of posts drains at the configured
+# rates instead of tripping platform limits. Uploads run concurrently on a thread pool through
+# the shared Playwright engine. Transient failures (`UploadError.transient`: the upload page did
+# not load, the file input or submit button is missing; dropped connections) are rescheduled with
+# exponential backoff plus jitter. Any other error may have come after the post went live and fails
+# the item; every item ends up `posted` or `failed` with its post URL or error recorded.
+#
+# Several schedulers may share the table: a row is claimed with a conditional update and then
+# leased to its scheduler (`claimed_by`, `lease_expires_at`), whose heartbeat extends the lease while
+# the upload runs. Only rows whose lease expired (a crashed scheduler) go back on the schedule, so a
+# second scheduler or one still draining during a rolling restart never re-queues uploads in progress.
+# Buckets live in process memory, so the configured rates hold per scheduler process.
+#
+# Configuration:
+#   UPLOAD_SCHEDULER_CONCURRENCY   uploads in flight (4)
+#   UPLOAD_RATE_<PLATFORM>         uploads per hour per platform (TIKTOK 120, INSTAGRAM 60)
+#   UPLOAD_RATE_ACCOUNT            uploads per hour per account (6)
+#   UPLOAD_BURST_PLATFORM / UPLOAD_BURST_ACCOUNT   bucket capacity (10 / 2)
+#   UPLOAD_RETRIES                 retries of transient failures (3)
+#   UPLOAD_LEASE_SECONDS           lease of a running upload without heartbeat (60)
+
+import os
+import time
+import random
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import and_, or_
+
+from ..telemetry import record_retry
+
+logger = logging.getLogger("upload_scheduler")
+
+PLATFORMS = ("tiktok", "instagram")
+DEFAULT_PLATFORM_RATES = {"tiktok": 120.0, "instagram": 60.0}
+
+
+def normalize_platform(platform: Optional[str]) -> Optional[str]:
+    platform = (platform or "").lower()
+    if platform == "tiktok":
+        return "tiktok"
+    if platform in ("instagram", "ig", "reel", "reels"):
+        return "instagram"
+    return None
+
+
+def is_transient(exc: BaseException) -> bool:
+    # imported here so schedule_uploads() (used by the API) does not load Playwright
+    from .social_uploader import UploadError
+
+    if isinstance(exc, UploadError):
+        return exc.transient
+    # a dropped connection before the browser got anywhere; anything else (a timeout while waiting for
+    # the confirmation, a bug) may have happened after the post went live, so it fails the item
+    return isinstance(exc, ConnectionError)
+
+
+def _default_uploader():
+    from .social_uploader import SocialUploader
+
+    return SocialUploader(headless=True)
+
+
+def _utc(value: Optional[datetime]) -> datetime:
+    if value is None:
+        return datetime.now(timezone.utc)
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def schedule_uploads(db, items: Iterable[Dict]) -> List[int]:
+    """Insert items ({video_path, caption, account, platform, publish_at, cookies_path}) and return their ids.
+
+    Raises ValueError for an unsupported platform or a missing account before anything is written.
+    """
+    from ..models import ScheduledUpload
+
+    rows = []
+    for item in items:
+        platform = normalize_platform(item.get("platform"))
+        if platform is None:
+            raise ValueError(f"Unsupported platform: {item.get('platform')}")
+        if not item.get("account"):
+            raise ValueError("Every item needs an account")
+        rows.append(ScheduledUpload(
+            platform=platform,
+            account=item["account"],
+            video_path=item["video_path"],
+            caption=item.get("caption") or "",
+            cookies_path=item.get("cookies_path"),
+            publish_at=_utc(item.get("publish_at")),
+        ))
+    db.add_all(rows)
+    db.commit()
+    return [row.id for row in rows]
+
+
+class TokenBucket:
+    """`rate_per_hour` tokens refill continuously up to `capacity`."""
+
+    def __init__(self, rate_per_hour: float, capacity: float):
+        self.rate = rate_per_hour / 3600.0
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Seconds until one token is available (0 when available now)."""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self):
+        self.tokens -= 1
+
+    def give_back(self):
+        self.tokens = min(self.capacity, self.tokens + 1)
+
+
+class UploadScheduler:
+    def __init__(
+        self,
+        session_factory=None,
+        uploader_factory: Optional[Callable] = None,
+        concurrency: Optional[int] = None,
+        platform_rates: Optional[Dict[str, float]] = None,
+        account_rate: Optional[float] = None,
+        platform_burst: Optional[float] = None,
+        account_burst: Optional[float] = None,
+        max_retries: Optional[int] = None,
+        poll_interval: float = 5,
+        retry_base: float = 30,
+        scheduler_id: Optional[str] = None,
+        lease: Optional[float] = None,
+    ):
+        if session_factory is None:
+            from ..db import SessionLocal
+            session_factory = SessionLocal
+        self.session_factory = session_factory
+        self.uploader_factory = uploader_factory or _default_uploader
+        self.concurrency = concurrency or int(os.getenv("UPLOAD_SCHEDULER_CONCURRENCY", "4"))
+        self.platform_rates = platform_rates or {
+            name: float(os.getenv(f"UPLOAD_RATE_{name.upper()}", str(rate))) for name, rate in DEFAULT_PLATFORM_RATES.items()
+        }
+        self.account_rate = account_rate or float(os.getenv("UPLOAD_RATE_ACCOUNT", "6"))
+        self.platform_burst = platform_burst or float(os.getenv("UPLOAD_BURST_PLATFORM", "10"))
+        self.account_burst = account_burst or float(os.getenv("UPLOAD_BURST_ACCOUNT", "2"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("UPLOAD_RETRIES", "3"))
+        self.poll_interval = poll_interval
+        self.retry_base = retry_base
+        self.scheduler_id = scheduler_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.lease = lease or float(os.getenv("UPLOAD_LEASE_SECONDS", "60"))
+        self._platform_buckets = {name: TokenBucket(rate, self.platform_burst) for name, rate in self.platform_rates.items()}
+        self._account_buckets: Dict[Tuple[str, str], TokenBucket] = {}
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._rows: Set[int] = set()  # ids of the rows this scheduler is uploading, kept leased by the heartbeat
+        self._next_reclaim = 0.0
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="upload")
+        self._stop = threading.Event()
+        self.metrics = {"posted": 0, "failed": 0, "retried": 0, "throttled": 0}
+
+    # --- scheduling ---
+    def schedule(self, items: Iterable[Dict]) -> List[int]:
+        with self.session_factory() as db:
+            return schedule_uploads(db, items)
+
+    # --- rate limits ---
+    def _account_bucket(self, platform: str, account: str) -> TokenBucket:
+        bucket = self._account_buckets.get((platform, account))
+        if bucket is None:
+            bucket = self._account_buckets[(platform, account)] = TokenBucket(self.account_rate, self.account_burst)
+        return bucket
+
+    def _try_reserve(self, platform: str, account: str) -> float:
+        """Take one token from both buckets, or return how long to wait without taking any."""
+        with self._lock:
+            now = time.monotonic()
+            buckets = [self._platform_buckets[platform], self._account_bucket(platform, account)]
+            wait = max(bucket.wait_time(now) for bucket in buckets)
+            if wait == 0:
+                for bucket in buckets:
+                    bucket.take()
+            return wait
+
+    def _refund(self, platform: str, account: str):
+        """Return the tokens of a reservation that started nothing (the claim was lost to another process)."""
+        with self._lock:
+            self._platform_buckets[platform].give_back()
+            self._account_bucket(platform, account).give_back()
+
+    # --- execution ---
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.concurrency - self._in_flight
+
+    def _claim(self, db, row_id: int) -> bool:
+        from ..models import ScheduledUpload, UploadStatus
+
+        updated = (
+            db.query(ScheduledUpload)
+            .filter(ScheduledUpload.id == row_id, ScheduledUpload.status == UploadStatus.scheduled)
+            .update({ScheduledUpload.status: UploadStatus.running, ScheduledUpload.claimed_by: self.scheduler_id, ScheduledUpload.lease_expires_at: time.time() + self.lease}, synchronize_session=False)
+        )
+        db.commit()
+        return bool(updated)
+
+    def poll_once(self) -> float:
+        """Start every due item the buckets allow; return seconds until the next item could start."""
+        from ..models import ScheduledUpload, UploadStatus
+
+        slots = self._free_slots()
+        if slots <= 0:
+            return self.poll_interval
+        next_check = self.poll_interval
+        blocked = set()
+        with self.session_factory() as db:
+            due = (
+                db.query(ScheduledUpload.id, ScheduledUpload.platform, ScheduledUpload.account)
+                .filter(ScheduledUpload.status == UploadStatus.scheduled, ScheduledUpload.publish_at <= datetime.now(timezone.utc))
+                .order_by(ScheduledUpload.publish_at, ScheduledUpload.id)
+                .limit(max(slots * 20, 100))
+                .all()
+            )
+            for row in due:
+                if slots <= 0:
+                    break
+                key = (row.platform, row.account)
+                if key in blocked:
+                    continue
+                wait = self._try_reserve(row.platform, row.account)
+                if wait:
+                    # keep publish order per account: later items of a throttled account wait too
+                    blocked.add(key)
+                    self._count("throttled")
+                    next_check = min(next_check, wait)
+                    continue
+                if not self._claim(db, row.id):
+                    self._refund(row.platform, row.account)
+                    continue
+                slots -= 1
+                with self._lock:
+                    self._in_flight += 1
+                    self._rows.add(row.id)
+                self._executor.submit(self._execute, row.id)
+        return max(0.05, next_check)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.metrics[name] += 1
+
+    def _execute(self, row_id: int):
+        from ..models import ScheduledUpload
+
+        try:
+            with self.session_factory() as db:
+                row = db.get(ScheduledUpload, row_id)
+                item = {
+                    "platform": row.platform,
+                    "video_path": row.video_path,
+                    "caption": row.caption or "",
+                    "cookies_path": row.cookies_path,
+                    "account": row.account,
+                    "attempts": row.attempts,
+                }
+            try:
+                result = self.upload(item)
+            except Exception as e:
+                self._record_failure(row_id, item["attempts"] + 1, e)
+                return
+            self._record(row_id, item["attempts"] + 1, post_url=result.get("post_url"))
+        except Exception:
+            logger.exception(f"Scheduled upload {row_id} could not be finalised")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._rows.discard(row_id)
+
+    def upload(self, item: Dict) -> Dict[str, str]:
+        uploader = self.uploader_factory()
+        if item["platform"] == "tiktok":
+            return uploader.upload_tiktok(item["video_path"], caption=item["caption"], cookies_path=item["cookies_path"], account=item["account"])
+        return uploader.upload_instagram_reel(item["video_path"], caption=item["caption"], cookies_path=item["cookies_path"], account=item["account"])
+
+    def _record(self, row_id: int, attempts: int, post_url: Optional[str] = None, error: Optional[str] = None, retry_at: Optional[datetime] = None):
+        from ..models import ScheduledUpload, UploadStatus
+
+        with self._lock:
+            # off the heartbeat before the row leaves `running`
+            self._rows.discard(row_id)
+        with self.session_factory() as db:
+            row = db.get(ScheduledUpload, row_id)
+            if row.claimed_by != self.scheduler_id or row.status != UploadStatus.running:
+                if error is not None:
+                    # the lease expired and another scheduler put the row back on the schedule
+                    logger.warning(f"Scheduled upload {row_id} is no longer leased to {self.scheduler_id}; dropping its failure")
+                    return
+                # the video is live: record it even so, the row must not be uploaded again
+                logger.warning(f"Scheduled upload {row_id} posted after its lease to {self.scheduler_id} expired")
+            row.attempts = attempts
+            row.error_message = error
+            row.claimed_by = None
+            row.lease_expires_at = None
+            if retry_at is not None:
+                row.status = UploadStatus.scheduled
+                row.publish_at = retry_at
+            elif error is not None:
+                row.status = UploadStatus.failed
+            else:
+                row.status = UploadStatus.posted
+                row.post_url = post_url
+            db.commit()
+        self._count("retried" if retry_at is not None else "failed" if error is not None else "posted")
+
+    def _record_failure(self, row_id: int, attempts: int, exc: BaseException):
+        error = str(exc)[:1000]
+        if is_transient(exc) and attempts <= self.max_retries:
+            # exponential backoff with full jitter so retries of one burst do not line up again
+            delay = random.uniform(0.5, 1.0) * self.retry_base * 2 ** (attempts - 1)
+            logger.warning(f"Scheduled upload {row_id} failed (attempt {attempts}), retrying in {delay:.0f}s: {exc}")
+            record_retry("scheduled_upload", delay)
+            self._record(row_id, attempts, error=error, retry_at=datetime.now(timezone.utc) + timedelta(seconds=delay))
+        else:
+            logger.warning(f"Scheduled upload {row_id} failed permanently after {attempts} attempts: {exc}")
+            self._record(row_id, attempts, error=error)
+
+    def reclaim_expired(self) -> int:
+        """Put items whose scheduler stopped heartbeating back on the schedule.
+
+        Rows claimed before leases existed (no `lease_expires_at`) count as expired once they have not
+        been updated for a lease.
+        """
+        from ..models import ScheduledUpload, UploadStatus
+
+        expired = or_(
+            ScheduledUpload.lease_expires_at < time.time(),
+            and_(ScheduledUpload.lease_expires_at.is_(None), ScheduledUpload.updated_at < datetime.now(timezone.utc) - timedelta(seconds=self.lease)),
+        )
+        with self.session_factory() as db:
+            count = (
+                db.query(ScheduledUpload)
+                .filter(ScheduledUpload.status == UploadStatus.running, expired)
+                .update({ScheduledUpload.status: UploadStatus.scheduled, ScheduledUpload.claimed_by: None, ScheduledUpload.lease_expires_at: None}, synchronize_session=False)
+            )
+            db.commit()
+        if count:
+            logger.warning(f"Rescheduled {count} uploads whose scheduler stopped renewing their lease")
+        return count
+
+    def _maybe_reclaim(self):
+        """Reclaim expired uploads, at most every third of the lease."""
+        if time.monotonic() < self._next_reclaim:
+            return
+        self._next_reclaim = time.monotonic() + self.lease / 3
+        try:
+            self.reclaim_expired()
+        except Exception as e:
+            logger.warning(f"Reclaiming expired uploads failed: {e}")
+
+    def heartbeat(self) -> int:
+        """Extend the leases of this scheduler's uploads in flight; returns the number of leases extended."""
+        from ..models import ScheduledUpload, UploadStatus
+
+        with self._lock:
+            ids = list(self._rows)
+        if not ids:
+            return 0
+        with self.session_factory() as db:
+            extended = (
+                db.query(ScheduledUpload)
+                .filter(ScheduledUpload.id.in_(ids), ScheduledUpload.claimed_by == self.scheduler_id, ScheduledUpload.status == UploadStatus.running)
+                .update({ScheduledUpload.lease_expires_at: time.time() + self.lease}, synchronize_session=False)
+            )
+            db.commit()
+        return extended
+
+    def _heartbeat_loop(self):
+        # keeps beating until the executor drained, so uploads finishing after stop() keep their leases
+        while not self._stop.wait(self.lease / 3) or self._free_slots() < self.concurrency:
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning(f"Upload lease heartbeat failed: {e}")
+
+    def run_forever(self):
+        logger.info(f"Upload scheduler {self.scheduler_id} started (concurrency={self.concurrency}, platform rates/h={self.platform_rates}, account rate/h={self.account_rate})")
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="upload-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                self._maybe_reclaim()
+                try:
+                    wait = self.poll_once()
+                except Exception as e:
+                    logger.warning(f"Upload scheduler poll failed: {e}")
+                    wait = self.poll_interval
+                self._stop.wait(min(wait, self.poll_interval))
+        finally:
+            self._executor.shutdown(wait=True)
+            heartbeat.join(timeout=5)
+            logger.info("Upload scheduler stopped")
+
+    def stop(self):
+        self._stop.set()
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.metrics,
+                "in_flight": self._in_flight,
+                "platform_tokens": {name: round(b.tokens, 2) for name, b in self._platform_buckets.items()},
+                "accounts": len(self._account_buckets),
+            }
@@ -0,0 +1,262 @@
+# backend/app/telemetry.py
+# Prometheus-style metrics and phase tracing shared by the API, the job worker and the services.
+#
+# Metrics live in one process-wide registry and are rendered in the Prometheus text format by
+# `render()`: the API serves them at GET /metrics, worker processes via `serve()` on
+# METRICS_PORT. Counters and histograms are updated where things happen; gauges that describe
+# current state (browser pools, admission queues, queued jobs) are collectors called at scrape
+# time, so nothing has to keep them in sync.
+#
+# `span(phase)` times a block into `phase_duration_seconds{phase, outcome}` and, when the
+# OpenTelemetry API is installed, opens a span of the same name so traces and metrics line up.
+#
+# Proxy URLs can carry credentials: metrics only ever label them with `proxy_label()`.
+
+import os
+import sys
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+logger = logging.getLogger("telemetry")
+
+try:
+    from opentelemetry import trace as _otel_trace
+    _tracer = _otel_trace.get_tracer("viralgen")
+except ImportError:
+    _tracer = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+PHASE_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300, 600, 1200)
+PROBE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+LabelValues = Tuple[str, ...]
+# (labels, value) pairs produced by a collector for one gauge
+Samples = Iterable[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels) -> float:
+        with self._lock:
+            return self._values.get(tuple(str(labels.get(n, "")) for n in self.labelnames), 0.0)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # label values -> [per-bucket counts..., sum, count]
+        self._values: Dict[LabelValues, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-2] += value
+            state[-1] += 1
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            items = sorted((key, list(state)) for key, state in self._values.items())
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                labels = _format_labels(self.labelnames + ("le",), key + (_format_value(bound),))
+                lines.append(f"{self.name}_bucket{labels} {_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(round(state[-2], 6))}")
+            lines.append(f"{self.name}_count{labels} {_format_value(state[-1])}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        # name -> (documentation, collector); collectors return the current samples of one gauge
+        self._collectors: Dict[str, Tuple[str, Callable[[], Samples]]] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, collector: Callable[[], Samples]):
+        """Register (or replace) a gauge whose samples are read from `collector` at scrape time."""
+        with self._lock:
+            self._collectors[name] = (documentation, collector)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors.items())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        for name, (documentation, collector) in collectors:
+            try:
+                samples = list(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector {name} failed: {e}")
+                continue
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                lines.append(f"{name}{_format_labels(labels.keys(), labels.values())} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "API request latency by route template.", ("method", "route", "status"))
+PHASE_SECONDS = REGISTRY.histogram("phase_duration_seconds", "Time spent per automation phase (driver_start, login, page_load, prompt_submit, generation, download, prepare, upload).", ("phase", "outcome"), PHASE_BUCKETS)
+STAGE_SECONDS = REGISTRY.histogram("pipeline_stage_duration_seconds", "Time a job spends inside a pipeline stage.", ("stage", "outcome"), PHASE_BUCKETS)
+STAGE_WAIT_SECONDS = REGISTRY.histogram("pipeline_stage_wait_seconds", "Time a job waits for a pipeline stage slot.", ("stage",), PHASE_BUCKETS)
+RETRIES = REGISTRY.counter("retries_total", "Retried attempts by operation.", ("operation",))
+BACKOFF_SECONDS = REGISTRY.counter("backoff_seconds_total", "Seconds slept in retry backoff by operation.", ("operation",))
+PROXY_OUTCOMES = REGISTRY.counter("proxy_requests_total", "Attempts per proxy by outcome (success, failure, rate_limited).", ("proxy", "outcome"))
+PROXY_COOLDOWN_SECONDS = REGISTRY.counter("proxy_cooldown_seconds_total", "Cooldown imposed on each proxy after failures and rate limits.", ("proxy",))
+CAPTCHAS = REGISTRY.counter("captcha_detections_total", "Captcha / challenge pages detected.", ("platform",))
+PAGE_PROBE_SECONDS = REGISTRY.histogram("page_probe_duration_seconds", "Time spent in the page-state probe per page, by verdict (ok, captcha, blocked, logged_out, upload_missing, error).", ("platform", "page", "state"), PROBE_BUCKETS)
+
+
+def proxy_label(proxy: Optional[str]) -> str:
+    """host:port of a proxy URL, without scheme or credentials; "direct" for no proxy."""
+    if not proxy:
+        return "direct"
+    parts = urlsplit(proxy if "://" in proxy else f"//{proxy}")
+    host = parts.hostname or "unknown"
+    return f"{host}:{parts.port}" if parts.port else host
+
+
+def record_phase(phase: str, seconds: float, outcome: str = "ok"):
+    PHASE_SECONDS.observe(seconds, phase=phase, outcome=outcome)
+
+
+def record_retry(operation: str, backoff: float = 0.0):
+    RETRIES.inc(operation=operation)
+    if backoff:
+        BACKOFF_SECONDS.inc(backoff, operation=operation)
+
+
+@contextmanager
+def span(phase: str, histogram: Histogram = PHASE_SECONDS, label: str = "phase", **attributes):
+    """Time the block into `histogram` (outcome "ok" or "error") and trace it when OpenTelemetry is present."""
+    started = time.monotonic()
+    outcome = "ok"
+    exc_info = (None, None, None)
+    otel = _tracer.start_as_current_span(phase, attributes={k: str(v) for k, v in attributes.items() if v is not None}) if _tracer else None
+    if otel is not None:
+        otel.__enter__()
+    try:
+        yield
+    except BaseException as e:
+        outcome = "error"
+        exc_info = (type(e), e, e.__traceback__)
+        raise
+    finally:
+        elapsed = time.monotonic() - started
+        histogram.observe(elapsed, **{label: phase, "outcome": outcome})
+        if otel is not None:
+            otel.__exit__(*exc_info)
+        logger.debug(f"{phase} took {elapsed:.3f}s ({outcome}) {attributes or ''}")
+
+
+def _browser_pool_samples() -> Samples:
+    # only pools of modules this process loaded; looking must not import Selenium or Playwright
+    grok = sys.modules.get(f"{__package__}.services.grok_automator")
+    if grok is not None and grok._driver_pool is not None:
+        for state, value in grok._driver_pool.stats().items():
+            yield {"pool": "grok", "state": state}, value
+    engines = sys.modules.get(f"{__package__}.services.playwright_engine")
+    if engines is not None:
+        for headless, engine in list(engines._engines.items()):
+            for state, value in engine.stats().items():
+                yield {"pool": "playwright_headless" if headless else "playwright", "state": state}, value
+
+
+REGISTRY.gauge("browser_pool", "Browser pool occupancy (Selenium driver pool, Playwright contexts and pages).", _browser_pool_samples)
+
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: Optional[int] = None) -> Optional[ThreadingHTTPServer]:
+    """Expose /metrics of a non-API process (worker, scheduler) on `port` or METRICS_PORT; None when unset."""
+    port = port or int(os.getenv("METRICS_PORT", "0"))
+    if not port:
+        return None
+    server = ThreadingHTTPServer(("0.0.0.0", port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving metrics on :{port}/metrics")
+    return server
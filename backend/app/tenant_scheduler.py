@@ -0,0 +1,283 @@
+# backend/app/tenant_scheduler.py
+# Per-tenant fair dispatch of queued jobs for the job worker.
+#
+# Without it workers claim the oldest queued jobs first, so one owner who queues 500 jobs holds
+# every slot until they are done. The scheduler instead hands each free slot to the tenant
+# (job owner) with the smallest virtual time, start-time fair queueing: dispatching a job
+# advances the tenant's virtual time by 1 / weight, so over time tenants get slots in
+# proportion to their weight no matter how many jobs they queued. A tenant that was idle
+# restarts at the current virtual time instead of cashing in credit for the idle period.
+# Tenants sit in a heap keyed by virtual time, so each decision is O(log n) in active tenants.
+#
+# Weights, caps and quotas come from `User.subscription` (owners without a user row count as free):
+#   TENANT_<TIER>_WEIGHT       share of the slots        (free 1, trial 2, paid 8, cancelled 1)
+#   TENANT_<TIER>_MAX_RUNNING  jobs running at once      (free 1, trial 2, paid 8, cancelled 0)
+#   TENANT_<TIER>_DAILY_JOBS   jobs started per UTC day  (free 20, trial 50, paid and cancelled 0 = unlimited)
+# Running counts are read from the jobs table on every poll, so caps hold across workers. A tenant
+# at its cap or out of quota keeps its jobs queued; a cancelled subscription (cap 0) resumes when
+# renewed. Usage (jobs started / finished, run seconds) is counted in memory and added to the
+# `tenant_usage` table every TENANT_USAGE_FLUSH_INTERVAL seconds (30); the daily quota is the flushed
+# total of all workers plus this worker's unflushed count, so it can overshoot by what other workers
+# dispatched since their last flush.
+
+import os
+import time
+import heapq
+import logging
+import threading
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from . import models
+from .telemetry import REGISTRY
+
+logger = logging.getLogger("tenant_scheduler")
+
+DEFAULT_TIERS = {
+    # weight, max running, daily jobs (0 = unlimited)
+    "free": (1.0, 1, 20),
+    "trial": (2.0, 2, 50),
+    "paid": (8.0, 8, 0),
+    "cancelled": (1.0, 0, 0),
+}
+
+DECISIONS = REGISTRY.counter("tenant_dispatch_decisions_total", "Dispatch decisions per subscription tier (dispatched, capped, over_quota, unclaimable).", ("tier", "decision"))
+
+
+def tier_limits(tier: str) -> Tuple[float, int, int]:
+    weight, running, daily = DEFAULT_TIERS.get(tier, DEFAULT_TIERS["free"])
+    prefix = f"TENANT_{tier.upper()}_"
+    return (
+        max(0.01, float(os.getenv(prefix + "WEIGHT", weight))),
+        int(os.getenv(prefix + "MAX_RUNNING", running)),
+        int(os.getenv(prefix + "DAILY_JOBS", daily)),
+    )
+
+
+def _today() -> str:
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+
+class Tenant:
+    __slots__ = ("owner_id", "tier", "weight", "max_running", "daily_jobs", "tier_loaded_at", "vtime", "queued", "running", "heap_seq", "used", "pending")
+
+    def __init__(self, owner_id: int):
+        self.owner_id = owner_id
+        self.tier = "free"
+        self.weight, self.max_running, self.daily_jobs = tier_limits("free")
+        self.tier_loaded_at = 0.0
+        self.vtime = 0.0
+        self.queued = 0
+        self.running = 0
+        self.heap_seq = 0  # sequence number of the tenant's live heap entry, 0 when not queued in the heap
+        self.used = 0  # jobs started today, flushed total of all workers
+        # unflushed usage of this worker for today
+        self.pending = {"jobs_started": 0, "jobs_finished": 0, "run_seconds": 0.0}
+
+    def set_tier(self, tier: str):
+        self.tier = tier
+        self.weight, self.max_running, self.daily_jobs = tier_limits(tier)
+        self.tier_loaded_at = time.monotonic()
+
+    def blocked(self) -> Optional[str]:
+        if self.running >= self.max_running:
+            return "capped"
+        if self.daily_jobs and self.used + self.pending["jobs_started"] >= self.daily_jobs:
+            return "over_quota"
+        return None
+
+
+class TenantScheduler:
+    def __init__(self, session_factory, flush_interval: Optional[float] = None, tier_ttl: float = 300.0):
+        self.session_factory = session_factory
+        self.flush_interval = flush_interval if flush_interval is not None else float(os.getenv("TENANT_USAGE_FLUSH_INTERVAL", "30"))
+        self.tier_ttl = tier_ttl
+        self._tenants: Dict[int, Tenant] = {}
+        self._heap: List[Tuple[float, int, int]] = []
+        self._seq = 0
+        self._vnow = 0.0  # virtual time of the last dispatch
+        self._day = _today()
+        self._next_flush = time.monotonic() + self.flush_interval
+        self._lock = threading.Lock()
+        REGISTRY.gauge("tenant_jobs", "Queued and running jobs per subscription tier, as seen by the dispatcher.", self._tier_samples)
+
+    def _tier_samples(self):
+        totals: Dict[Tuple[str, str], int] = {}
+        with self._lock:
+            for t in self._tenants.values():
+                for state, n in (("queued", t.queued), ("running", t.running)):
+                    totals[(t.tier, state)] = totals.get((t.tier, state), 0) + n
+        for (tier, state), n in totals.items():
+            yield {"tier": tier, "state": state}, n
+
+    def _push(self, t: Tenant):
+        # restart idle tenants at the current virtual time: no credit for time spent without jobs
+        t.vtime = max(t.vtime, self._vnow)
+        self._seq += 1
+        heapq.heappush(self._heap, (t.vtime, self._seq, t.owner_id))
+        t.heap_seq = self._seq
+
+    def _refresh(self, db):
+        """Reload queued / running counts per owner and the tiers that went stale."""
+        Job = models.Job
+        rows = (
+            db.query(Job.owner_id, Job.status, func.count(Job.id))
+            .filter(Job.status.in_([models.JobStatus.queued, models.JobStatus.running]))
+            .group_by(Job.owner_id, Job.status)
+            .all()
+        )
+        counts: Dict[int, Dict[str, int]] = {}
+        for owner_id, status, n in rows:
+            counts.setdefault(owner_id, {})[getattr(status, "value", status)] = n
+        stale = [o for o in counts if o not in self._tenants or time.monotonic() - self._tenants[o].tier_loaded_at > self.tier_ttl]
+        tiers = {}
+        if stale:
+            tiers = dict(db.query(models.User.id, models.User.subscription).filter(models.User.id.in_(stale)).all())
+        with self._lock:
+            for owner_id in stale:
+                t = self._tenants.get(owner_id)
+                if t is None:
+                    t = self._tenants[owner_id] = Tenant(owner_id)
+                tier = tiers.get(owner_id)
+                t.set_tier(getattr(tier, "value", tier) or "free")
+            for owner_id, t in self._tenants.items():
+                t.queued = counts.get(owner_id, {}).get("queued", 0)
+                t.running = counts.get(owner_id, {}).get("running", 0)
+                if t.queued and not t.heap_seq:
+                    self._push(t)
+
+    def dispatch(self, db, slots: int, claim: Callable[[int], Optional[int]]) -> List[int]:
+        """Fill up to `slots` slots; `claim(owner_id)` claims one queued job of that owner and returns its id."""
+        if slots <= 0:
+            return []
+        self._refresh(db)
+        picked: List[int] = []
+        held_back: List[Tenant] = []
+        while len(picked) < slots and self._heap:
+            with self._lock:
+                _, seq, owner_id = heapq.heappop(self._heap)
+                t = self._tenants.get(owner_id)
+                if t is None or t.heap_seq != seq:
+                    # entry of a tenant that was dropped meanwhile
+                    continue
+                t.heap_seq = 0
+                if not t.queued:
+                    continue
+                decision = t.blocked()
+            if decision:
+                DECISIONS.inc(tier=t.tier, decision=decision)
+                held_back.append(t)
+                continue
+            job_id = claim(owner_id)
+            if job_id is None:
+                # claimed by another worker meanwhile, or routed to another shard
+                DECISIONS.inc(tier=t.tier, decision="unclaimable")
+                held_back.append(t)
+                continue
+            DECISIONS.inc(tier=t.tier, decision="dispatched")
+            picked.append(job_id)
+            with self._lock:
+                self._vnow = max(self._vnow, t.vtime)
+                t.vtime += 1.0 / t.weight
+                t.queued -= 1
+                t.running += 1
+                t.pending["jobs_started"] += 1
+                if t.queued:
+                    self._push(t)
+        with self._lock:
+            for t in held_back:
+                if t.queued and not t.heap_seq:
+                    self._push(t)
+        return picked
+
+    def returned(self, owner_id: int):
+        """A dispatched job went back to the queue without running."""
+        with self._lock:
+            t = self._tenants.get(owner_id)
+            if t is not None:
+                t.pending["jobs_started"] -= 1
+
+    def finished(self, owner_id: int, seconds: float):
+        with self._lock:
+            t = self._tenants.get(owner_id)
+            if t is None:
+                t = self._tenants[owner_id] = Tenant(owner_id)
+            t.pending["jobs_finished"] += 1
+            t.pending["run_seconds"] += seconds
+
+    # --- usage counters ---
+    def maybe_flush(self):
+        if time.monotonic() < self._next_flush:
+            return
+        self._next_flush = time.monotonic() + self.flush_interval
+        try:
+            self.flush()
+        except Exception as e:
+            logger.warning(f"Flushing tenant usage failed: {e}")
+
+    def flush(self):
+        """Add this worker's usage since the last flush to `tenant_usage` and reload today's totals."""
+        from .models import TenantUsage
+
+        with self._lock:
+            day = self._day
+            deltas = {}
+            for owner_id, t in self._tenants.items():
+                if any(t.pending.values()):
+                    deltas[owner_id] = dict(t.pending)
+                    t.pending = {"jobs_started": 0, "jobs_finished": 0, "run_seconds": 0.0}
+            owners = list(self._tenants)
+        now = time.time()
+        with self.session_factory() as db:
+            try:
+                for owner_id, delta in list(deltas.items()):
+                    self._add_usage(db, TenantUsage, owner_id, day, delta, now)
+                    del deltas[owner_id]
+            except Exception:
+                self._restore(deltas)
+                raise
+            today = _today()
+            used = dict(db.query(TenantUsage.owner_id, TenantUsage.jobs_started).filter(TenantUsage.day == today, TenantUsage.owner_id.in_(owners)).all()) if owners else {}
+        with self._lock:
+            self._day = today
+            for owner_id, t in self._tenants.items():
+                t.used = used.get(owner_id, 0)
+            # forget tenants without work so the table stays bounded by active owners
+            for owner_id in [o for o, t in self._tenants.items() if not t.queued and not t.running and not any(t.pending.values())]:
+                del self._tenants[owner_id]
+
+    @staticmethod
+    def _add_usage(db, TenantUsage, owner_id: int, day: str, delta: Dict, now: float):
+        values = {getattr(TenantUsage, k): getattr(TenantUsage, k) + v for k, v in delta.items()}
+        values[TenantUsage.updated_at] = now
+        query = db.query(TenantUsage).filter(TenantUsage.owner_id == owner_id, TenantUsage.day == day)
+        if not query.update(values, synchronize_session=False):
+            db.add(TenantUsage(owner_id=owner_id, day=day, updated_at=now, **delta))
+            try:
+                db.commit()
+                return
+            except IntegrityError:
+                # another worker created the row first
+                db.rollback()
+                query.update(values, synchronize_session=False)
+        db.commit()
+
+    def _restore(self, deltas: Dict[int, Dict]):
+        """Put usage that could not be written back, so the next flush retries it."""
+        with self._lock:
+            for owner_id, delta in deltas.items():
+                t = self._tenants.get(owner_id)
+                if t is None:
+                    t = self._tenants[owner_id] = Tenant(owner_id)
+                for k, v in delta.items():
+                    t.pending[k] += v
+
+    def stats(self) -> Dict[str, Dict]:
+        with self._lock:
+            return {
+                str(t.owner_id): {"tier": t.tier, "weight": t.weight, "queued": t.queued, "running": t.running, "max_running": t.max_running, "used_today": t.used + t.pending["jobs_started"], "daily_jobs": t.daily_jobs, "vtime": round(t.vtime, 3)}
+                for t in self._tenants.values()
+            }
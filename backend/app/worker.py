@@ -0,0 +1,397 @@
+# backend/app/worker.py
+# Job worker: claims queued `Job` rows and executes them through the pipeline.
+#
+# Any number of worker processes, on any number of hosts, can point at the same
+# database. Claiming is atomic: Postgres uses `SELECT ... FOR UPDATE SKIP LOCKED`
+# so workers never block on each other's rows, every other backend (SQLite in
+# development) falls back to a conditional `UPDATE ... WHERE status = 'queued'`
+# and only keeps the rows whose update actually matched.
+#
+# A claim is a lease: the job row records the claiming worker and `lease_expires_at`, and
+# a heartbeat thread extends the leases of the jobs in flight every third of the lease.
+# A worker that crashes or hangs stops heartbeating; once its leases expire any worker
+# requeues those jobs (or fails them after WORKER_MAX_ATTEMPTS claims), and the pipeline
+# resumes them from their stage checkpoints.
+#
+# With WORKER_SHARDING on (default) workers also split accounts and proxies between
+# them through `services.shard_coordinator`: a job whose `shard_key` names an account
+# is only claimed by the worker leasing that account, one job per account at a time.
+#
+# With WORKER_FAIR_SCHEDULING on (default) free slots are shared between job owners by
+# weighted fair queueing over their subscription tiers (see `tenant_scheduler`) instead
+# of going to the oldest queued jobs.
+
+import os
+import time
+import socket
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, List, Set, Tuple
+
+from sqlalchemy import and_, or_
+
+from .db import SessionLocal
+from . import models
+from .pipeline import Pipeline, _split
+from .services.job_checkpoints import JobCheckpoints
+from .services.shard_coordinator import ShardCoordinator, proxy_resource
+from .tenant_scheduler import TenantScheduler
+from .telemetry import REGISTRY
+
+logger = logging.getLogger("worker")
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def claim_jobs(db, limit: int, worker_id: Optional[str] = None, lease: float = 60.0, shard_keys: Optional[Set[str]] = None, owner_id: Optional[int] = None) -> List[int]:
+    """Atomically move up to `limit` queued jobs to running, leased to `worker_id` for `lease` seconds, and return their ids.
+
+    With `shard_keys`, only jobs without a shard key or with one of those keys are claimed,
+    and at most one job per key. With `owner_id`, only that owner's jobs are claimed.
+    """
+    if limit <= 0:
+        return []
+    Job = models.Job
+    claim = {Job.status: models.JobStatus.running, Job.worker_id: worker_id, Job.lease_expires_at: time.time() + lease, Job.attempts: Job.attempts + 1}
+    query = db.query(Job.id, Job.shard_key).filter(Job.status == models.JobStatus.queued)
+    if shard_keys is not None:
+        query = query.filter(or_(Job.shard_key.is_(None), Job.shard_key.in_(shard_keys)))
+    if owner_id is not None:
+        # served by ix_jobs_owner_id_created_at
+        query = query.filter(Job.owner_id == owner_id)
+    query = query.order_by(Job.created_at, Job.id).limit(limit)
+
+    def one_per_key(rows):
+        if shard_keys is None:
+            return list(rows)
+        seen = set()
+        picked = []
+        for row in rows:
+            if row.shard_key is None or row.shard_key not in seen:
+                seen.add(row.shard_key)
+                picked.append(row)
+        return picked
+
+    if db.get_bind().dialect.name == "postgresql":
+        ids = [row.id for row in one_per_key(query.with_for_update(skip_locked=True))]
+        if ids:
+            db.query(Job).filter(Job.id.in_(ids)).update(claim, synchronize_session=False)
+        db.commit()
+        return ids
+
+    claimed = []
+    for row in one_per_key(query.all()):
+        updated = (
+            db.query(Job)
+            .filter(Job.id == row.id, Job.status == models.JobStatus.queued)
+            .update(claim, synchronize_session=False)
+        )
+        if updated:
+            claimed.append(row.id)
+    db.commit()
+    return claimed
+
+
+def reclaim_stalled(db, lease: float = 60.0, max_attempts: int = 3) -> Tuple[List[int], List[int]]:
+    """Requeue running jobs whose lease expired; jobs already claimed `max_attempts` times fail instead.
+
+    Jobs claimed before leases existed (no `lease_expires_at`) count as stalled once they
+    have not been updated for `lease` seconds. Returns `(requeued_ids, failed_ids)`.
+    """
+    Job = models.Job
+    now = time.time()
+    stalled = or_(
+        Job.lease_expires_at < now,
+        and_(Job.lease_expires_at.is_(None), Job.updated_at < datetime.now(timezone.utc) - timedelta(seconds=lease)),
+    )
+    rows = db.query(Job.id, Job.attempts).filter(Job.status == models.JobStatus.running, stalled).all()
+    requeued, failed = [], []
+    for row in rows:
+        if row.attempts >= max_attempts:
+            values = {Job.status: models.JobStatus.failed, Job.lease_expires_at: None, Job.error_message: f"Worker lease expired {row.attempts} times; giving up"}
+        else:
+            values = {Job.status: models.JobStatus.queued, Job.worker_id: None, Job.lease_expires_at: None}
+        # conditional on the row still being stalled, so a late heartbeat or another reclaimer wins cleanly
+        updated = db.query(Job).filter(Job.id == row.id, Job.status == models.JobStatus.running, stalled).update(values, synchronize_session=False)
+        if updated:
+            (failed if row.attempts >= max_attempts else requeued).append(row.id)
+    db.commit()
+    return requeued, failed
+
+
+class JobWorker:
+    """Poll the jobs table and run claimed jobs on a thread pool.
+
+    `concurrency` bounds the number of jobs in flight in this process; the pipeline
+    applies its own per-stage limits on top of that. `lease` (WORKER_LEASE_SECONDS, 60)
+    is how long a claim survives without a heartbeat; `max_attempts` (WORKER_MAX_ATTEMPTS, 3)
+    bounds how often a job is claimed before a stalled one is failed instead of requeued.
+    `sharding` (WORKER_SHARDING, on) routes account jobs and proxies through a `ShardCoordinator`;
+    a job waits up to SHARD_PROXY_WAIT seconds (300) for one of its proxies before it is requeued.
+    `fair` (WORKER_FAIR_SCHEDULING, on) hands free slots to job owners through a `TenantScheduler`.
+    """
+
+    def __init__(self, session_factory=SessionLocal, pipeline: Optional[Pipeline] = None, concurrency: Optional[int] = None, poll_interval: Optional[float] = None, worker_id: Optional[str] = None, gc_interval: Optional[float] = None, sharding: Optional[bool] = None, fair: Optional[bool] = None):
+        self.session_factory = session_factory
+        self.pipeline = pipeline or Pipeline()
+        self.concurrency = concurrency or int(os.getenv("WORKER_CONCURRENCY", "4"))
+        self.poll_interval = poll_interval or float(os.getenv("WORKER_POLL_INTERVAL", "2"))
+        self.worker_id = worker_id or default_worker_id()
+        self._executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="job")
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.gc_interval = gc_interval if gc_interval is not None else float(os.getenv("MEDIA_GC_INTERVAL", "600"))
+        self._next_gc = 0.0
+        self.lease = float(os.getenv("WORKER_LEASE_SECONDS", "60"))
+        self.max_attempts = int(os.getenv("WORKER_MAX_ATTEMPTS", "3"))
+        self._jobs: Dict[int, Set[str]] = {}  # ids in flight (kept alive by the heartbeat) -> leased resources they use
+        self._next_reclaim = 0.0
+        if sharding is None:
+            sharding = os.getenv("WORKER_SHARDING", "true").lower() in ("1", "true", "yes")
+        self.coordinator = ShardCoordinator(self.worker_id, session_factory, lease=self.lease) if sharding else None
+        self.proxy_wait = float(os.getenv("SHARD_PROXY_WAIT", "300"))
+        if fair is None:
+            fair = os.getenv("WORKER_FAIR_SCHEDULING", "true").lower() in ("1", "true", "yes")
+        self.scheduler = TenantScheduler(session_factory) if fair else None
+        REGISTRY.gauge("worker_jobs_in_flight", "Jobs executing in this worker process.", lambda: [({"worker": self.worker_id}, self._in_flight)])
+        REGISTRY.gauge("shard_resources_held", "Accounts and proxies leased to this worker.", lambda: [({"worker": self.worker_id}, len(self.coordinator.stats()["held"]) if self.coordinator else 0)])
+        REGISTRY.gauge("pipeline_stage_jobs", "Jobs inside (active) and queued in front of (waiting) each pipeline stage.", self._stage_samples)
+
+    def stop(self):
+        self._stop.set()
+
+    def _stage_samples(self):
+        for stage, stats in self.pipeline.stage_stats().items():
+            yield {"stage": stage, "state": "active"}, stats["active"]
+            yield {"stage": stage, "state": "waiting"}, stats["waiting"]
+
+    def _free_slots(self) -> int:
+        with self._lock:
+            return self.concurrency - self._in_flight
+
+    def poll_once(self) -> int:
+        """Claim as many jobs as there are free slots and submit them. Returns the number claimed."""
+        slots = self._free_slots()
+        if slots <= 0:
+            return 0
+        if self.coordinator and not self.coordinator.grok_ready():
+            return 0
+        keys: Dict[int, Optional[str]] = {}
+        with self.session_factory() as db:
+            shard_keys = self._claimable_keys(db) if self.coordinator else None
+            if self.scheduler:
+                ids = self.scheduler.dispatch(db, slots, lambda owner_id: next(iter(self._claim(db, 1, shard_keys, keys, owner_id)), None))
+            else:
+                ids = self._claim(db, slots, shard_keys, keys)
+        for job_id in ids:
+            with self._lock:
+                self._in_flight += 1
+                self._jobs[job_id] = {keys[job_id]} if keys.get(job_id) else set()
+            self._executor.submit(self._execute, job_id)
+        if ids:
+            logger.info(f"Worker {self.worker_id} claimed jobs {ids}")
+        return len(ids)
+
+    def _claim(self, db, limit: int, shard_keys: Optional[Set[str]], keys: Dict[int, Optional[str]], owner_id: Optional[int] = None) -> List[int]:
+        """`claim_jobs` for this worker; records the shard keys of the claimed jobs in `keys` and
+        takes them out of `shard_keys`, so later claims of the same poll skip those accounts."""
+        ids = claim_jobs(db, limit, self.worker_id, self.lease, shard_keys, owner_id)
+        if ids and shard_keys is not None:
+            claimed = dict(db.query(models.Job.id, models.Job.shard_key).filter(models.Job.id.in_(ids)).all())
+            keys.update(claimed)
+            shard_keys.difference_update(claimed.values())
+        return ids
+
+    def _claimable_keys(self, db) -> Set[str]:
+        """Shard keys of queued jobs this worker leases, minus accounts that already have a job in flight here."""
+        queued = [key for (key,) in db.query(models.Job.shard_key).filter(models.Job.status == models.JobStatus.queued, models.Job.shard_key.isnot(None)).distinct()]
+        with self._lock:
+            busy = set().union(*self._jobs.values())
+        return self.coordinator.claimable_keys(k for k in queued if k not in busy)
+
+    def run_forever(self):
+        logger.info(f"Worker {self.worker_id} started (concurrency={self.concurrency}, stages={self.pipeline.limits}, lease={self.lease}s)")
+        if self.coordinator:
+            self.coordinator.register()
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        try:
+            while not self._stop.is_set():
+                self._maybe_reclaim()
+                try:
+                    claimed = self.poll_once()
+                except Exception as e:
+                    logger.warning(f"Claiming jobs failed: {e}")
+                    claimed = 0
+                self._maybe_collect_media()
+                if self.scheduler:
+                    self.scheduler.maybe_flush()
+                # poll again immediately while there is backlog and capacity
+                if not claimed or not self._free_slots():
+                    self._stop.wait(self.poll_interval)
+        finally:
+            self._executor.shutdown(wait=True)
+            heartbeat.join()
+            if self.scheduler:
+                try:
+                    self.scheduler.flush()
+                except Exception as e:
+                    logger.warning(f"Flushing tenant usage failed: {e}")
+            if self.coordinator:
+                try:
+                    self.coordinator.leave()
+                except Exception as e:
+                    logger.warning(f"Releasing shard leases failed: {e}")
+            logger.info(f"Worker {self.worker_id} stopped")
+
+    def _heartbeat_loop(self):
+        # keeps beating until the executor drained, so jobs finishing after stop() keep their leases
+        while not self._stop.wait(self.lease / 3) or self._in_flight:
+            try:
+                self.heartbeat()
+            except Exception as e:
+                logger.warning(f"Heartbeat failed: {e}")
+
+    def heartbeat(self) -> int:
+        """Extend the leases of this worker's jobs in flight; returns the number of leases extended."""
+        with self._lock:
+            ids = list(self._jobs)
+            busy = set().union(*self._jobs.values())
+        if self.coordinator:
+            self.coordinator.heartbeat(busy)
+        if not ids:
+            return 0
+        Job = models.Job
+        with self.session_factory() as db:
+            extended = (
+                db.query(Job)
+                .filter(Job.id.in_(ids), Job.worker_id == self.worker_id, Job.status == models.JobStatus.running)
+                .update({Job.lease_expires_at: time.time() + self.lease}, synchronize_session=False)
+            )
+            db.commit()
+        with self._lock:
+            # jobs that finished meanwhile are no longer running; only count the ones still in flight
+            still = sum(1 for job_id in ids if job_id in self._jobs)
+        if extended < still:
+            logger.warning(f"Worker {self.worker_id} lost the lease on {still - extended} of its jobs")
+        return extended
+
+    def _maybe_reclaim(self):
+        """Requeue other workers' stalled jobs, at most every third of the lease."""
+        if time.monotonic() < self._next_reclaim:
+            return
+        self._next_reclaim = time.monotonic() + self.lease / 3
+        try:
+            with self.session_factory() as db:
+                requeued, failed = reclaim_stalled(db, self.lease, self.max_attempts)
+        except Exception as e:
+            logger.warning(f"Reclaiming stalled jobs failed: {e}")
+            return
+        if requeued:
+            logger.info(f"Requeued stalled jobs {requeued}")
+        for job_id in failed:
+            logger.warning(f"Job {job_id} failed after {self.max_attempts} expired leases")
+            self.pipeline.events.emit(job_id, "failed", 100, "Worker lease expired too often; giving up")
+
+    def _maybe_collect_media(self):
+        """Run `MediaStore.gc()` every `gc_interval` seconds so long-running workers keep disk use bounded."""
+        if not self.gc_interval or time.monotonic() < self._next_gc:
+            return
+        self._next_gc = time.monotonic() + self.gc_interval
+        try:
+            from .services.media_store import get_media_store
+
+            stats = get_media_store().gc()
+            if stats["removed"] or stats["orphans_removed"]:
+                logger.info(f"Media GC: {stats}")
+        except Exception as e:
+            logger.warning(f"Media GC failed: {e}")
+
+    def _execute(self, job_id: int):
+        try:
+            with self.session_factory() as db:
+                job = db.get(models.Job, job_id)
+                payload = dict(job.metadata or {}) if job else {}
+                owner_id = job.owner_id if job else None
+            events = self.pipeline.events
+            if self.coordinator and _split(payload.get("proxies")):
+                proxies = self._lease_proxies(job_id, _split(payload.get("proxies")))
+                if not proxies:
+                    self._requeue(job_id)
+                    if self.scheduler:
+                        self.scheduler.returned(owner_id)
+                    return
+                payload["proxies"] = proxies
+            events.emit(job_id, "running", 0, f"Claimed by {self.worker_id}")
+            started = time.monotonic()
+            try:
+                result = self.pipeline.run(payload, job_id=job_id, checkpoints=JobCheckpoints(job_id, self.session_factory))
+            except Exception as e:
+                logger.warning(f"Job {job_id} failed: {e}")
+                # terminal events go out after the row is final, so watchers can fetch the outcome
+                if self._finish(job_id, models.JobStatus.failed, error_message=str(e)[:1000]):
+                    events.emit(job_id, "failed", 100, str(e))
+                return
+            finally:
+                if self.scheduler:
+                    self.scheduler.finished(owner_id, time.monotonic() - started)
+            if self._finish(job_id, models.JobStatus.completed, result=result):
+                events.emit(job_id, "completed", 100, artifacts={"result_url": result.get("post_url") or result.get("download_url")})
+        except Exception:
+            logger.exception(f"Job {job_id} could not be finalised")
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._jobs.pop(job_id, None)
+
+    def _lease_proxies(self, job_id: int, proxies: List[str]) -> List[str]:
+        """The job's proxies leased to this worker, waiting while other shards use all of them."""
+        deadline = time.monotonic() + self.proxy_wait
+        while True:
+            leased = self.coordinator.proxies_for(proxies)
+            if leased:
+                with self._lock:
+                    self._jobs[job_id] |= {proxy_resource(p) for p in leased}
+                return leased
+            if time.monotonic() >= deadline or self._stop.wait(self.poll_interval):
+                return []
+
+    def _requeue(self, job_id: int):
+        """Hand a claimed job back to the queue without counting the claim as an attempt."""
+        Job = models.Job
+        with self.session_factory() as db:
+            (
+                db.query(Job)
+                .filter(Job.id == job_id, Job.worker_id == self.worker_id, Job.status == models.JobStatus.running)
+                .update({Job.status: models.JobStatus.queued, Job.worker_id: None, Job.lease_expires_at: None, Job.attempts: Job.attempts - 1}, synchronize_session=False)
+            )
+            db.commit()
+        logger.info(f"Job {job_id} requeued: its proxies are leased to other workers")
+
+    def _finish(self, job_id: int, status: "models.JobStatus", result: Optional[dict] = None, error_message: Optional[str] = None) -> bool:
+        """Record the outcome while the job is still leased to this worker; returns whether it was recorded."""
+        with self._lock:
+            # off the heartbeat before the row leaves `running`
+            self._jobs.pop(job_id, None)
+        with self.session_factory() as db:
+            job = db.get(models.Job, job_id)
+            if not job:
+                return False
+            if job.worker_id != self.worker_id or job.status != models.JobStatus.running:
+                # the lease expired and the job was reclaimed; its new owner resumes from the checkpoints
+                logger.warning(f"Job {job_id} is no longer leased to {self.worker_id}; dropping its {status.value} outcome")
+                return False
+            job.status = status
+            job.lease_expires_at = None
+            job.error_message = error_message
+            if result is not None:
+                job.result_url = result.get("post_url") or result.get("download_url")
+                # assign a new dict so the JSON column is flagged as modified
+                job.metadata = {**(job.metadata or {}), "result": result}
+            db.commit()
+            return True
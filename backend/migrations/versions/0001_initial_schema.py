@@ -0,0 +1,148 @@
+"""initial schema
+
+Tables as created by `Base.metadata.create_all()` in earlier releases; databases created that
+way are adopted with `alembic stamp 0001`.
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-17 03:30:16
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0001"
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "users",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("email", sa.String(), nullable=False),
+        sa.Column("name", sa.String(), nullable=True),
+        sa.Column("subscription", sa.Enum("free", "trial", "paid", "cancelled", name="subscriptionstatus"), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_users_email", "users", ["email"], unique=True)
+    op.create_index("ix_users_id", "users", ["id"])
+
+    op.create_table(
+        "jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("script_id", sa.String(), nullable=True),
+        sa.Column("status", sa.Enum("queued", "running", "completed", "failed", name="jobstatus"), nullable=True),
+        sa.Column("metadata", sa.JSON(), nullable=True),
+        sa.Column("result_url", sa.String(), nullable=True),
+        sa.Column("error_message", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_jobs_id", "jobs", ["id"])
+    op.create_index("ix_jobs_status", "jobs", ["status"])
+
+    op.create_table(
+        "scheduled_uploads",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("platform", sa.String(), nullable=False),
+        sa.Column("account", sa.String(), nullable=False),
+        sa.Column("video_path", sa.String(), nullable=False),
+        sa.Column("caption", sa.Text(), nullable=True),
+        sa.Column("cookies_path", sa.String(), nullable=True),
+        sa.Column("publish_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("status", sa.Enum("scheduled", "running", "posted", "failed", name="uploadstatus"), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("post_url", sa.String(), nullable=True),
+        sa.Column("error_message", sa.String(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_scheduled_uploads_id", "scheduled_uploads", ["id"])
+    op.create_index("ix_scheduled_uploads_account", "scheduled_uploads", ["account"])
+    op.create_index("ix_scheduled_uploads_publish_at", "scheduled_uploads", ["publish_at"])
+    op.create_index("ix_scheduled_uploads_status", "scheduled_uploads", ["status"])
+
+    op.create_table(
+        "upload_sessions",
+        sa.Column("platform", sa.String(), nullable=False),
+        sa.Column("account", sa.String(), nullable=False),
+        sa.Column("storage_state", sa.JSON(), nullable=False),
+        sa.Column("digest", sa.String(length=64), nullable=False),
+        sa.Column("valid", sa.Boolean(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("platform", "account"),
+    )
+
+    op.create_table(
+        "trend_cache",
+        sa.Column("key", sa.String(), nullable=False),
+        sa.Column("value", sa.JSON(), nullable=True),
+        sa.Column("fetched_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+    op.create_table(
+        "prompt_cache",
+        sa.Column("key", sa.String(length=64), nullable=False),
+        sa.Column("prompt", sa.Text(), nullable=False),
+        sa.Column("value", sa.JSON(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("key"),
+    )
+
+    op.create_table(
+        "media_objects",
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("path", sa.String(), nullable=False),
+        sa.Column("size", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.Column("last_used_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("sha256"),
+    )
+    op.create_index("ix_media_objects_last_used_at", "media_objects", ["last_used_at"])
+
+    op.create_table(
+        "prepared_media",
+        sa.Column("source_sha256", sa.String(length=64), nullable=False),
+        sa.Column("profile", sa.String(), nullable=False),
+        sa.Column("output_sha256", sa.String(length=64), nullable=False),
+        sa.Column("mode", sa.String(), nullable=False),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("source_sha256", "profile"),
+    )
+
+    op.create_table(
+        "media_refs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("sha256", sa.String(length=64), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=True),
+        sa.Column("holder", sa.String(), nullable=True),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"]),
+        sa.ForeignKeyConstraint(["sha256"], ["media_objects.sha256"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_media_refs_job_id", "media_refs", ["job_id"])
+    op.create_index("ix_media_refs_sha256", "media_refs", ["sha256"])
+
+
+def downgrade():
+    op.drop_table("media_refs")
+    op.drop_table("prepared_media")
+    op.drop_table("media_objects")
+    op.drop_table("prompt_cache")
+    op.drop_table("trend_cache")
+    op.drop_table("upload_sessions")
+    op.drop_table("scheduled_uploads")
+    op.drop_table("jobs")
+    op.drop_table("users")
+    sa.Enum(name="uploadstatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="jobstatus").drop(op.get_bind(), checkfirst=True)
+    sa.Enum(name="subscriptionstatus").drop(op.get_bind(), checkfirst=True)
@@ -0,0 +1,31 @@
+"""composite indexes for job and scheduled upload queries
+
+(status, created_at) serves the worker's "oldest queued job" claim, (owner_id, created_at)
+the per-owner keyset pagination of GET /jobs, (status, publish_at) the upload scheduler poll.
+On a large Postgres table run this outside peak hours; CREATE INDEX locks writes meanwhile.
+The indexes may already exist on databases created by `create_all` after they were added to
+the models, hence IF NOT EXISTS.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 03:40:00
+"""
+from alembic import op
+
+
+revision = "0002"
+down_revision = "0001"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index("ix_jobs_status_created_at", "jobs", ["status", "created_at"], if_not_exists=True)
+    op.create_index("ix_jobs_owner_id_created_at", "jobs", ["owner_id", "created_at"], if_not_exists=True)
+    op.create_index("ix_scheduled_uploads_status_publish_at", "scheduled_uploads", ["status", "publish_at"], if_not_exists=True)
+
+
+def downgrade():
+    op.drop_index("ix_scheduled_uploads_status_publish_at", table_name="scheduled_uploads")
+    op.drop_index("ix_jobs_owner_id_created_at", table_name="jobs")
+    op.drop_index("ix_jobs_status_created_at", table_name="jobs")
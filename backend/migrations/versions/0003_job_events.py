@@ -0,0 +1,34 @@
+"""job progress events
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 05:10:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0003"
+down_revision = "0002"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "job_events",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("phase", sa.String(), nullable=False),
+        sa.Column("percent", sa.Float(), nullable=False),
+        sa.Column("message", sa.Text(), nullable=True),
+        sa.Column("artifacts", sa.JSON(), nullable=True),
+        sa.Column("created_at", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_job_events_job_id", "job_events", ["job_id"])
+
+
+def downgrade():
+    op.drop_table("job_events")
@@ -0,0 +1,41 @@
+"""job stage checkpoints and worker leases
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 09:40:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0004"
+down_revision = "0003"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.add_column(sa.Column("worker_id", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("lease_expires_at", sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column("attempts", sa.Integer(), server_default="0", nullable=False))
+    op.create_table(
+        "job_stages",
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("stage", sa.String(), nullable=False),
+        sa.Column("idempotency_key", sa.String(length=64), nullable=False),
+        sa.Column("output", sa.JSON(), nullable=True),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("started_at", sa.Float(), nullable=False),
+        sa.Column("completed_at", sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(["job_id"], ["jobs.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("job_id", "stage"),
+    )
+
+
+def downgrade():
+    op.drop_table("job_stages")
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("attempts")
+        batch_op.drop_column("lease_expires_at")
+        batch_op.drop_column("worker_id")
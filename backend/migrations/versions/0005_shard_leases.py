@@ -0,0 +1,47 @@
+"""worker registrations, resource leases and job shard keys
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 11:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0005"
+down_revision = "0004"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.add_column(sa.Column("shard_key", sa.String(), nullable=True))
+    op.create_index("ix_jobs_status_shard_key", "jobs", ["status", "shard_key"])
+    op.create_table(
+        "worker_registrations",
+        sa.Column("worker_id", sa.String(), nullable=False),
+        sa.Column("started_at", sa.Float(), nullable=False),
+        sa.Column("heartbeat_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("worker_id"),
+    )
+    op.create_index("ix_worker_registrations_heartbeat_at", "worker_registrations", ["heartbeat_at"])
+    op.create_table(
+        "resource_leases",
+        sa.Column("resource", sa.String(), nullable=False),
+        sa.Column("worker_id", sa.String(), nullable=False),
+        sa.Column("acquired_at", sa.Float(), nullable=False),
+        sa.Column("expires_at", sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint("resource"),
+    )
+    op.create_index("ix_resource_leases_worker_id", "resource_leases", ["worker_id"])
+
+
+def downgrade():
+    op.drop_index("ix_resource_leases_worker_id", table_name="resource_leases")
+    op.drop_table("resource_leases")
+    op.drop_index("ix_worker_registrations_heartbeat_at", table_name="worker_registrations")
+    op.drop_table("worker_registrations")
+    op.drop_index("ix_jobs_status_shard_key", table_name="jobs")
+    with op.batch_alter_table("jobs") as batch_op:
+        batch_op.drop_column("shard_key")
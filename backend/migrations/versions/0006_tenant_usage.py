@@ -0,0 +1,32 @@
+"""per-tenant daily usage counters
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 13:05:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0006"
+down_revision = "0005"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        "tenant_usage",
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.String(length=10), nullable=False),
+        sa.Column("jobs_started", sa.Integer(), nullable=False),
+        sa.Column("jobs_finished", sa.Integer(), nullable=False),
+        sa.Column("run_seconds", sa.Float(), nullable=False),
+        sa.Column("updated_at", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["owner_id"], ["users.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("owner_id", "day"),
+    )
+
+
+def downgrade():
+    op.drop_table("tenant_usage")
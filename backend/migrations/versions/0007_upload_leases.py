@@ -0,0 +1,26 @@
+"""scheduled upload leases
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 15:20:00
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = "0007"
+down_revision = "0006"
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table("scheduled_uploads") as batch_op:
+        batch_op.add_column(sa.Column("claimed_by", sa.String(), nullable=True))
+        batch_op.add_column(sa.Column("lease_expires_at", sa.Float(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("scheduled_uploads") as batch_op:
+        batch_op.drop_column("lease_expires_at")
+        batch_op.drop_column("claimed_by")
@@ -0,0 +1,228 @@
+"""Offline throughput / latency benchmark of the trend, generate and upload paths.
+
+Usage:
+  python backend/scripts/bench_automation.py --paths trend --concurrency 1,4,16 --trend-429-rate 0.05
+  python backend/scripts/bench_automation.py --paths generate,upload --concurrency 1,2,4 --requests 20
+  python backend/scripts/bench_automation.py --paths generate --grok-engine playwright --generation-delay 5
+
+Nothing leaves the machine: Grok, TikTok and Instagram are replaced by the pages of
+`bench_fakes.FakeSite` through GROK_LOGIN_URL / GROK_IMAGINE_URL / TIKTOK_UPLOAD_URL /
+INSTAGRAM_UPLOAD_URL, and pytrends by `bench_fakes.fake_trendreq` (latency and injected 429s).
+The generate and upload paths run the real automation (Chrome / Playwright Chromium must be
+installed) through the same `Pipeline` methods the worker uses.
+
+Media, downloads, proxy state and the database (sqlite unless --database-url is given) live in
+a temporary directory. One JSON line is printed per (path, concurrency): requests, errors,
+throughput and p50/p95/p99 latency.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List
+
+from bench_fakes import FakeSite, fake_trendreq
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("bench_automation")
+
+PATHS = ("trend", "generate", "upload")
+SEEDS = ["ai video", "travel", "fitness", "cooking", "music", "fashion", "gaming", "pets", "finance", "diy"]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of `values` (sorted or not)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, int(round(pct / 100.0 * len(ordered) + 0.5)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def measure(name: str, call: Callable[[int], bool], concurrency: int, requests: int) -> Dict:
+    """Run `requests` calls of `call(i)` with `concurrency` in flight; `call` returns success."""
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def one(i: int):
+        started = time.perf_counter()
+        try:
+            ok, reason = call(i), "failed"
+        except Exception as e:
+            ok, reason = False, type(e).__name__
+        elapsed = time.perf_counter() - started
+        with lock:
+            if ok:
+                latencies.append(elapsed)
+            else:
+                errors[reason] = errors.get(reason, 0) + 1
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix=f"bench-{name}") as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - started
+    return {
+        "path": name,
+        "concurrency": concurrency,
+        "requests": requests,
+        "ok": len(latencies),
+        "errors": errors,
+        "wall_s": round(wall, 3),
+        "throughput_per_s": round(len(latencies) / wall, 3) if wall else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "max_ms": round(max(latencies, default=0.0) * 1000, 1),
+    }
+
+
+def prepare_environment(args, workdir: str, site: FakeSite):
+    """Point every service at the fake site and at throwaway storage; must run before importing the app."""
+    os.environ.update(site.urls())
+    os.environ.update({
+        "DATABASE_URL": args.database_url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "MEDIA_STORE_DIR": os.path.join(workdir, "media"),
+        "GROK_DOWNLOAD_DIR": os.path.join(workdir, "downloads"),
+        "SOCIAL_DOWNLOAD_DIR": os.path.join(workdir, "uploads"),
+        "PROXY_STATE_PATH": "",
+        "GROK_USERNAME": "bench@example.com",
+        "GROK_PASSWORD": "bench",
+        "GROK_GENERATION_TIMEOUT": str(int(args.generation_delay * 4 + 30)),
+        "GROK_POOL_SIZE": str(max(args.concurrency)),
+    })
+
+
+def trend_call(args) -> Callable[[int], bool]:
+    from backend.app.services.proxy_manager import ProxyManager
+    from backend.app.services.trends import TrendScout
+
+    factory = fake_trendreq(latency=args.trend_latency, jitter=args.jitter, rate_limit=args.trend_429_rate)
+    # fake proxies are never contacted; they only exercise rotation and cooldowns
+    proxies = [f"http://bench-proxy-{i}:8080" for i in range(args.trend_proxies)]
+    manager = ProxyManager(cooldown=args.proxy_cooldown, max_cooldown=args.proxy_cooldown * 4, rate_per_minute=6000, max_wait=args.proxy_cooldown)
+
+    def call(i: int) -> bool:
+        seeds = [SEEDS[(i + k) % len(SEEDS)] for k in range(args.seeds)]
+        scout = TrendScout(proxies=proxies, cache=None, proxy_manager=manager, trendreq_factory=factory)
+        return scout.safe_fetch_top_trend(seeds) is not None
+
+    return call
+
+
+def generate_call(args) -> Callable[[int], bool]:
+    if args.grok_engine == "playwright":
+        from backend.app.services.grok_automator_async import AsyncGrokAutomator
+
+        def call(i: int) -> bool:
+            automator = AsyncGrokAutomator(headless=args.headless)
+            return bool(asyncio.run(automator.imagine(f"bench prompt {i} {time.time()}")).get("local_path"))
+
+        return call
+
+    from backend.app.pipeline import Pipeline
+
+    pipeline = Pipeline()
+
+    def call(i: int) -> bool:
+        return bool(pipeline.run_grok(f"bench prompt {i} {time.time()}", None, args.headless).get("local_path"))
+
+    return call
+
+
+def upload_call(args, workdir: str, site: FakeSite) -> Callable[[int], bool]:
+    from backend.app.pipeline import Pipeline
+
+    pipeline = Pipeline()
+    video = os.path.join(workdir, "bench.mp4")
+    with open(video, "wb") as fh:
+        fh.write(site.media("upload"))
+
+    def call(i: int) -> bool:
+        result = pipeline.run_upload(args.platform, video, f"bench caption {i}", None, args.headless)
+        return args.platform != "tiktok" or "/video/" in (result.get("post_url") or "")
+
+    return call
+
+
+def shutdown_automation():
+    grok = sys.modules.get("backend.app.services.grok_automator")
+    if grok is not None:
+        grok.shutdown_driver_pool()
+    engines = sys.modules.get("backend.app.services.playwright_engine")
+    if engines is not None:
+        engines.shutdown_playwright_engines()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--paths", default="trend", help=f"Comma-separated subset of {','.join(PATHS)}")
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 4, 16])
+    parser.add_argument("--requests", type=int, default=None, help="Calls per concurrency level (default 4x concurrency, at least 20)")
+    parser.add_argument("--warmup", type=int, default=1, help="Unmeasured calls before each path (browser start, login)")
+    parser.add_argument("--headless", type=lambda x: x.lower() in ("1", "true", "yes"), default=True)
+    parser.add_argument("--jitter", type=float, default=0.2, help="Relative jitter of every injected delay")
+    # trend path
+    parser.add_argument("--trend-latency", type=float, default=0.3, help="Seconds per fake pytrends request")
+    parser.add_argument("--trend-429-rate", type=float, default=0.0, help="Share of fake pytrends requests answered with 429")
+    parser.add_argument("--trend-proxies", type=int, default=0, help="Number of fake proxies to rotate through")
+    parser.add_argument("--proxy-cooldown", type=float, default=5.0)
+    parser.add_argument("--seeds", type=int, default=5, help="Seed keywords per trend request")
+    # generate / upload paths
+    parser.add_argument("--grok-engine", choices=("selenium", "playwright"), default="selenium")
+    parser.add_argument("--generation-delay", type=float, default=2.0, help="Seconds until the fake Grok page shows the media link")
+    parser.add_argument("--upload-delay", type=float, default=1.0, help="Seconds until the fake upload page confirms")
+    parser.add_argument("--page-latency", type=float, default=0.0, help="Seconds added to every fake page response")
+    parser.add_argument("--media-kb", type=int, default=512)
+    parser.add_argument("--platform", choices=("tiktok", "instagram"), default="tiktok")
+    parser.add_argument("--database-url", default=None)
+    parser.add_argument("--keep", action="store_true", help="Keep the temporary directory")
+    args = parser.parse_args()
+
+    paths = [p.strip() for p in args.paths.split(",") if p.strip()]
+    unknown = set(paths) - set(PATHS)
+    if unknown:
+        parser.error(f"unknown paths: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp(prefix="bench_automation_")
+    site = FakeSite(generation_delay=args.generation_delay, upload_delay=args.upload_delay, page_latency=args.page_latency, jitter=args.jitter, media_bytes=args.media_kb * 1024).start()
+    prepare_environment(args, workdir, site)
+
+    from backend.app.db import Base, engine
+    from backend.app import models  # noqa: F401  (registers the tables)
+
+    Base.metadata.create_all(engine)
+    try:
+        for name in paths:
+            if name == "trend":
+                call = trend_call(args)
+            elif name == "generate":
+                call = generate_call(args)
+            else:
+                call = upload_call(args, workdir, site)
+            for i in range(args.warmup):
+                try:
+                    call(-1 - i)
+                except Exception as e:
+                    logger.warning(f"Warm-up call of {name} failed: {e}")
+            for concurrency in args.concurrency:
+                requests = args.requests or max(20, concurrency * 4)
+                print(json.dumps(measure(name, call, concurrency, requests)), flush=True)
+        print(json.dumps({"fake_site_hits": site.hits}), flush=True)
+    finally:
+        shutdown_automation()
+        site.stop()
+        if args.keep:
+            logger.warning(f"Kept {workdir}")
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
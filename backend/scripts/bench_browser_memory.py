@@ -0,0 +1,128 @@
+"""Browser memory per session with the `full` (Chrome defaults) and `lite` browser profiles.
+
+Usage:
+  python backend/scripts/bench_browser_memory.py --engine selenium --sessions 4
+  python backend/scripts/bench_browser_memory.py --engine playwright --sessions 8 --url https://www.tiktok.com/upload
+
+Each profile opens `--sessions` browsers (Selenium: one Chrome per session, like the Grok driver pool;
+Playwright: one context and page per session in a shared Chromium, like the upload engine), loads the
+page, waits `--settle` seconds and sums the PSS of the browser processes from /proc (Linux only).
+The default page is the `/heavy` page of `bench_fakes.FakeSite` (large images, web fonts, a tracker).
+
+One JSON line per profile: total MB, MB per driver and drivers per GB; the last line compares them.
+"""
+import json
+import time
+import asyncio
+import logging
+import argparse
+import shutil
+import tempfile
+from contextlib import AsyncExitStack
+
+from bench_fakes import FakeSite
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger("bench_browser_memory")
+
+
+def make_profile(name: str, cache_dir: str):
+    from backend.app.services.browser_profile import BrowserProfile
+
+    if name == "full":
+        return BrowserProfile.full()
+    # the fake tracker is served locally, so block it by path as the built-in host patterns would
+    return BrowserProfile(block_urls=["*/analytics/*"], cache_dir=cache_dir, memory_budget_mb=0)
+
+
+def measure_selenium(profile, url: str, sessions: int, settle: float, headless: bool) -> dict:
+    from backend.app.services.browser_profile import driver_memory
+    from backend.app.services.grok_automator import GrokAutomator
+
+    automator = GrokAutomator(headless=headless, profile=profile)
+    drivers = []
+    try:
+        for _ in range(sessions):
+            driver = automator._start_driver()
+            automator.driver = None
+            driver.get(url)
+            drivers.append(driver)
+        time.sleep(settle)
+        used = [driver_memory(d) for d in drivers]
+        if None in used:
+            raise SystemExit("Memory figures need /proc (Linux)")
+        return {"total": sum(used)}
+    finally:
+        for driver in drivers:
+            automator.quit_driver(driver)
+
+
+def measure_playwright(profile, url: str, sessions: int, settle: float, headless: bool) -> dict:
+    from backend.app.services.browser_profile import playwright_memory
+    from backend.app.services.playwright_engine import PlaywrightEngine
+
+    engine = PlaywrightEngine(headless=headless, max_contexts=sessions, profile=profile)
+
+    async def hold():
+        async with AsyncExitStack() as stack:
+            for i in range(sessions):
+                _, page = await stack.enter_async_context(engine.page(f"bench-{i}"))
+                await page.goto(url, wait_until="load")
+            await asyncio.sleep(settle)
+            return await asyncio.to_thread(playwright_memory)
+
+    try:
+        total = engine.call_sync(hold)
+    finally:
+        engine.close()
+    if total is None:
+        raise SystemExit("Memory figures need /proc (Linux)")
+    return {"total": total}
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--engine", choices=("selenium", "playwright"), default="selenium")
+    parser.add_argument("--sessions", type=int, default=4)
+    parser.add_argument("--settle", type=float, default=5.0, help="Seconds to wait after loading before measuring")
+    parser.add_argument("--url", default=None, help="Page to load (default: the fake heavy page)")
+    parser.add_argument("--profiles", default="full,lite")
+    parser.add_argument("--headless", type=lambda x: x.lower() in ("1", "true", "yes"), default=True)
+    args = parser.parse_args()
+
+    site = None
+    url = args.url
+    if url is None:
+        site = FakeSite().start()
+        url = f"{site.base_url}/heavy"
+    cache_dir = tempfile.mkdtemp(prefix="bench_browser_cache_")
+    measure = measure_selenium if args.engine == "selenium" else measure_playwright
+    results = {}
+    try:
+        for name in [p.strip() for p in args.profiles.split(",") if p.strip()]:
+            if site is not None:
+                site.hits.clear()
+            total = measure(make_profile(name, cache_dir), url, args.sessions, args.settle, args.headless)["total"]
+            per_session = total / args.sessions / 1024 ** 2
+            results[name] = {
+                "profile": name,
+                "engine": args.engine,
+                "sessions": args.sessions,
+                "total_mb": round(total / 1024 ** 2, 1),
+                "per_driver_mb": round(per_session, 1),
+                "drivers_per_gb": round(1024 / per_session, 2) if per_session else None,
+                "requests": dict(site.hits) if site is not None else None,
+            }
+            print(json.dumps(results[name]), flush=True)
+        if "full" in results and "lite" in results and results["full"]["drivers_per_gb"]:
+            print(json.dumps({
+                "drivers_per_gb_gain": round(results["lite"]["drivers_per_gb"] / results["full"]["drivers_per_gb"], 2),
+                "saved_mb_per_driver": round(results["full"]["per_driver_mb"] - results["lite"]["per_driver_mb"], 1),
+            }), flush=True)
+    finally:
+        if site is not None:
+            site.stop()
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+if __name__ == '__main__':
+    main()
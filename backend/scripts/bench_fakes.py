@@ -0,0 +1,260 @@
+"""Local stand-ins for the sites the automation talks to, used by bench_automation.py.
+
+`FakeSite` serves pages with the selectors the real flows look for:
+  /grok/login          input[name=email], input[name=password], button[type=submit]; lands on a page with <nav>
+  /grok/imagine        textarea[placeholder*='Describe'] and an "Imagine" button; after the generation delay
+                       an a.download-link and a <video> pointing at /media/<id>.mp4 appear
+  /media/<id>.mp4      a payload of `media_bytes` (HEAD supported, no ranges)
+  /tiktok/upload       input[type=file], caption textarea and a "Post" button that navigates to /tiktok/video/<id>
+  /instagram/create    input[type=file], textarea and a "Share" button that shows "Your reel was shared"
+  /heavy               a page weighed down like the real ones: large images, web fonts and a tracker script
+                       (used by bench_browser_memory.py to compare browser profiles)
+
+`fake_trendreq()` returns a pytrends `TrendReq` replacement with configurable latency and a rate of
+injected 429 responses, for `TrendScout(trendreq_factory=...)`.
+"""
+import re
+import time
+import uuid
+import zlib
+import struct
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+import pandas as pd
+from pytrends.exceptions import TooManyRequestsError
+
+LOGIN_PAGE = """<!doctype html><html><body>
+<form method="post" action="/grok/login">
+  <input type="email" name="email"><input type="password" name="password">
+  <button type="submit">Log in</button>
+</form></body></html>"""
+
+HOME_PAGE = """<!doctype html><html><body><nav>Grok</nav><p>Signed in</p></body></html>"""
+
+IMAGINE_PAGE = """<!doctype html><html><body><nav>Grok</nav>
+<textarea placeholder="Describe your video"></textarea>
+<button id="imagine">Imagine</button>
+<div id="result"></div>
+<script>
+document.getElementById('imagine').addEventListener('click', () => {
+  const id = Math.random().toString(16).slice(2) + Date.now().toString(16);
+  setTimeout(() => {
+    const video = document.createElement('video');
+    video.src = location.origin + '/media/' + id + '.mp4';
+    const link = document.createElement('a');
+    link.className = 'download-link';
+    link.href = '/media/' + id + '.mp4';
+    link.textContent = 'Download';
+    document.getElementById('result').append(video, link);
+  }, %(generation_ms)d);
+});
+</script></body></html>"""
+
+TIKTOK_PAGE = """<!doctype html><html><body>
+<input type="file" accept="video/*">
+<textarea placeholder="Add a caption"></textarea>
+<button id="post">Post</button>
+<script>
+document.getElementById('post').addEventListener('click', () => {
+  setTimeout(() => { location.href = '/tiktok/video/' + Date.now().toString(16); }, %(upload_ms)d);
+});
+</script></body></html>"""
+
+TIKTOK_VIDEO_PAGE = """<!doctype html><html><body><p>Your video is live</p></body></html>"""
+
+INSTAGRAM_PAGE = """<!doctype html><html><body>
+<input type="file" accept="video/*">
+<textarea aria-label="Write a caption"></textarea>
+<button id="share">Share</button>
+<p id="status"></p>
+<script>
+document.getElementById('share').addEventListener('click', () => {
+  setTimeout(() => { document.getElementById('status').textContent = 'Your reel was shared'; }, %(upload_ms)d);
+});
+</script></body></html>"""
+
+HEAVY_PAGE = """<!doctype html><html><head>
+<style>%(fonts)s body { font-family: bench0, sans-serif; }</style>
+<script src="/analytics/collect.js"></script>
+</head><body><nav>Bench</nav>
+%(images)s
+</body></html>"""
+
+
+def _png(width: int, height: int) -> bytes:
+    """A valid, solid-colour RGB PNG: small on the wire, width*height*4 bytes once decoded."""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+    rows = (b"\x00" + b"\x80\x40\xc0" * width) * height
+    header = struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(rows, 9)) + chunk(b"IEND", b"")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: "FakeSite"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", content_type: str = "text/html; charset=utf-8", headers=None, head: bool = False):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def _page(self, template: str):
+        site = self.server
+        html = template % {"generation_ms": site.delay_ms(site.generation_delay), "upload_ms": site.delay_ms(site.upload_delay)}
+        self._send(200, html.encode("utf-8"))
+
+    def _route(self, head: bool = False):
+        site = self.server
+        path = urlsplit(self.path).path
+        site.count(path)
+        if site.page_latency:
+            time.sleep(site.page_latency)
+        media = re.fullmatch(r"/media/([\w-]+)\.mp4", path)
+        if media:
+            self._send(200, site.media(media.group(1)), content_type="video/mp4", head=head)
+        elif path == "/grok/login":
+            self._page(LOGIN_PAGE)
+        elif path == "/grok/home":
+            self._page(HOME_PAGE)
+        elif path == "/grok/imagine":
+            self._page(IMAGINE_PAGE)
+        elif path == "/tiktok/upload":
+            self._page(TIKTOK_PAGE)
+        elif path.startswith("/tiktok/video/"):
+            self._page(TIKTOK_VIDEO_PAGE)
+        elif path == "/instagram/create":
+            self._page(INSTAGRAM_PAGE)
+        elif path == "/heavy":
+            self._send(200, site.heavy_page().encode("utf-8"))
+        elif re.fullmatch(r"/img/\d+\.png", path):
+            self._send(200, site.image(), content_type="image/png", head=head)
+        elif re.fullmatch(r"/font/\d+\.woff2", path):
+            self._send(200, b"\x00" * 64 * 1024, content_type="font/woff2", head=head)
+        elif path.startswith("/analytics/"):
+            self._send(200, b"(function(){ setInterval(function(){ fetch('/analytics/beacon'); }, 1000); })();", content_type="application/javascript", head=head)
+        else:
+            self._send(404, b"not found", content_type="text/plain")
+
+    def do_GET(self):
+        self._route()
+
+    def do_HEAD(self):
+        self._route(head=True)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self.server.count(urlsplit(self.path).path)
+        self._send(303, headers={"Location": "/grok/home", "Set-Cookie": "session=bench; Path=/"})
+
+
+class FakeSite(ThreadingHTTPServer):
+    """Threaded HTTP server for the fake Grok / TikTok / Instagram pages; delays are in seconds."""
+
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, generation_delay: float = 2.0, upload_delay: float = 1.0, page_latency: float = 0.0, jitter: float = 0.2, media_bytes: int = 512 * 1024):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.generation_delay = generation_delay
+        self.upload_delay = upload_delay
+        self.page_latency = page_latency
+        self.jitter = jitter
+        self.media_bytes = media_bytes
+        self.hits = {}
+        self.heavy_images = 24
+        self.heavy_fonts = 4
+        self._image: bytes = b""
+        self._lock = threading.Lock()
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def urls(self) -> dict:
+        """Environment overrides that point the automation at this server."""
+        return {
+            "GROK_LOGIN_URL": f"{self.base_url}/grok/login",
+            "GROK_IMAGINE_URL": f"{self.base_url}/grok/imagine",
+            "TIKTOK_UPLOAD_URL": f"{self.base_url}/tiktok/upload",
+            "INSTAGRAM_UPLOAD_URL": f"{self.base_url}/instagram/create",
+        }
+
+    def delay_ms(self, seconds: float) -> int:
+        return int(max(0.0, seconds * (1 + random.uniform(-self.jitter, self.jitter))) * 1000)
+
+    def media(self, media_id: str) -> bytes:
+        # distinct per id so the media store does not deduplicate generations
+        head = b"\x00\x00\x00\x18ftypmp42" + media_id.encode("ascii")
+        return head + b"\x00" * max(0, self.media_bytes - len(head))
+
+    def image(self) -> bytes:
+        with self._lock:
+            if not self._image:
+                self._image = _png(1600, 1200)
+            return self._image
+
+    def heavy_page(self) -> str:
+        fonts = " ".join(f"@font-face {{ font-family: bench{i}; src: url('/font/{i}.woff2'); }}" for i in range(self.heavy_fonts))
+        images = "\n".join(f'<img src="/img/{i}.png" width="400">' for i in range(self.heavy_images))
+        return HEAVY_PAGE % {"fonts": fonts, "images": images}
+
+    def count(self, path: str):
+        key = path.rsplit("/", 1)[0] if path.startswith(("/media/", "/tiktok/video/", "/img/", "/font/", "/analytics/")) else path
+        with self._lock:
+            self.hits[key] = self.hits.get(key, 0) + 1
+
+    def start(self) -> "FakeSite":
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-site", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def fake_trendreq(latency: float = 0.3, jitter: float = 0.2, rate_limit: float = 0.0, queries: int = 10):
+    """A `TrendReq` stand-in: each `related_queries()` sleeps ~`latency` seconds and raises a 429
+    with probability `rate_limit`; results are canned top/rising frames for every keyword."""
+
+    class FakeTrendReq:
+        calls = 0
+        rate_limited = 0
+        _lock = threading.Lock()
+
+        def __init__(self, hl: str = "en-US", tz: int = 360, timeout=None, proxies=None, **kwargs):
+            self.proxies = proxies
+            self.kw_list = []
+
+        def build_payload(self, kw_list, cat=0, timeframe="today 5-y", geo="", gprop=""):
+            self.kw_list = list(kw_list)
+
+        def related_queries(self):
+            time.sleep(max(0.0, latency * (1 + random.uniform(-jitter, jitter))))
+            limited = random.random() < rate_limit
+            with FakeTrendReq._lock:
+                FakeTrendReq.calls += 1
+                FakeTrendReq.rate_limited += limited
+            if limited:
+                raise TooManyRequestsError("The request failed: Google returned a response with code 429", None)
+            result = {}
+            for kw in self.kw_list:
+                rows = [{"query": f"{kw} {uuid.uuid4().hex[:6]}", "value": random.randint(1, 100)} for _ in range(queries)]
+                result[kw] = {"top": pd.DataFrame(rows), "rising": pd.DataFrame(rows[: queries // 2])}
+            return result
+
+    return FakeTrendReq
@@ -0,0 +1,81 @@
+"""Measure API cold start: a fresh interpreter importing `app.main` and serving its first request.
+
+Usage:
+  python backend/scripts/bench_startup.py --runs 10
+  python backend/scripts/bench_startup.py --runs 10 --eager   # also load the automation modules, as earlier releases did
+
+Each run is a new process (like a uvicorn worker being spawned). Reported per mode: total wall
+time of the process, time spent importing `app.main`, time until `GET /health` answered, and
+which heavy modules ended up loaded. `DATABASE_URL` must point at a reachable driver; a
+throwaway sqlite file works (`DATABASE_URL=sqlite:////tmp/bench.db`).
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ("selenium", "undetected_chromedriver", "playwright", "pytrends", "pandas")
+EAGER_MODULES = (
+    "app.services.grok_automator",
+    "app.services.grok_automator_async",
+    "app.services.social_uploader",
+    "app.services.trends",
+)
+
+CHILD = """
+import sys, time, json, importlib
+started = time.perf_counter()
+import app.main
+imported = time.perf_counter()
+for name in {eager!r}:
+    importlib.import_module(name)
+from fastapi.testclient import TestClient
+with TestClient(app.main.app) as client:
+    client.get("/health").raise_for_status()
+served = time.perf_counter()
+print(json.dumps({{
+    "import": imported - started,
+    "first_request": served - started,
+    "loaded": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def run_once(eager: bool) -> dict:
+    code = CHILD.format(eager=EAGER_MODULES if eager else (), heavy=HEAVY_MODULES)
+    started = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], cwd=BACKEND_DIR, capture_output=True, text=True)
+    wall = time.perf_counter() - started
+    if out.returncode != 0:
+        raise SystemExit(out.stderr.strip()[-2000:])
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+    result["wall"] = wall
+    return result
+
+
+def summarize(mode: str, runs: list) -> dict:
+    summary = {"mode": mode, "runs": len(runs), "loaded": runs[-1]["loaded"]}
+    for key in ("wall", "import", "first_request"):
+        values = [r[key] for r in runs]
+        summary[f"{key}_median_ms"] = round(statistics.median(values) * 1000, 1)
+        summary[f"{key}_max_ms"] = round(max(values) * 1000, 1)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--eager", action="store_true", help="Also measure with the automation modules imported at startup")
+    args = parser.parse_args()
+
+    modes = [("lazy", False)] + ([("eager", True)] if args.eager else [])
+    for mode, eager in modes:
+        runs = [run_once(eager) for _ in range(args.runs)]
+        print(json.dumps(summarize(mode, runs)))
+
+if __name__ == '__main__':
+    main()
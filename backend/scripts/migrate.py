@@ -0,0 +1,51 @@
+"""Bring the database schema up to date (run once per deploy, before API and worker processes start).
+
+Usage:
+  python backend/scripts/migrate.py              # upgrade to the latest revision
+  python backend/scripts/migrate.py --sql        # print the SQL instead of running it
+  python backend/scripts/migrate.py --revision 0001
+
+The API no longer creates tables at import time. A database created that way by an earlier
+release (tables present, no `alembic_version`) is stamped at the initial revision first, so
+only the later revisions run against it.
+"""
+import os
+import logging
+import argparse
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate")
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+INITIAL_REVISION = "0001"
+
+
+def _is_unversioned(url: str) -> bool:
+    engine = create_engine(url)
+    try:
+        tables = set(inspect(engine).get_table_names())
+    finally:
+        engine.dispose()
+    return "jobs" in tables and "alembic_version" not in tables
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--revision", default="head")
+    parser.add_argument("--sql", action="store_true", help="Offline mode: print SQL, do not connect")
+    args = parser.parse_args()
+
+    config = Config(os.path.join(BACKEND_DIR, "alembic.ini"))
+    if not args.sql:
+        from backend.app.db import DATABASE_URL
+
+        if _is_unversioned(DATABASE_URL):
+            logger.info("Existing schema without migration history, stamping revision %s", INITIAL_REVISION)
+            command.stamp(config, INITIAL_REVISION)
+    command.upgrade(config, args.revision, sql=args.sql)
+
+if __name__ == '__main__':
+    main()
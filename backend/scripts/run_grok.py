@@ -3,8 +3,15 @@
 Usage:
   python backend/scripts/run_grok.py --prompt "A short cinematic AI video" --headless True
 
+Batch mode (one logged-in session, several tabs, one NDJSON line per finished prompt):
+  python backend/scripts/run_grok.py --prompt "first" --prompt "second" --tabs 3
+  python backend/scripts/run_grok.py --prompts-file prompts.txt   # one prompt per line, "-" for stdin
+
 This script only performs a dry-run if the browser dependencies are not installed. It prints errors for developer inspection.
 """
+import sys
+import json
+import asyncio
 import argparse
 import logging
 from backend.app.services.grok_automator import GrokAutomator, AuthenticationError, CaptchaError
@@ -14,12 +21,26 @@ logger = logging.getLogger("run_grok")
 
 def main():
     parser = argparse.ArgumentParser()
-    parser.add_argument("--prompt", required=True)
+    parser.add_argument("--prompt", action="append", default=[], help="Prompt to generate; repeat for a batch")
+    parser.add_argument("--prompts-file", default=None, help="File with one prompt per line ('-' for stdin)")
+    parser.add_argument("--tabs", type=int, default=None, help="Parallel generations in batch mode (GROK_BATCH_TABS)")
+    parser.add_argument("--cache", default="use", choices=["use", "bypass", "refresh"], help="Prompt cache policy in batch mode")
     parser.add_argument("--headless", type=lambda x: x.lower() in ("1","true","yes"), default=True)
     parser.add_argument("--proxies", default=None, help="Optional comma-separated proxy list")
     args = parser.parse_args()
 
+    prompts = list(args.prompt)
+    if args.prompts_file:
+        fh = sys.stdin if args.prompts_file == "-" else open(args.prompts_file, encoding="utf-8")
+        with fh:
+            prompts.extend(line.strip() for line in fh if line.strip())
+    if not prompts:
+        parser.error("provide --prompt or --prompts-file")
+
     proxy_list = args.proxies.split(",") if args.proxies else None
+    if len(prompts) > 1:
+        asyncio.run(run_batch(prompts, args, proxy_list))
+        return
     automator = GrokAutomator(headless=args.headless, proxies=proxy_list)
     try:
         try:
@@ -30,7 +51,7 @@ def main():
             return
 
         try:
-            res = automator.imagine(args.prompt)
+            res = automator.imagine(prompts[0])
             logger.info("Imagine result: %s", res)
         except CaptchaError as e:
             logger.error("Captcha encountered: %s", e)
@@ -39,5 +60,17 @@ def main():
     finally:
         automator.close()
 
+async def run_batch(prompts, args, proxy_list):
+    from backend.app.services.grok_automator_async import AsyncGrokAutomator
+    from backend.app.services.prompt_cache import get_prompt_cache
+    from backend.app.services.playwright_engine import shutdown_playwright_engines
+
+    automator = AsyncGrokAutomator(headless=args.headless, proxies=proxy_list)
+    try:
+        async for item in automator.imagine_many(prompts, max_tabs=args.tabs, cache=get_prompt_cache(), policy=args.cache):
+            print(json.dumps(item, default=str), flush=True)
+    finally:
+        shutdown_playwright_engines()
+
 if __name__ == '__main__':
     main()
@@ -18,16 +18,17 @@ def main():
     parser.add_argument("--platform", default="tiktok")
     parser.add_argument("--caption", default="")
     parser.add_argument("--headless", type=lambda x: x.lower() in ("1","true","yes"), default=True)
-    parser.add_argument("--cookies", default=None)
+    parser.add_argument("--cookies", default=None, help="storage_state.json to import when the account has no valid session")
+    parser.add_argument("--account", default=None, help="Session-store account to upload as")
     args = parser.parse_args()
 
     uploader = SocialUploader(headless=args.headless)
     try:
         try:
             if args.platform.lower() == 'tiktok':
-                res = uploader.upload_tiktok(args.video, caption=args.caption, cookies_path=args.cookies)
+                res = uploader.upload_tiktok(args.video, caption=args.caption, cookies_path=args.cookies, account=args.account)
             else:
-                res = uploader.upload_instagram_reel(args.video, caption=args.caption, cookies_path=args.cookies)
+                res = uploader.upload_instagram_reel(args.video, caption=args.caption, cookies_path=args.cookies, account=args.account)
             logger.info("Upload result: %s", res)
         except UploadError as e:
             logger.error("Upload failed: %s", e)
@@ -0,0 +1,76 @@
+"""Run the bulk upload scheduler.
+
+Usage:
+  python backend/scripts/run_upload_scheduler.py --concurrency 4
+  python backend/scripts/run_upload_scheduler.py --items uploads.jsonl   # schedule items first, then run
+
+Each line of the items file is a JSON object with `video_path`, `caption`, `account`, `platform`,
+optional `publish_at` (ISO 8601) and optional `cookies_path`. Items can also be queued through
+`POST /uploads/schedule`. Several schedulers may share the database (running uploads are leased to
+their scheduler), but rate-limit buckets are per process: each scheduler allows the configured rates.
+"""
+import json
+import signal
+import logging
+import argparse
+from datetime import datetime
+from backend.app.services.upload_scheduler import UploadScheduler
+from backend.app.services.social_uploader import SocialUploader
+from backend.app.services.playwright_engine import shutdown_playwright_engines
+from backend.app import telemetry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("run_upload_scheduler")
+
+def load_items(path):
+    items = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item.get("publish_at"):
+                item["publish_at"] = datetime.fromisoformat(item["publish_at"])
+            items.append(item)
+    return items
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", default=None, help="JSONL file of items to schedule before running")
+    parser.add_argument("--concurrency", type=int, default=None, help="Uploads in flight (env UPLOAD_SCHEDULER_CONCURRENCY)")
+    parser.add_argument("--account-rate", type=float, default=None, help="Uploads per hour per account (env UPLOAD_RATE_ACCOUNT)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve /metrics on this port (env METRICS_PORT)")
+    parser.add_argument("--headless", type=lambda x: x.lower() in ("1","true","yes"), default=True)
+    args = parser.parse_args()
+
+    scheduler = UploadScheduler(
+        uploader_factory=lambda: SocialUploader(headless=args.headless),
+        concurrency=args.concurrency,
+        account_rate=args.account_rate,
+    )
+    if args.items:
+        ids = scheduler.schedule(load_items(args.items))
+        logger.info("Scheduled %d uploads (ids %s..%s)", len(ids), ids[0] if ids else None, ids[-1] if ids else None)
+
+    def _scheduler_samples():
+        stats = scheduler.stats()
+        yield {"state": "in_flight"}, stats["in_flight"]
+        for platform, tokens in stats["platform_tokens"].items():
+            yield {"state": f"tokens_{platform}"}, tokens
+
+    telemetry.REGISTRY.gauge("upload_scheduler", "Uploads in flight and remaining rate-limit tokens per platform.", _scheduler_samples)
+    telemetry.serve(args.metrics_port)
+
+    def _shutdown(signum, frame):
+        logger.info("Signal %s received, finishing in-flight uploads", signum)
+        scheduler.stop()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+    try:
+        scheduler.run_forever()
+    finally:
+        shutdown_playwright_engines()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+"""Run a job worker that executes queued `Job` rows.
+
+Usage:
+  python backend/scripts/run_worker.py --concurrency 4 --grok-concurrency 1
+
+Start as many of these as needed, on one host or several; they coordinate through the
+shared `DATABASE_URL` and never run the same job twice. Accounts and proxies are split
+between the running workers (see app/services/shard_coordinator.py); give each worker
+its own GROK_USERNAME to scale Grok generations out.
+"""
+import argparse
+import logging
+import signal
+from backend.app.worker import JobWorker
+from backend.app.pipeline import Pipeline
+from backend.app import telemetry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("run_worker")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=None, help="Max jobs in flight (env WORKER_CONCURRENCY)")
+    parser.add_argument("--poll-interval", type=float, default=None, help="Seconds between polls when idle (env WORKER_POLL_INTERVAL)")
+    parser.add_argument("--trend-concurrency", type=int, default=None)
+    parser.add_argument("--grok-concurrency", type=int, default=None)
+    parser.add_argument("--prepare-concurrency", type=int, default=None)
+    parser.add_argument("--upload-concurrency", type=int, default=None)
+    parser.add_argument("--worker-id", default=None)
+    parser.add_argument("--no-sharding", action="store_true", help="Do not lease accounts and proxies to this worker (env WORKER_SHARDING=false)")
+    parser.add_argument("--no-fair-scheduling", action="store_true", help="Claim the oldest queued jobs instead of sharing slots between owners (env WORKER_FAIR_SCHEDULING=false)")
+    parser.add_argument("--metrics-port", type=int, default=None, help="Serve /metrics on this port (env METRICS_PORT)")
+    args = parser.parse_args()
+
+    pipeline = Pipeline(
+        trend_concurrency=args.trend_concurrency,
+        grok_concurrency=args.grok_concurrency,
+        upload_concurrency=args.upload_concurrency,
+        prepare_concurrency=args.prepare_concurrency,
+    )
+    worker = JobWorker(pipeline=pipeline, concurrency=args.concurrency, poll_interval=args.poll_interval, worker_id=args.worker_id, sharding=False if args.no_sharding else None, fair=False if args.no_fair_scheduling else None)
+
+    telemetry.serve(args.metrics_port)
+
+    def _shutdown(signum, frame):
+        logger.info("Signal %s received, finishing in-flight jobs", signum)
+        worker.stop()
+
+    signal.signal(signal.SIGINT, _shutdown)
+    signal.signal(signal.SIGTERM, _shutdown)
+    worker.run_forever()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+# backend/tests/conftest.py
+# Shared setup for the backend tests (run from backend/: python -m pytest tests)
+#
+# `app.db` builds its engine from DATABASE_URL at import time, so the suite points it at a throwaway
+# SQLite file before anything from `app` is imported. Tests that need their own tables use the
+# `session_factory` fixture: a fresh in-memory SQLite database per test, shared across threads.
+
+import os
+import tempfile
+
+_db_dir = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_db_dir, 'app.db')}"
+
+import pytest  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+
+from app import models  # noqa: E402
+from app.db import Base  # noqa: E402
+
+
+@pytest.fixture
+def session_factory():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    Base.metadata.create_all(engine)
+    yield sessionmaker(bind=engine, autoflush=False)
+    engine.dispose()
+
+
+@pytest.fixture
+def make_user(session_factory):
+    def make(email: str, subscription: str = "free") -> int:
+        with session_factory() as db:
+            user = models.User(email=email, subscription=models.SubscriptionStatus(subscription))
+            db.add(user)
+            db.commit()
+            return user.id
+
+    return make
@@ -0,0 +1,138 @@
+# backend/tests/test_admission.py
+# AdmissionController: concurrency limit, bounded queue, Retry-After and slot release.
+
+import asyncio
+
+import pytest
+
+from app.admission import AdmissionController, Saturated
+
+
+def make(concurrency=2, max_queue=2, queue_timeout=5.0):
+    return AdmissionController("test", concurrency=concurrency, max_queue=max_queue, queue_timeout=queue_timeout)
+
+
+def test_semaphore_bounds_concurrent_work():
+    async def scenario():
+        controller = make(concurrency=2, max_queue=10)
+        peak = 0
+
+        async def work():
+            nonlocal peak
+            async with controller.admit():
+                peak = max(peak, controller.active)
+                await asyncio.sleep(0.02)
+
+        await asyncio.gather(*(work() for _ in range(6)))
+        return peak, controller.stats()
+
+    peak, stats = asyncio.run(scenario())
+    assert peak == 2
+    assert stats["active"] == 0 and stats["waiting"] == 0 and stats["rejected"] == 0
+
+
+def test_full_queue_is_rejected_with_429():
+    async def scenario():
+        controller = make(concurrency=1, max_queue=1)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holders = [asyncio.create_task(hold()) for _ in range(2)]  # one active, one queued
+        await asyncio.sleep(0.01)
+        assert (controller.active, controller.waiting) == (1, 1)
+        with pytest.raises(Saturated) as rejected:
+            async with controller.admit():
+                pass
+        release.set()
+        await asyncio.gather(*holders)
+        return rejected.value, controller.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.status_code == 429
+    assert error.retry_after >= 1
+    assert stats["rejected"] == 1
+
+
+def test_queue_timeout_is_rejected_with_503():
+    async def scenario():
+        controller = make(concurrency=1, max_queue=5, queue_timeout=0.05)
+        release = asyncio.Event()
+
+        async def hold():
+            async with controller.admit():
+                await release.wait()
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0.01)
+        with pytest.raises(Saturated) as rejected:
+            async with controller.admit():
+                pass
+        release.set()
+        await holder
+        return rejected.value, controller.stats()
+
+    error, stats = asyncio.run(scenario())
+    assert error.status_code == 503
+    assert stats["timed_out"] == 1 and stats["waiting"] == 0
+
+
+def test_retry_after_scales_with_backlog():
+    controller = make(concurrency=4)
+    controller._avg_service = 10.0
+    assert controller.retry_after() == 3  # ceil(10 * 1 / 4)
+    controller.active, controller.waiting = 4, 3
+    assert controller.retry_after() == 20  # ceil(10 * 8 / 4)
+    controller._avg_service = 0.001
+    assert controller.retry_after() == 1
+    controller._avg_service = 1000.0
+    assert controller.retry_after() == 600
+
+
+def test_slot_is_released_on_exception():
+    async def scenario():
+        controller = make(concurrency=1, max_queue=0)
+        with pytest.raises(RuntimeError):
+            async with controller.admit():
+                raise RuntimeError("generation failed")
+        # with no queue a leaked slot would make this a 429
+        async with controller.admit():
+            pass
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["active"] == 0 and stats["rejected"] == 0
+
+
+def test_slot_is_released_on_cancel():
+    async def scenario():
+        controller = make(concurrency=1, max_queue=1)
+        started = asyncio.Event()
+
+        async def work():
+            async with controller.admit():
+                started.set()
+                await asyncio.sleep(10)
+
+        async def wait_in_queue():
+            async with controller.admit():
+                pass
+
+        active = asyncio.create_task(work())
+        await started.wait()
+        queued = asyncio.create_task(wait_in_queue())
+        await asyncio.sleep(0.01)
+        assert controller.waiting == 1
+        # the client of the queued request goes away first, then the running one
+        queued.cancel()
+        active.cancel()
+        await asyncio.gather(active, queued, return_exceptions=True)
+        assert (controller.active, controller.waiting) == (0, 0)
+        async with controller.admit():
+            pass
+        return controller.stats()
+
+    stats = asyncio.run(scenario())
+    assert stats["rejected"] == 0 and stats["timed_out"] == 0
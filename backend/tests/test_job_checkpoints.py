@@ -0,0 +1,86 @@
+# backend/tests/test_job_checkpoints.py
+# Stage checkpoints survive a crashed attempt, and the pipeline resumes after the completed stages.
+
+import pytest
+
+from app import models
+from app.pipeline import Pipeline
+from app.services.job_checkpoints import JobCheckpoints
+
+
+class SilentEvents:
+    def reporter(self, job_id):
+        return lambda *args, **kwargs: None
+
+
+class FakePipeline(Pipeline):
+    """Records stage calls; `generate` fails while `crash` is set, like a worker dying mid-job."""
+
+    def __init__(self, media_path):
+        super().__init__(events=SilentEvents())
+        self.media_path = media_path
+        self.calls = []
+        self.crash = False
+
+    def run_trend(self, seeds, proxies):
+        self.calls.append("trend")
+        return "cat memes"
+
+    def generate(self, prompt, proxies, headless, policy="use", report=None, generated=None):
+        self.calls.append("generate")
+        if self.crash:
+            raise RuntimeError("worker died")
+        return {"download_url": "https://grok.example/1.mp4", "local_path": self.media_path, "cache": "miss", "prompt": prompt}
+
+
+@pytest.fixture
+def job_id(session_factory, make_user):
+    owner_id = make_user("checkpoints@example.com")
+    with session_factory() as db:
+        job = models.Job(owner_id=owner_id, metadata={})
+        db.add(job)
+        db.commit()
+        return job.id
+
+
+def test_checkpoint_is_reused_only_for_the_same_key(session_factory, job_id):
+    checkpoints = JobCheckpoints(job_id, session_factory)
+    key = checkpoints.key("trend", ["ai", "cats"])
+    checkpoints.start("trend", key)
+    checkpoints.complete("trend", key, {"trend": "cat memes"})
+    checkpoints.start("upload", checkpoints.key("upload", "sha", "tiktok"))
+
+    reloaded = JobCheckpoints(job_id, session_factory)
+    assert reloaded.get("trend", key) == {"trend": "cat memes"}
+    assert reloaded.get("trend", reloaded.key("trend", ["ai", "dogs"])) is None
+    assert reloaded.completed() == ["trend"]
+    # started but never completed: the upload may or may not have gone through
+    assert reloaded.in_flight("upload", reloaded.key("upload", "sha", "tiktok"))
+    assert reloaded.get("upload", reloaded.key("upload", "sha", "tiktok")) is None
+    assert reloaded.summary()["upload"] == {"completed": False, "attempts": 1}
+
+
+def test_resumed_job_skips_completed_stages(session_factory, job_id, tmp_path):
+    media = tmp_path / "media.mp4"
+    media.write_bytes(b"video")
+    pipeline = FakePipeline(str(media))
+    payload = {"seeds": "ai,cats", "prompt": "a video about {trend}"}
+
+    pipeline.crash = True
+    with pytest.raises(RuntimeError):
+        pipeline.run(payload, job_id=job_id, checkpoints=JobCheckpoints(job_id, session_factory))
+    assert pipeline.calls == ["trend", "generate"]
+
+    pipeline.calls.clear()
+    pipeline.crash = False
+    result = pipeline.run(payload, job_id=job_id, checkpoints=JobCheckpoints(job_id, session_factory))
+    assert pipeline.calls == ["generate"]
+    assert result["trend"] == "cat memes"
+    assert result["prompt"] == "a video about cat memes"
+    assert result["resumed"] == ["trend"]
+
+    # a third attempt finds the download checkpoint as well and generates nothing
+    pipeline.calls.clear()
+    result = pipeline.run(payload, job_id=job_id, checkpoints=JobCheckpoints(job_id, session_factory))
+    assert pipeline.calls == []
+    assert result["resumed"] == ["trend", "download"]
@@ -0,0 +1,42 @@
+# backend/tests/test_jobs_pagination.py
+# Keyset pagination of GET /jobs on the SQLite dev setup (DATABASE_URL is set in conftest.py)
+
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+
+from app import models
+from app.db import Base, SessionLocal, engine
+from app.main import app
+
+
+def setup_module(module):
+    Base.metadata.create_all(engine)
+    with SessionLocal() as db:
+        user = models.User(email="pagination@example.com")
+        db.add(user)
+        db.flush()
+        # the format the server default (CURRENT_TIMESTAMP) stores on SQLite; the last two share a second
+        stamps = ["2026-01-01 00:00:00", "2026-01-01 00:01:00", "2026-01-01 00:02:00", "2026-01-01 00:03:00", "2026-01-01 00:04:00", "2026-01-01 00:04:00"]
+        for stamp in stamps:
+            db.execute(text("INSERT INTO jobs (owner_id, status, attempts, created_at) VALUES (:owner, 'queued', 0, :stamp)"), {"owner": user.id, "stamp": stamp})
+        db.commit()
+
+
+def teardown_module(module):
+    engine.dispose()
+
+
+def test_cursor_walks_all_pages_once():
+    with TestClient(app) as client:
+        first = client.get("/jobs", params={"limit": 4}).json()
+        assert [job["id"] for job in first["items"]] == [6, 5, 4, 3]
+        assert first["next_cursor"]
+
+        second = client.get("/jobs", params={"limit": 4, "cursor": first["next_cursor"]}).json()
+        assert [job["id"] for job in second["items"]] == [2, 1]
+        assert second["next_cursor"] is None
+
+
+def test_invalid_cursor_is_rejected():
+    with TestClient(app) as client:
+        assert client.get("/jobs", params={"cursor": "not-a-cursor"}).status_code == 400
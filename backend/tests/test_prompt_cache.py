@@ -0,0 +1,183 @@
+# backend/tests/test_prompt_cache.py
+# PromptCache: prompt normalization, TTL / LRU, cache policies and single-flight coalescing.
+
+import asyncio
+import threading
+import time
+
+import pytest
+
+from app.services.prompt_cache import PromptCache, normalize_prompt
+
+
+class FakeMediaStore:
+    """Media of every sha256 in `present` exists."""
+
+    def __init__(self):
+        self.present = set()
+
+    def digest_of(self, path):
+        return None
+
+    def lookup(self, digest):
+        return f"/media/{digest}.mp4" if digest in self.present else None
+
+
+def result(n: int) -> dict:
+    return {"download_url": f"https://grok.example/{n}", "local_path": f"/tmp/{n}.mp4", "sha256": f"sha{n}"}
+
+
+@pytest.fixture
+def media():
+    return FakeMediaStore()
+
+
+@pytest.fixture
+def cache(media):
+    return PromptCache(ttl=60, max_entries=2, media_store=media)
+
+
+def test_normalize_prompt_case_and_whitespace():
+    assert normalize_prompt("  A  Cat\n\tdancing ") == "a cat dancing"
+
+
+def test_normalize_prompt_strips_template():
+    template = "{prompt}, cinematic 9:16 short"
+    assert normalize_prompt("A cat dancing,  Cinematic 9:16 SHORT", template) == "a cat dancing"
+    # prompts not built from the template stay as they are
+    assert normalize_prompt("a cat dancing", template) == "a cat dancing"
+
+
+def test_equivalent_prompts_share_a_key(cache):
+    assert cache.key("A cat") == cache.key("  a   CAT ")
+    assert cache.key("a cat") != cache.key("a dog")
+
+
+def test_hit_requires_media(cache, media):
+    cache.set("a cat", result(1))
+    assert cache.get("a cat") is None
+    assert cache.stats()["stale_media"] == 1
+    cache.set("a cat", result(1))
+    media.present.add("sha1")
+    assert cache.get("A  cat") == {**result(1), "local_path": "/media/sha1.mp4"}
+
+
+def test_ttl_expires_entries(cache, media, monkeypatch):
+    media.present.add("sha1")
+    cache.set("a cat", result(1))
+    now = time.time()
+    monkeypatch.setattr("app.services.prompt_cache.time.time", lambda: now + 61)
+    assert cache.get("a cat") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_lru_evicts_least_recently_used(cache, media):
+    media.present.update({"sha1", "sha2", "sha3"})
+    cache.set("one", result(1))
+    cache.set("two", result(2))
+    assert cache.get("one") is not None  # "two" is now the least recently used
+    cache.set("three", result(3))
+    assert cache.get("two") is None
+    assert cache.get("one") is not None
+    assert cache.get("three") is not None
+
+
+def test_policies(cache, media):
+    media.present.update({"sha1", "sha2"})
+    calls = []
+
+    def generate(n):
+        def run():
+            calls.append(n)
+            return result(n)
+        return run
+
+    assert cache.run("a cat", generate(1)) == (result(1), "miss")
+    served, state = cache.run("a cat", generate(9))
+    assert state == "hit" and served["cached"] and served["sha256"] == "sha1"
+    # bypass neither reads nor writes
+    assert cache.run("a cat", generate(2), policy="bypass") == (result(2), "bypass")
+    assert cache.get("a cat")["sha256"] == "sha1"
+    # refresh regenerates and stores the new result
+    assert cache.run("a cat", generate(2), policy="refresh") == (result(2), "refresh")
+    assert cache.get("a cat")["sha256"] == "sha2"
+    assert calls == [1, 2, 2]
+    with pytest.raises(ValueError):
+        cache.run("a cat", generate(3), policy="sometimes")
+
+
+def test_sync_callers_coalesce(cache):
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def generate():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return result(1)
+
+    outcomes = []
+    leader = threading.Thread(target=lambda: outcomes.append(cache.run("a cat", generate)))
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=lambda: outcomes.append(cache.run("A CAT", generate))) for _ in range(3)]
+    for t in followers:
+        t.start()
+    while cache.stats()["coalesced"] < 3:
+        time.sleep(0.01)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+    assert len(calls) == 1
+    assert sorted(state for _, state in outcomes) == ["coalesced"] * 3 + ["miss"]
+    assert all(value == result(1) for value, _ in outcomes)
+
+
+def test_leader_error_reaches_followers(cache):
+    async def scenario():
+        release = asyncio.Event()
+
+        async def generate():
+            await release.wait()
+            raise RuntimeError("grok down")
+
+        leader = asyncio.create_task(cache.run_async("a cat", generate))
+        await asyncio.sleep(0.05)
+        follower = asyncio.create_task(cache.run_async("a cat", generate))
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(leader, follower, return_exceptions=True)
+
+    outcomes = asyncio.run(scenario())
+    assert [str(e) for e in outcomes] == ["grok down", "grok down"]
+    assert cache.stats()["in_flight"] == 0
+
+
+def test_cancelled_follower_does_not_break_the_flight(cache):
+    async def scenario():
+        release = asyncio.Event()
+        calls = []
+
+        async def generate():
+            calls.append(1)
+            await release.wait()
+            return result(1)
+
+        leader = asyncio.create_task(cache.run_async("a cat", generate))
+        await asyncio.sleep(0.05)
+        gone = asyncio.create_task(cache.run_async("a cat", generate))
+        waiting = asyncio.create_task(cache.run_async("a cat", generate))
+        await asyncio.sleep(0.05)
+        # the first follower's client disconnects while the leader is still generating
+        gone.cancel()
+        await asyncio.sleep(0.05)
+        release.set()
+        outcomes = await asyncio.gather(leader, gone, waiting, return_exceptions=True)
+        return outcomes, calls
+
+    (leader, gone, waiting), calls = asyncio.run(scenario())
+    assert leader == (result(1), "miss")
+    assert isinstance(gone, asyncio.CancelledError)
+    assert waiting == (result(1), "coalesced")
+    assert calls == [1]
@@ -0,0 +1,97 @@
+# backend/tests/test_shard_coordinator.py
+# ShardCoordinator: rendezvous ownership, lease contention and takeover, and rebalancing handover.
+
+import time
+
+from app import models
+from app.services.shard_coordinator import ShardCoordinator, rendezvous_owner
+
+RESOURCES = [f"tiktok:account{n}" for n in range(500)]
+
+
+def coordinator(session_factory, worker_id, **kwargs):
+    kwargs.setdefault("grok_account", "")
+    return ShardCoordinator(worker_id, session_factory=session_factory, lease=60, **kwargs)
+
+
+def test_rendezvous_only_moves_resources_of_the_leaving_worker():
+    workers = ["w1", "w2", "w3", "w4"]
+    before = {r: rendezvous_owner(r, workers) for r in RESOURCES}
+    after = {r: rendezvous_owner(r, ["w1", "w2", "w4"]) for r in RESOURCES}
+    moved = {r for r in RESOURCES if before[r] != after[r]}
+    assert moved == {r for r in RESOURCES if before[r] == "w3"}
+    # the shares stay roughly even
+    assert all(60 < list(before.values()).count(w) < 190 for w in workers)
+    # the order the workers are listed in does not matter
+    assert all(rendezvous_owner(r, list(reversed(workers))) == before[r] for r in RESOURCES[:50])
+
+
+def test_joining_worker_only_takes_resources():
+    before = {r: rendezvous_owner(r, ["w1", "w2"]) for r in RESOURCES}
+    after = {r: rendezvous_owner(r, ["w1", "w2", "w3"]) for r in RESOURCES}
+    assert all(after[r] in (before[r], "w3") for r in RESOURCES)
+
+
+def test_acquire_contention(session_factory):
+    first = coordinator(session_factory, "first")
+    second = coordinator(session_factory, "second")
+    assert first.acquire("tiktok:alice")
+    assert first.acquire("tiktok:alice")  # already ours
+    assert not second.acquire("tiktok:alice")
+    assert second.metrics["contended"] == 1
+    assert not second.holds("tiktok:alice")
+
+
+def test_expired_lease_is_taken_over(session_factory):
+    first = coordinator(session_factory, "first")
+    second = coordinator(session_factory, "second")
+    assert first.acquire("tiktok:alice")
+    with session_factory() as db:
+        db.query(models.ResourceLease).update({models.ResourceLease.expires_at: time.time() - 1})
+        db.commit()
+    assert second.acquire("tiktok:alice")
+    with session_factory() as db:
+        assert db.get(models.ResourceLease, "tiktok:alice").worker_id == "second"
+    # the former holder notices on its next heartbeat
+    first.heartbeat()
+    assert not first.holds("tiktok:alice")
+
+
+def test_heartbeat_hands_over_moved_resources_except_busy_ones(session_factory):
+    first = coordinator(session_factory, "first", grok_account="grok-bot")
+    first.register()
+    resources = RESOURCES[:40]
+    for resource in resources:
+        assert first.acquire(resource)
+    assert first.grok_ready()
+
+    second = coordinator(session_factory, "second")
+    second.register()
+    moving = [r for r in resources if rendezvous_owner(r, ["first", "second"]) == "second"]
+    busy = moving[0]
+    report = first.heartbeat(busy={busy})
+    assert report["workers"] == 2
+    assert report["released"] == len(moving) - 1
+    # still running a job on it: kept until that job finished
+    assert first.holds(busy)
+    assert first.holds(first.grok_resource)
+    assert not any(first.holds(r) for r in moving[1:])
+    assert all(first.holds(r) for r in resources if r not in moving)
+    assert second.claimable_keys(moving) == set(moving[1:])
+
+    # once the job finished, the next heartbeat releases it as well
+    first.heartbeat()
+    assert not first.holds(busy)
+    assert second.claimable_keys([busy]) == {busy}
+
+
+def test_leave_releases_everything(session_factory):
+    first = coordinator(session_factory, "first")
+    second = coordinator(session_factory, "second")
+    first.register()
+    second.register()
+    assert first.acquire("tiktok:alice")
+    first.leave()
+    second.heartbeat()
+    assert second.owner("tiktok:alice") == "second"
+    assert second.acquire("tiktok:alice")
@@ -0,0 +1,146 @@
+# backend/tests/test_tenant_scheduler.py
+# TenantScheduler: weighted fair dispatch, caps and quotas, idle tenants and usage flushing.
+
+from collections import Counter
+
+import pytest
+
+from app import models
+from app.tenant_scheduler import TenantScheduler, _today
+
+
+@pytest.fixture
+def no_limits(monkeypatch):
+    """Lift the default caps and quotas, so only the weights decide."""
+    for tier in ("FREE", "PAID"):
+        monkeypatch.setenv(f"TENANT_{tier}_MAX_RUNNING", "1000")
+        monkeypatch.setenv(f"TENANT_{tier}_DAILY_JOBS", "0")
+
+
+def queue(session_factory, owner_id, count, status=models.JobStatus.queued):
+    with session_factory() as db:
+        db.add_all([models.Job(owner_id=owner_id, metadata={}, status=status) for _ in range(count)])
+        db.commit()
+
+
+class FakeClaims:
+    """claim(owner_id) callback that hands out fake job ids and records who got each slot."""
+
+    def __init__(self):
+        self.owners = []
+
+    def __call__(self, owner_id):
+        self.owners.append(owner_id)
+        return len(self.owners)
+
+
+def dispatch(scheduler, session_factory, slots, claim):
+    with session_factory() as db:
+        return scheduler.dispatch(db, slots, claim)
+
+
+def test_slots_follow_the_weights(session_factory, make_user, no_limits):
+    paid = make_user("paid@example.com", "paid")
+    free = make_user("free@example.com", "free")
+    # the free tenant queued far more, yet gets 1 slot per 8 of the paid one
+    queue(session_factory, paid, 30)
+    queue(session_factory, free, 100)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    claims = FakeClaims()
+    assert len(dispatch(scheduler, session_factory, 18, claims)) == 18
+    assert Counter(claims.owners) == {paid: 16, free: 2}
+
+
+def test_max_running_blocks_dispatch(session_factory, make_user):
+    free = make_user("capped@example.com", "free")
+    trial = make_user("trial@example.com", "trial")
+    queue(session_factory, free, 5)
+    queue(session_factory, free, 1, status=models.JobStatus.running)  # free tier cap is 1
+    queue(session_factory, trial, 5)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    claims = FakeClaims()
+    dispatch(scheduler, session_factory, 10, claims)
+    # trial cap is 2; the free tenant is already at its cap
+    assert Counter(claims.owners) == {trial: 2}
+    assert scheduler.stats()[str(free)]["queued"] == 5
+
+
+def test_daily_quota_blocks_dispatch(session_factory, make_user, monkeypatch):
+    monkeypatch.setenv("TENANT_FREE_MAX_RUNNING", "100")
+    monkeypatch.setenv("TENANT_FREE_DAILY_JOBS", "3")
+    free = make_user("quota@example.com", "free")
+    queue(session_factory, free, 10)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    claims = FakeClaims()
+    dispatch(scheduler, session_factory, 10, claims)
+    assert len(claims.owners) == 3
+    # flushed usage still counts once the in-memory counter is written back
+    scheduler.flush()
+    dispatch(scheduler, session_factory, 10, claims)
+    assert len(claims.owners) == 3
+
+
+def test_idle_tenant_restarts_at_current_virtual_time(session_factory, make_user, no_limits):
+    busy = make_user("busy@example.com", "paid")
+    late = make_user("late@example.com", "paid")
+    queue(session_factory, busy, 30)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    claims = FakeClaims()
+    dispatch(scheduler, session_factory, 10, claims)
+    vnow = scheduler._vnow
+    assert vnow > 1
+
+    # the late tenant was idle all along: no credit for that time
+    queue(session_factory, late, 30)
+    with session_factory() as db:
+        scheduler._refresh(db)
+    assert scheduler._tenants[late].vtime == vnow
+    claims.owners.clear()
+    dispatch(scheduler, session_factory, 4, claims)
+    assert Counter(claims.owners) == {busy: 2, late: 2}
+
+
+def test_unclaimable_tenant_keeps_its_place(session_factory, make_user, no_limits):
+    owner = make_user("sharded@example.com", "paid")
+    queue(session_factory, owner, 3)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    assert dispatch(scheduler, session_factory, 3, lambda owner_id: None) == []
+    claims = FakeClaims()
+    assert len(dispatch(scheduler, session_factory, 3, claims)) == 3
+
+
+def test_flush_writes_usage(session_factory, make_user, no_limits):
+    owner = make_user("usage@example.com", "paid")
+    queue(session_factory, owner, 5)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    dispatch(scheduler, session_factory, 3, FakeClaims())
+    scheduler.finished(owner, 12.5)
+    scheduler.returned(owner)
+    scheduler.flush()
+    # a second flush adds to the row instead of overwriting it
+    scheduler.finished(owner, 2.5)
+    scheduler.flush()
+    with session_factory() as db:
+        usage = db.get(models.TenantUsage, (owner, _today()))
+        assert (usage.jobs_started, usage.jobs_finished, usage.run_seconds) == (2, 2, 15.0)
+    assert scheduler.stats()[str(owner)]["used_today"] == 2
+
+
+def test_failed_flush_restores_pending_usage(session_factory, make_user, no_limits, monkeypatch):
+    owner = make_user("retry@example.com", "paid")
+    queue(session_factory, owner, 5)
+    scheduler = TenantScheduler(session_factory, flush_interval=3600)
+    dispatch(scheduler, session_factory, 2, FakeClaims())
+
+    def broken(*args, **kwargs):
+        raise RuntimeError("database is down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(TenantScheduler, "_add_usage", staticmethod(broken))
+        with pytest.raises(RuntimeError):
+            scheduler.flush()
+    assert scheduler._tenants[owner].pending["jobs_started"] == 2
+
+    scheduler.flush()
+    with session_factory() as db:
+        assert db.get(models.TenantUsage, (owner, _today())).jobs_started == 2
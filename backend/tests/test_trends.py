@@ -0,0 +1,74 @@
+# backend/tests/test_trends.py
+# TrendScout batching and ranking against a stubbed pytrends client.
+
+import pandas as pd
+
+from app.services.proxy_manager import ProxyManager
+from app.services.trends import TrendScout
+
+# top related queries per seed, as (query, value)
+TOP = {
+    "ai": [("ai art", 40), ("chatgpt", 35)],
+    "ki": [("ki revolution", 55)],
+    "robots": [],
+    "drones": [("drone show", 20)],
+    "space": [("mars mission", 30), ("AI Art", 45)],
+    "music": [("ai music", 60)],
+    "cats": [("cat memes", 95)],
+}
+
+
+class FakeTrendReq:
+    """Stands in for pytrends.TrendReq and records every payload."""
+
+    payloads = []
+
+    def __init__(self, **kwargs):
+        self.keywords = []
+
+    def build_payload(self, keywords, **kwargs):
+        self.keywords = list(keywords)
+        FakeTrendReq.payloads.append(list(keywords))
+
+    def related_queries(self):
+        result = {}
+        for kw in self.keywords:
+            rows = TOP.get(kw, [])
+            top = pd.DataFrame(rows, columns=["query", "value"]) if rows else None
+            result[kw] = {"top": top, "rising": None}
+        return result
+
+
+def make_scout():
+    FakeTrendReq.payloads = []
+    return TrendScout(proxy_manager=ProxyManager(state_path=None), trendreq_factory=FakeTrendReq)
+
+
+def test_seeds_are_fetched_five_per_payload():
+    scout = make_scout()
+    results = scout.related_queries_many(list(TOP))
+    assert sorted(len(p) for p in FakeTrendReq.payloads) == [2, 5]
+    assert sorted(kw for p in FakeTrendReq.payloads for kw in p) == sorted(TOP)
+    assert results["robots"] == {"top": [], "rising": []}
+    assert results["ki"]["top"] == [{"query": "ki revolution", "value": 55}]
+
+
+def test_top_trend_is_ranked_across_all_seeds():
+    scout = make_scout()
+    # the first seed returns data, but the best query comes from the last payload
+    assert scout.safe_fetch_top_trend(list(TOP)) == "cat memes"
+    ranked = scout.rank_trends(list(TOP))
+    assert [r["query"] for r in ranked[:3]] == ["cat memes", "ai music", "ki revolution"]
+    # a query reached from several seeds keeps its best value
+    ai_art = [r for r in ranked if r["query"].lower() == "ai art"]
+    assert ai_art == [{"query": "AI Art", "value": 45, "seed": "space"}]
+
+
+def test_failing_fetch_falls_back_to_none():
+    class Broken(FakeTrendReq):
+        def related_queries(self):
+            raise ValueError("bad response")
+
+    # without a wait for cooled-down proxies, so the give-up path is fast
+    scout = TrendScout(proxies=["http://p1:8080", "http://p2:8080"], proxy_manager=ProxyManager(state_path=None, max_wait=0), trendreq_factory=Broken)
+    assert scout.safe_fetch_top_trend(["ai"]) is None
@@ -0,0 +1,188 @@
+# backend/tests/test_upload_scheduler.py
+# UploadScheduler on an in-memory SQLite database: token buckets, claims, leases and retries.
+
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app import models
+from app.services.social_uploader import UploadError
+from app.services.upload_scheduler import TokenBucket, UploadScheduler, is_transient
+
+PAST = datetime.now(timezone.utc) - timedelta(minutes=1)
+
+
+class InlineExecutor:
+    """Runs submitted uploads right away, so a poll finishes them before it returns."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+    def shutdown(self, wait=True):
+        pass
+
+
+class FakeUploader:
+    def __init__(self, posted, error=None):
+        self.posted = posted
+        self.error = error
+
+    def _upload(self, platform, video_path, account):
+        if self.error is not None:
+            raise self.error
+        self.posted.append((platform, account, video_path))
+        return {"post_url": f"https://{platform}.example/{account}/{len(self.posted)}"}
+
+    def upload_tiktok(self, video_path, caption="", cookies_path=None, account=None):
+        return self._upload("tiktok", video_path, account)
+
+    def upload_instagram_reel(self, video_path, caption="", cookies_path=None, account=None):
+        return self._upload("instagram", video_path, account)
+
+
+@pytest.fixture
+def posted():
+    return []
+
+
+@pytest.fixture
+def make_scheduler(session_factory, posted):
+    def make(error=None, **kwargs):
+        options = {"platform_rates": {"tiktok": 0.01, "instagram": 0.01}, "account_rate": 0.01, "platform_burst": 10, "account_burst": 2, "concurrency": 4}
+        options.update(kwargs)
+        scheduler = UploadScheduler(session_factory=session_factory, uploader_factory=lambda: FakeUploader(posted, error), **options)
+        scheduler._executor.shutdown(wait=False)
+        scheduler._executor = InlineExecutor()
+        return scheduler
+
+    return make
+
+
+def schedule(scheduler, *accounts, platform="tiktok"):
+    return scheduler.schedule([{"platform": platform, "account": account, "video_path": f"/videos/{i}.mp4", "publish_at": PAST} for i, account in enumerate(accounts)])
+
+
+def row(session_factory, row_id):
+    with session_factory() as db:
+        return db.get(models.ScheduledUpload, row_id)
+
+
+def test_token_bucket_refills_up_to_capacity():
+    bucket = TokenBucket(rate_per_hour=3600, capacity=2)  # one token per second
+    start = bucket.updated
+    assert bucket.wait_time(start) == 0
+    bucket.take()
+    bucket.take()
+    assert bucket.wait_time(start) == pytest.approx(1.0)
+    assert bucket.wait_time(start + 0.5) == pytest.approx(0.5)
+    assert bucket.wait_time(start + 1.0) == 0
+    # a long idle period refills no more than the capacity
+    assert bucket.wait_time(start + 3600) == 0
+    assert bucket.tokens == 2
+    bucket.give_back()
+    assert bucket.tokens == 2
+
+
+def test_account_bucket_throttles_only_that_account(make_scheduler, session_factory, posted):
+    scheduler = make_scheduler()
+    schedule(scheduler, "alice", "alice", "alice", "bob")
+    scheduler.poll_once()
+    assert sorted(account for _, account, _ in posted) == ["alice", "alice", "bob"]
+    # alice's third upload waits for a refill of her bucket, not of the platform's
+    assert scheduler._try_reserve("tiktok", "alice") > 3600
+    assert scheduler.metrics["throttled"] == 1
+    assert scheduler.metrics["posted"] == 3
+
+
+def test_platform_bucket_caps_all_accounts(make_scheduler, posted):
+    scheduler = make_scheduler(platform_burst=3)
+    schedule(scheduler, "a", "b", "c", "d", "e")
+    schedule(scheduler, "f", platform="instagram")
+    scheduler.poll_once()
+    assert sorted(platform for platform, _, _ in posted) == ["instagram", "tiktok", "tiktok", "tiktok"]
+
+
+def test_lost_claim_refunds_tokens(make_scheduler, posted, monkeypatch):
+    scheduler = make_scheduler()
+    schedule(scheduler, "alice")
+    monkeypatch.setattr(scheduler, "_claim", lambda db, row_id: False)
+    scheduler.poll_once()
+    assert posted == []
+    assert scheduler._platform_buckets["tiktok"].tokens == pytest.approx(10, abs=1e-3)
+    assert scheduler._account_bucket("tiktok", "alice").tokens == pytest.approx(2, abs=1e-3)
+
+
+def test_transient_failure_is_retried_with_jitter(make_scheduler, session_factory, monkeypatch):
+    scheduler = make_scheduler(error=UploadError("Upload input not found", transient=True), retry_base=30, max_retries=2)
+    [row_id] = schedule(scheduler, "alice")
+    monkeypatch.setattr("app.services.upload_scheduler.random.uniform", lambda low, high: high)
+    before = datetime.now(timezone.utc)
+    scheduler.poll_once()
+    item = row(session_factory, row_id)
+    assert item.status == models.UploadStatus.scheduled
+    assert item.attempts == 1
+    assert item.error_message == "Upload input not found"
+    assert item.claimed_by is None and item.lease_expires_at is None
+    publish_at = item.publish_at if item.publish_at.tzinfo else item.publish_at.replace(tzinfo=timezone.utc)
+    assert publish_at - before >= timedelta(seconds=30)
+    assert scheduler.metrics["retried"] == 1
+
+    # the delay doubles per attempt; past max_retries the item fails
+    with session_factory() as db:
+        assert scheduler._claim(db, row_id)
+    scheduler._record_failure(row_id, 2, UploadError("again", transient=True))
+    item = row(session_factory, row_id)
+    publish_at = item.publish_at if item.publish_at.tzinfo else item.publish_at.replace(tzinfo=timezone.utc)
+    assert publish_at - before >= timedelta(seconds=60)
+    with session_factory() as db:
+        assert scheduler._claim(db, row_id)
+    scheduler._record_failure(row_id, 3, UploadError("again", transient=True))
+    assert row(session_factory, row_id).status == models.UploadStatus.failed
+
+
+def test_permanent_failure_fails_the_item(make_scheduler, session_factory):
+    scheduler = make_scheduler(error=RuntimeError("confirmation timed out"))
+    [row_id] = schedule(scheduler, "alice")
+    scheduler.poll_once()
+    item = row(session_factory, row_id)
+    assert item.status == models.UploadStatus.failed
+    assert item.attempts == 1
+
+
+def test_is_transient():
+    assert is_transient(UploadError("blocked", transient=True))
+    assert not is_transient(UploadError("captcha"))
+    assert is_transient(ConnectionResetError())
+    assert not is_transient(TimeoutError())
+    assert not is_transient(KeyError("post_url"))
+
+
+def test_only_expired_leases_are_reclaimed(make_scheduler, session_factory):
+    first = make_scheduler(scheduler_id="first", lease=60)
+    second = make_scheduler(scheduler_id="second", lease=60)
+    live, expired = schedule(first, "alice", "bob")
+    with session_factory() as db:
+        assert first._claim(db, live) and first._claim(db, expired)
+        assert not second._claim(db, live)
+        db.query(models.ScheduledUpload).filter(models.ScheduledUpload.id == expired).update({models.ScheduledUpload.lease_expires_at: time.time() - 1})
+        db.commit()
+    assert second.reclaim_expired() == 1
+    assert row(session_factory, live).status == models.UploadStatus.running
+    assert row(session_factory, expired).status == models.UploadStatus.scheduled
+
+    # the first scheduler's late failure of the reclaimed row is dropped
+    first._record_failure(expired, 1, UploadError("late", transient=True))
+    assert row(session_factory, expired).attempts == 0
+
+
+def test_heartbeat_extends_own_leases(make_scheduler, session_factory):
+    scheduler = make_scheduler(scheduler_id="me", lease=60)
+    [row_id] = schedule(scheduler, "alice")
+    with session_factory() as db:
+        scheduler._claim(db, row_id)
+        db.query(models.ScheduledUpload).update({models.ScheduledUpload.lease_expires_at: time.time() + 1})
+        db.commit()
+    scheduler._rows.add(row_id)
+    assert scheduler.heartbeat() == 1
+    assert row(session_factory, row_id).lease_expires_at > time.time() + 50
@@ -0,0 +1,102 @@
+# backend/tests/test_worker.py
+# Job claims and lease reclaiming on SQLite (the conditional-UPDATE path of `claim_jobs`).
+
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import create_engine
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import sessionmaker
+
+from app import models
+from app.db import Base
+from app.worker import claim_jobs, reclaim_stalled
+
+
+def add_jobs(session_factory, owner_id, count, shard_key=None):
+    with session_factory() as db:
+        jobs = [models.Job(owner_id=owner_id, metadata={}, shard_key=shard_key) for _ in range(count)]
+        db.add_all(jobs)
+        db.commit()
+        return [job.id for job in jobs]
+
+
+def test_concurrent_claimers_never_share_a_job(tmp_path):
+    # a file database, so every claimer has its own connection and transactions really interleave
+    engine = create_engine(f"sqlite:///{tmp_path / 'claims.db'}", connect_args={"timeout": 30, "check_same_thread": False})
+    Base.metadata.create_all(engine)
+    factory = sessionmaker(bind=engine, autoflush=False)
+    with factory() as db:
+        user = models.User(email="claims@example.com")
+        db.add(user)
+        db.commit()
+        owner_id = user.id
+    ids = add_jobs(factory, owner_id, 60)
+    claimed = {f"worker-{n}": [] for n in range(4)}
+
+    def claimer(worker_id):
+        idle = 0
+        while idle < 3:
+            with factory() as db:
+                try:
+                    got = claim_jobs(db, 3, worker_id=worker_id)
+                except OperationalError:
+                    # SQLite refused the write lock; try again like the next poll would
+                    db.rollback()
+                    continue
+            claimed[worker_id].extend(got)
+            idle = idle + 1 if not got else 0
+
+    threads = [threading.Thread(target=claimer, args=(worker_id,)) for worker_id in claimed]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(30)
+    counts = Counter(job_id for got in claimed.values() for job_id in got)
+    assert sorted(counts) == ids
+    assert set(counts.values()) == {1}
+    with factory() as db:
+        for worker_id, got in claimed.items():
+            for job_id in got:
+                job = db.get(models.Job, job_id)
+                assert (job.status, job.worker_id, job.attempts) == (models.JobStatus.running, worker_id, 1)
+    engine.dispose()
+
+
+def test_second_claim_gets_nothing(session_factory, make_user):
+    owner_id = make_user("second@example.com")
+    add_jobs(session_factory, owner_id, 2)
+    with session_factory() as db:
+        assert len(claim_jobs(db, 5, worker_id="a")) == 2
+        assert claim_jobs(db, 5, worker_id="b") == []
+
+
+def test_only_expired_leases_are_reclaimed(session_factory, make_user):
+    owner_id = make_user("leases@example.com")
+    live, expired, exhausted = add_jobs(session_factory, owner_id, 3)
+    with session_factory() as db:
+        assert claim_jobs(db, 3, worker_id="a", lease=60) == [live, expired, exhausted]
+        Job = models.Job
+        db.query(Job).filter(Job.id.in_([expired, exhausted])).update({Job.lease_expires_at: time.time() - 1}, synchronize_session=False)
+        db.query(Job).filter(Job.id == exhausted).update({Job.attempts: 3}, synchronize_session=False)
+        db.commit()
+        assert reclaim_stalled(db, lease=60, max_attempts=3) == ([expired], [exhausted])
+        assert db.get(Job, live).status == models.JobStatus.running
+        requeued = db.get(Job, expired)
+        assert (requeued.status, requeued.worker_id, requeued.lease_expires_at) == (models.JobStatus.queued, None, None)
+        assert db.get(Job, exhausted).status == models.JobStatus.failed
+        # a second reclaimer finds nothing left to do
+        assert reclaim_stalled(db, lease=60, max_attempts=3) == ([], [])
+
+
+def test_one_job_per_shard_key(session_factory, make_user):
+    owner_id = make_user("shards@example.com")
+    alice = add_jobs(session_factory, owner_id, 3, shard_key="tiktok:alice")
+    bob = add_jobs(session_factory, owner_id, 2, shard_key="tiktok:bob")
+    free = add_jobs(session_factory, owner_id, 2)
+    with session_factory() as db:
+        got = claim_jobs(db, 10, worker_id="a", shard_keys={"tiktok:alice"})
+    # one of alice's jobs and every job without a key; bob's shard is not leased
+    assert got == [alice[0], *free]
+    assert not set(got) & set(bob)